@@ -0,0 +1,94 @@
+import argparse
+import time
+
+from scraping.bom_parser import extract_bom, BOM_BACKENDS
+
+##########################################################################################################
+# Function to build a catalog page fixture ###############################################################
+##########################################################################################################
+
+def build_catalog_page(parts=25, specs=60, script_kb=120):
+    """
+    Builds a page shaped like a Baldor catalog "parts" tab: a heavy head with inline scripts
+    and styles, navigation, a specs table and the parts table read by the BOM extractor.
+
+    Parameters:
+        parts (int) - Rows of the parts table.
+        specs (int) - Rows of the specs table.
+        script_kb (int) - Approximate size of the inline scripts, in KB.
+
+    Returns:
+        str - Page HTML.
+
+    Example use:
+        html = build_catalog_page(parts=40)
+    """
+    script = "var catalog = {" + ",".join(f'"k{i}": "<td>{i}</td>"' for i in range(script_kb * 16)) + "};"
+    nav = "".join(f'<li class="nav-item"><a href="/catalog/{i}">Category {i} &amp; more</a></li>' for i in range(300))
+    spec_rows = "".join(
+        f"<tr><td>Spec {i}</td><td>{i * 3} <span class='unit'>V</span></td></tr>" for i in range(specs)
+    )
+    part_rows = "".join(
+        f"<tr class='part'><td> <a href='/parts/{i}'>PN{i:06d}</a> </td>"
+        f"<td>Part description {i} &ndash; <b>bearing</b></td><td>{i % 4 + 1}</td></tr>"
+        for i in range(parts)
+    )
+
+    return (
+        "<!DOCTYPE html><html><head><title>Catalog</title>"
+        f"<style>.nav-item {{ color: red; }} {'.c{} {{ margin: 0; }}' * 500}</style>"
+        f"<script>{script}</script></head><body>"
+        f"<nav><ul>{nav}</ul></nav>"
+        "<div class='tab-content'>"
+        f"<table class='specs'><thead><tr><th>Name</th><th>Value</th></tr></thead><tbody>{spec_rows}</tbody></table>"
+        "<!-- parts -->"
+        f"<table class='parts'><thead><tr><th>Part</th><th>Description</th><th>Qty</th></tr></thead>"
+        f"<tbody>{part_rows}</tbody></table>"
+        "</div><footer><p>Footer</p></footer></body></html>"
+    )
+
+##########################################################################################################
+# Function to benchmark the BOM parser backends ##########################################################
+##########################################################################################################
+
+def run(repeat=50, parts=25):
+    """
+    Times every BOM backend on the same fixture page and checks they agree with html.parser.
+
+    Parameters:
+        repeat (int) - Parses per backend.
+        parts (int) - Rows of the parts table in the fixture.
+
+    Returns:
+        dict mapping each backend to its average milliseconds per page.
+
+    Example use:
+        python -m benchmarks.bom_parser_bench --repeat 100
+    """
+    html = build_catalog_page(parts=parts)
+    reference = extract_bom(html, "html.parser")
+
+    results = {}
+    for backend in BOM_BACKENDS:
+        bom = extract_bom(html, backend)
+        if bom != reference:
+            raise AssertionError(f"Backend {backend} returned a different BOM")
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            extract_bom(html, backend)
+        results[backend] = (time.perf_counter() - start) * 1000 / repeat
+
+    baseline = results["html.parser"]
+    print(f"Page: {len(html) / 1024:.0f} KB, {len(reference)} BOM rows, {repeat} parses per backend")
+    for backend, ms in results.items():
+        print(f"  {backend:<12} {ms:8.2f} ms/page  {baseline / ms:6.1f}x")
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the BOM parser backends on a catalog page fixture.")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--parts", type=int, default=25)
+    args = parser.parse_args()
+    run(args.repeat, args.parts)
@@ -0,0 +1,290 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import requests
+
+from benchmarks.mock_baldor import start_mock_server
+
+##########################################################################################################
+# Helper functions to measure the resident memory ########################################################
+##########################################################################################################
+
+def _rss_bytes():
+    """
+    Current resident set size of the process, or its peak when /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return 0
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class _PeakRss:
+    """
+    Samples the resident set size on a background thread while the block runs.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = _rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+##########################################################################################################
+# Function to time one benchmark step ####################################################################
+##########################################################################################################
+
+def _measure(name, base_url, products, fn):
+    """
+    Runs fn and reports its wall and CPU time, the requests it made to the mock server,
+    the peak RSS reached and the throughput.
+
+    Parameters:
+        name (str) - Name of the step.
+        base_url (str) - Address of the mock server, to read its request counters.
+        products (int) - Products handled by the step, for products/s (0 to leave it out).
+        fn (callable) - Step to run; its return value is returned with the measures.
+
+    Returns:
+        (result, measures)
+    """
+    before = requests.get(f"{base_url}/__stats", timeout=10).json()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+
+    with _PeakRss() as rss:
+        result = fn()
+
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    after = requests.get(f"{base_url}/__stats", timeout=10).json()
+
+    made = after["total_requests"] - before["total_requests"]
+    measures = {
+        "stage": name,
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu, 3),
+        "requests": made,
+        "errors": after["requests"].get("error", 0) - before["requests"].get("error", 0),
+        "bytes": after["total_bytes"] - before["total_bytes"],
+        # The two /__stats calls open a connection each.
+        "connections": after["connections"] - before["connections"] - 1,
+        "requests_per_s": round(made / wall, 1) if wall else 0.0,
+        "products_per_s": round(products / wall, 1) if wall and products else 0.0,
+        "peak_rss_mb": round(rss.peak / 1024 / 1024, 1),
+    }
+    return result, measures
+
+def _count_products(data):
+    return sum(
+        len(subsub.get("product", []))
+        for category in data
+        for subcat in category.get("subcategories", [])
+        for subsub in subcat.get("sub_subcategory", [])
+    )
+
+##########################################################################################################
+# Function to benchmark the crawl against the mock server ################################################
+##########################################################################################################
+
+def run(catalog=None, latency=0.02, error_rate=0.0, stages=True, end_to_end=True, workdir=None):
+    """
+    Benchmarks the collection against a local MockBaldorServer: each stage on its own
+    (tree discovery, product fetch, clean_bom, download_product_files, output_formater,
+    export_catalog, build_final_output, write_final_output), then the whole /collect_data flow, followed by
+    an incremental /collect_data run after the catalog moved to its next revision (the
+    weekly refresh case: a share of the products changed or removed, see MockCatalog.churn).
+
+    The mock server runs in a separate process and the crawl writes to a temporary working
+    directory, so runs are reproducible and never touch baldor.com or the local data. The
+    response cache is bypassed and the rate limiter raised to 1000 req/s unless the
+    HTTP_CACHE_MODE / RATE_LIMIT_* variables are already set.
+
+    Parameters:
+        catalog (dict) - Arguments of MockCatalog (catalog size and asset size).
+        latency (float) - Delay added by the server to every response, in seconds.
+        error_rate (float) - Share of server responses replaced by a 503.
+        stages (bool) - Benchmark each stage on its own.
+        end_to_end (bool) - Benchmark the /collect_data flow.
+        workdir (str) - Working directory of the crawl; a temporary one by default.
+
+    Returns:
+        List of measures, one per step.
+
+    Example use:
+        python -m benchmarks.crawl_bench --products 50 --latency 0.05 --json bench.json
+    """
+    catalog = catalog or {}
+    process, base_url = start_mock_server(latency=latency, error_rate=error_rate, **catalog)
+
+    # Read at import time by the modules below.
+    os.environ["BALDOR_BASE_URL"] = base_url
+    os.environ.setdefault("HTTP_CACHE_MODE", "bypass")
+    os.environ.setdefault("RATE_LIMIT_INITIAL", "1000")
+    os.environ.setdefault("RATE_LIMIT_MAX", "1000")
+
+    workdir = os.path.abspath(workdir or tempfile.mkdtemp(prefix="crawl_bench_"))
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+
+    from utils.general_utils import setup_logging
+    setup_logging("history_log")
+
+    import scraping.baldor_scraping as baldor_scraping
+    from utils.pre_process import clean_bom
+    from utils.download_files import download_product_files
+    from scraping.baldor_output import output_formater
+    from scraping.final_output import build_final_output, write_final_output
+    from scraping.catalog_export import export_catalog
+
+    results = []
+    try:
+        if stages:
+            os.makedirs("stages", exist_ok=True)
+            os.chdir("stages")
+
+            data, measures = _measure("fetch_category_tree", base_url, 0, baldor_scraping.fetch_category_tree)
+            results.append(measures)
+
+            data, measures = _measure(
+                "fetch_products_data", base_url, 0, lambda: baldor_scraping.fetch_products_data(data)
+            )
+            products = _count_products(data)
+            measures["products_per_s"] = round(products / measures["wall_s"], 1) if measures["wall_s"] else 0.0
+            results.append(measures)
+
+            steps = [
+                ("clean_bom", lambda: clean_bom(data)),
+                ("download_product_files", lambda: download_product_files(data)),
+                ("output_formater", lambda: output_formater(data, assets_mode="reference")),
+                ("export_catalog", lambda: export_catalog(data, formats=["sqlite"])),
+                ("build_final_output", lambda: build_final_output(data)),
+                ("write_final_output", lambda: write_final_output(data, "data/final_output.json")),
+            ]
+            for name, fn in steps:
+                _, measures = _measure(name, base_url, products, fn)
+                results.append(measures)
+
+            os.chdir(workdir)
+
+        if end_to_end:
+            os.makedirs("end_to_end", exist_ok=True)
+            os.chdir("end_to_end")
+
+            import main
+
+            def collect(incremental=False):
+                status = asyncio.run(main.data_collection_process(
+                    "BALDOR", categories=None, products=None, max_products=None, time_budget=None,
+                    incremental=incremental,
+                ))
+                job = main.jobs.get(status["job_id"])
+                while job.status in ("pending", "running"):
+                    time.sleep(0.05)
+                if job.status != "succeeded":
+                    raise RuntimeError(f"Collection job {job.status}: {job.error}")
+                return job
+
+            job, measures = _measure("collect_data", base_url, 0, collect)
+            products = job.progress_dict()["products_total"]
+            measures["products_per_s"] = round(products / measures["wall_s"], 1) if measures["wall_s"] else 0.0
+            results.append(measures)
+
+            requests.get(f"{base_url}/__revision", timeout=10)
+            job, measures = _measure("collect_data_incremental", base_url, 0, lambda: collect(incremental=True))
+            products = job.progress_dict()["products_total"]
+            measures["products_per_s"] = round(products / measures["wall_s"], 1) if measures["wall_s"] else 0.0
+            results.append(measures)
+
+            os.chdir(workdir)
+
+    finally:
+        process.terminate()
+        process.join()
+
+    return results
+
+##########################################################################################################
+# Function to print the benchmark results ################################################################
+##########################################################################################################
+
+def report(results):
+    """
+    Prints the measures of each step as a table.
+    """
+    header = (
+        f"{'stage':<26}{'wall s':>9}{'cpu s':>9}{'requests':>10}{'conns':>8}{'errors':>8}"
+        f"{'req/s':>9}{'prod/s':>9}{'peak MB':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for m in results:
+        print(
+            f"{m['stage']:<26}{m['wall_s']:>9.2f}{m['cpu_s']:>9.2f}{m['requests']:>10}{m['connections']:>8}{m['errors']:>8}"
+            f"{m['requests_per_s']:>9.1f}{m['products_per_s']:>9.1f}{m['peak_rss_mb']:>9.1f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the crawl against a local stand-in for the Baldor website.")
+    parser.add_argument("--categories", type=int, default=3)
+    parser.add_argument("--subcategories", type=int, default=3)
+    parser.add_argument("--subsubcategories", type=int, default=3)
+    parser.add_argument("--products", type=int, default=20, help="Products per sub-subcategory.")
+    parser.add_argument("--asset-kb", type=int, default=64, help="Size of each manual, drawing and image.")
+    parser.add_argument("--churn", type=float, default=0.05, help="Share of products changed before the incremental run.")
+    parser.add_argument("--latency", type=float, default=0.02, help="Server latency per response, in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of responses answered with a 503.")
+    parser.add_argument("--skip-stages", action="store_true", help="Only run the end-to-end /collect_data flow.")
+    parser.add_argument("--skip-end-to-end", action="store_true", help="Only run the stages.")
+    parser.add_argument("--workdir", help="Working directory of the crawl (a temporary one by default).")
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    results = run(
+        catalog={
+            "categories": args.categories,
+            "subcategories": args.subcategories,
+            "subsubcategories": args.subsubcategories,
+            "products": args.products,
+            "asset_kb": args.asset_kb,
+            "churn": args.churn,
+        },
+        latency=args.latency,
+        error_rate=args.error_rate,
+        stages=not args.skip_stages,
+        end_to_end=not args.skip_end_to_end,
+        workdir=args.workdir,
+    )
+    report(results)
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,345 @@
+import argparse
+import json
+import multiprocessing
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from benchmarks.bom_parser_bench import build_catalog_page
+
+##########################################################################################################
+# Class to describe the generated catalog ################################################################
+##########################################################################################################
+
+class MockCatalog:
+    """
+    Deterministic stand-in for the Baldor catalog: categories, subcategories and
+    sub-subcategories with a fixed number of products each, and assets of a fixed size.
+
+    Parameters:
+        categories (int) - Main categories.
+        subcategories (int) - Subcategories of each category.
+        subsubcategories (int) - Sub-subcategories of each subcategory.
+        products (int) - Products of each sub-subcategory.
+        asset_kb (int) - Size of each manual, drawing and image, in KB.
+        images (int) - Distinct images shared by the products (the site reuses images).
+        bom_parts (int) - Rows of the parts table of each catalog page.
+        churn (float) - Share of the products whose price changes in each new revision of the
+            catalog; a fifth of that share is removed instead (see /__revision).
+
+    Example use:
+        catalog = MockCatalog(categories=2, products=50)
+        catalog.total_products
+    """
+
+    def __init__(self, categories=3, subcategories=3, subsubcategories=3, products=20,
+                 asset_kb=64, images=50, bom_parts=25, churn=0.05):
+        self.categories = categories
+        self.subcategories = subcategories
+        self.subsubcategories = subsubcategories
+        self.products = products
+        self.asset_size = asset_kb * 1024
+        self.images = max(1, images)
+        self.catalog_page = build_catalog_page(parts=bom_parts, script_kb=40).encode("utf-8")
+        self.churn = churn
+        self.revision = 0
+
+    @property
+    def total_products(self):
+        return self.categories * self.subcategories * self.subsubcategories * self.products
+
+    def children(self, category_id):
+        """
+        Children of a category node ("C1", "C1S2", "C1S2X3"), or the main categories for None.
+        """
+        if category_id is None:
+            ids = [f"C{i}" for i in range(1, self.categories + 1)]
+            count = self.subcategories * self.subsubcategories * self.products
+        elif re.fullmatch(r"C\d+", category_id):
+            ids = [f"{category_id}S{i}" for i in range(1, self.subcategories + 1)]
+            count = self.subsubcategories * self.products
+        elif re.fullmatch(r"C\d+S\d+", category_id):
+            ids = [f"{category_id}X{i}" for i in range(1, self.subsubcategories + 1)]
+            count = self.products
+        else:
+            ids, count = [], 0
+
+        return [{"id": i, "text": f"Category {i}", "count": count, "imageId": 1} for i in ids]
+
+    def listing(self, category_id, page, page_size):
+        """
+        Raw listing entries of a sub-subcategory page, shaped like the Baldor API results.
+        """
+        if not re.fullmatch(r"C\d+S\d+X\d+", category_id or ""):
+            return []
+
+        codes = [f"{category_id}P{n:05d}" for n in range(1, self.products + 1)]
+        codes = [(n, code) for n, code in enumerate(codes, start=1) if not self._churned(code, "removed", self.churn / 5)]
+        return [self.product(code, n) for n, code in codes[(page - 1) * page_size:page * page_size]]
+
+    def _churned(self, code, change, share):
+        """
+        Whether a product is hit by the given change in the current revision (never in revision 0).
+        """
+        if not self.revision:
+            return False
+        return zlib.crc32(f"{code}:{self.revision}:{change}".encode("utf-8")) % 10000 < share * 10000
+
+    def product(self, code, n):
+        price = 100.0 + n + (self.revision if self._churned(code, "price", self.churn) else 0)
+        return {
+            "code": code,
+            "description": f"Motor {code}",
+            "imageId": n % self.images + 1,
+            "upc": f"78{n:010d}",
+            "listPrice": {"amount": price},
+            "attributes": [
+                {"name": "output_at_frequency", "values": [{"value": f"{n % 20 + 1} HP"}]},
+                {"name": "voltage_at_frequency", "values": [{"value": "230/460"}]},
+                {"name": "synchronous_speed_at_freq", "values": [{"value": "1800"}]},
+                {"name": "frame", "values": [{"value": f"{140 + n % 10}T"}]},
+            ],
+        }
+
+    @staticmethod
+    def drawings(code):
+        """
+        Drawings XML of a product; every tenth product has none (the site answers 404).
+        """
+        if code.endswith("0"):
+            return None
+        return (
+            "<Drawings>"
+            "<Drawing><Kind>Outline</Kind><Number>1</Number></Drawing>"
+            f"<Drawing><Kind>DimensionSheet</Kind><Number>{code}-DS</Number></Drawing>"
+            "</Drawings>"
+        ).encode("utf-8")
+
+    def asset(self, key):
+        """
+        Body of an asset, unique per key so hashes differ between files.
+        """
+        seed = f"{key}:".encode("utf-8")
+        return (seed * (self.asset_size // len(seed) + 1))[:self.asset_size]
+
+##########################################################################################################
+# Class to answer requests like the Baldor site ##########################################################
+##########################################################################################################
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.connected()
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+
+        if url.path == "/__stats":
+            return self._send(200, json.dumps(server.stats()).encode("utf-8"), "application/json")
+
+        if url.path == "/__revision":
+            server.catalog.revision = int(query.get("n", [server.catalog.revision + 1])[0])
+            return self._send(200, json.dumps({"revision": server.catalog.revision}).encode("utf-8"), "application/json")
+
+        endpoint, status, body, content_type = self._route(url.path, query)
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        if status == 200 and server.fail():
+            endpoint, status, body, content_type = "error", 503, b"Service Unavailable", "text/plain"
+
+        server.record(endpoint, len(body))
+        self._send(status, body, content_type)
+
+    def _route(self, path, query):
+        catalog = self.server.catalog
+
+        if path == "/api/products":
+            category = query.get("category", [None])[0]
+            if "pageIndex" in query:
+                page = int(query["pageIndex"][0])
+                size = int(query.get("pageSize", ["10"])[0])
+                matches = catalog.listing(category, page, size)
+                return "listing", 200, json.dumps({"results": {"matches": matches}}).encode("utf-8"), "application/json"
+            children = catalog.children(category)
+            return "category", 200, json.dumps({"category": {"children": children}}).encode("utf-8"), "application/json"
+
+        match = re.fullmatch(r"/api/products/([^/]+)/drawings", path)
+        if match:
+            xml = catalog.drawings(match.group(1))
+            if xml is None:
+                return "drawings", 404, b"Not Found", "text/plain"
+            return "drawings", 200, xml, "application/xml"
+
+        match = re.fullmatch(r"/api/products/([^/]+)/drawings/([^/]+)", path)
+        if match:
+            return "cad", 200, catalog.asset(match.group(2)), "application/octet-stream"
+
+        match = re.fullmatch(r"/api/products/([^/]+)/infopacket", path)
+        if match:
+            return "manual", 200, catalog.asset(match.group(1)), "application/pdf"
+
+        match = re.fullmatch(r"/api/images/([^/]+)", path)
+        if match:
+            return "image", 200, catalog.asset(f"img{match.group(1)}"), "image/jpeg"
+
+        if re.fullmatch(r"/catalog/[^/]+", path):
+            return "parts", 200, catalog.catalog_page, "text/html; charset=utf-8"
+
+        return "other", 404, b"Not Found", "text/plain"
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class MockBaldorServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server answering the Baldor endpoints used by the scraper and the
+    downloader from a MockCatalog, with an optional latency and error rate.
+
+    Endpoints:
+        - /api/products (category children and listing pages)
+        - /api/products/{code}/drawings and /api/products/{code}/drawings/{number}
+        - /api/products/{code}/infopacket
+        - /api/images/{id}
+        - /catalog/{code}
+        - /__stats (requests and bytes served per endpoint class, TCP connections accepted)
+        - /__revision?n=1 (switches the catalog to revision n, the next one without n, to
+          simulate the changes between two crawls)
+
+    Parameters:
+        address (tuple) - Host and port to listen on; port 0 picks a free one.
+        catalog (MockCatalog) - Catalog to serve.
+        latency (float) - Delay added to every response, in seconds.
+        error_rate (float) - Share of responses replaced by a 503, between 0 and 1.
+        seed (int) - Seed of the error draws, so runs are reproducible.
+
+    Example use:
+        server = MockBaldorServer(("127.0.0.1", 0), MockCatalog(), latency=0.02)
+        server.serve_forever()
+    """
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, catalog, latency=0.0, error_rate=0.0, seed=0):
+        super().__init__(address, _Handler)
+        self.catalog = catalog
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._requests = Counter()
+        self._bytes = Counter()
+        self._connections = 0
+        self._lock = threading.Lock()
+
+    def fail(self):
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def record(self, endpoint, size):
+        with self._lock:
+            self._requests[endpoint] += 1
+            self._bytes[endpoint] += size
+
+    def connected(self):
+        with self._lock:
+            self._connections += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": dict(self._requests),
+                "bytes": dict(self._bytes),
+                "total_requests": sum(self._requests.values()),
+                "total_bytes": sum(self._bytes.values()),
+                "connections": self._connections,
+            }
+
+##########################################################################################################
+# Functions to run the server in its own process #########################################################
+##########################################################################################################
+
+def _serve(options, conn):
+    """
+    Process entry point: starts the server and sends its port back through conn.
+    """
+    catalog = MockCatalog(**options.pop("catalog"))
+    server = MockBaldorServer(("127.0.0.1", options.pop("port", 0)), catalog, **options)
+    conn.send(server.server_address[1])
+    conn.close()
+    server.serve_forever()
+
+def start_mock_server(port=0, latency=0.0, error_rate=0.0, seed=0, **catalog):
+    """
+    Starts a MockBaldorServer in a separate (spawned) process, so serving requests does not
+    compete with the crawler for the GIL.
+
+    Parameters:
+        port (int) - Port to listen on; 0 picks a free one.
+        latency (float) - Delay added to every response, in seconds.
+        error_rate (float) - Share of responses replaced by a 503, between 0 and 1.
+        seed (int) - Seed of the error draws.
+        **catalog - Arguments of MockCatalog.
+
+    Returns:
+        (process, base_url) - Call process.terminate() to stop the server.
+
+    Example use:
+        process, base_url = start_mock_server(latency=0.02, products=50)
+    """
+    context = multiprocessing.get_context("spawn")
+    parent, child = context.Pipe(duplex=False)
+    options = {"port": port, "latency": latency, "error_rate": error_rate, "seed": seed, "catalog": catalog}
+
+    process = context.Process(target=_serve, args=(options, child), daemon=True)
+    process.start()
+    child.close()
+    port = parent.recv()
+    parent.close()
+
+    return process, f"http://127.0.0.1:{port}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the Baldor website.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--categories", type=int, default=3)
+    parser.add_argument("--subcategories", type=int, default=3)
+    parser.add_argument("--subsubcategories", type=int, default=3)
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--asset-kb", type=int, default=64)
+    parser.add_argument("--churn", type=float, default=0.05)
+    args = parser.parse_args()
+
+    catalog = MockCatalog(
+        categories=args.categories,
+        subcategories=args.subcategories,
+        subsubcategories=args.subsubcategories,
+        products=args.products,
+        asset_kb=args.asset_kb,
+        churn=args.churn,
+    )
+    server = MockBaldorServer(("127.0.0.1", args.port), catalog, args.latency, args.error_rate)
+    print(f"Serving {catalog.total_products} products on http://127.0.0.1:{args.port} "
+          f"(set BALDOR_BASE_URL to this address)")
+    server.serve_forever()
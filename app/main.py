@@ -1,23 +1,32 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse, Response
 
 import logging
-from typing import Dict, Any, Union
-import requests
+from typing import Dict, Any, Union, List, Optional
 import json
-import time
-import os
-import shutil
+from pathlib import Path
 
-from utils.general_utils import setup_logging, CHECKPOINT, save_checkpoint, load_checkpoint
+from utils.general_utils import setup_logging
 from utils.pre_process import clean_bom
-from utils.download_files import download_product_files
+from utils.download_files import download_product_files, gc_store
+from utils.jobs import JobManager, JobCancelled
+from utils.journal import CrawlJournal
+from utils.rate_limiter import backoff_delay
+from utils.metrics import REGISTRY, CONTENT_TYPE, stage_timer
+from utils.profiling import SamplingProfiler, PROFILE_ENABLED
+from utils.scope import CrawlScope
+from utils.snapshot import CrawlSnapshot, CHANGES_DIR, write_changes
+from utils.serializer import RawString, dumps, iter_json
+from utils.http_transport import get_http_session, connection_stats
+from utils.asset_cache import ASSET_FETCH, get_asset_cache
+from utils.generations import Generation, current_generation, open_generation, publish_generation, keep_partial_generation
 
-from scraping.baldor_scraping import fetch_category_data, fetch_subcategory_data, fetch_subsubcategory_data, fetch_products_data
-from scraping.baldor_output import output_formater
-from scraping.final_output import build_final_output
-
-session = requests.Session()  
+from scraping.baldor_scraping import fetch_category_tree, fetch_products_data
+from scraping.baldor_output import output_formater, ASSET_FILES
+from scraping.final_output import catalog_tree, iter_final_output, write_final_output
+from scraping.catalog_export import export_catalog
+from scraping.catalog_index import CatalogIndex
+from utils.base64_converter import iter_base64
 
 app = FastAPI(
     title="API - Machinery Data Extraction",
@@ -32,10 +41,239 @@ app = FastAPI(
 
 logger = setup_logging("history_log")
 
-@app.post("/collect_data", response_model=None, tags=["SCRAP"], status_code=200)
-async def data_collection_process(query: str) -> Union[FileResponse, Dict[str, Any]]:
+jobs = JobManager()
+
+catalog = CatalogIndex()
+
+MAX_RETRIES = 5
+RETRY_BASE = 60
+RETRY_WAIT = 5 * 60
+
+def _output_dir():
+    """
+    Folder of the product JSONs and assets of the current generation, or the output folder
+    of a version without generations.
+    """
+    generation = current_generation()
+    return generation.output_dir if generation else Path("output")
+
+def _asset_path(product, kind, pinned):
+    """
+    File of one asset of a catalog product: the downloaded copy, or in lazy mode the copy in
+    the asset cache, fetched from the source URL on first use. None if there is neither.
+    A cached copy is pinned, so it is not evicted while it is sent, and its URL appended to
+    pinned, to be passed to _release once the response is over.
+    """
+    rel_path = product["assets"].get(kind)
+    path = _output_dir() / rel_path if rel_path else None
+    if path and path.is_file():
+        return path
+
+    url = product["source_urls"].get(kind)
+    path = get_asset_cache().get(url, ASSET_FILES[kind], pin=True) if url else None
+    if path is not None:
+        pinned.append(url)
+    return path
+
+def _release(pinned):
+    for url in pinned:
+        get_asset_cache().release(url)
+
+def _iter_pinned(chunks, pinned):
+    """
+    Yields the chunks of a streamed response, then releases its pinned assets, also when the
+    client goes away and the generator is closed.
+    """
+    try:
+        yield from chunks
+    finally:
+        _release(pinned)
+
+class PinnedFileResponse(FileResponse):
+    """
+    FileResponse releasing the pinned assets once the file is sent, or the client gone.
+    """
+
+    def __init__(self, path, pinned, **kwargs):
+        super().__init__(path, **kwargs)
+        self.pinned = pinned
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            _release(self.pinned)
+
+def _connection_totals():
+    stats = connection_stats().values()
+    return sum(host["requests"] for host in stats), sum(host["connections"] for host in stats)
+
+##########################################################################################################
+# Function to run the collection process in a background job #############################################
+##########################################################################################################
+
+def run_collection(job, profile=False, scope=None, incremental=False, lazy_assets=False) -> str:
     """
-    Performs automated machinery‑data collection from the specified website.
+    Runs the full Baldor collection on a worker thread, reporting progress to the job.
+
+    Finished work is recorded in the crawl journal as it completes, so a retry (or a new
+    job with the same parameters after a failed one, within JOURNAL_TTL) resumes where the
+    previous attempt stopped.
+
+    Everything the run writes (product JSONs, assets, catalog export, catalog tree and final
+    output) goes to a new generation (see utils.generations), which is published only once
+    the run succeeds: until then, and if it fails, readers keep the last good one. Assets
+    are shared with the previous generation through hardlinks. A partial run (category or
+    product scope, max_products or time budget reached) is never published, as it would
+    drop the rest of the catalog: its generation is only served as the result of its job.
+
+    Parameters:
+        job (Job) - Job tracking this run.
+        profile (bool) - Sample the run and write its profile and per-stage wall/CPU
+            breakdown to the profile folder of its generation, named after the job id.
+        scope (dict) - Arguments of CrawlScope (categories, products, max_products,
+            time_budget); the whole catalog by default. The time budget covers the whole
+            job, retries included.
+        incremental (bool) - Only fetch the details and files of products whose listing
+            changed since the last successful run (see CrawlSnapshot). Every run writes its
+            change feed to CHANGES_DIR, named after the job id.
+        lazy_assets (bool) - Skip the downloads: only the asset URLs are recorded (in the
+            catalog export), and /assets fetches each file on its first request.
+
+    Returns:
+        Path of the final output JSON file, in the generation of the run.
+
+    Example use:
+        job = jobs.submit("BALDOR", run_collection)
+    """
+
+    generation = open_generation(job.id)
+    # Left by a failed attempt of this generation; its assets are kept.
+    for product_json in generation.output_dir.glob("*.json"):
+        product_json.unlink()
+
+    scope = CrawlScope(**(scope or {}))
+
+    profiler = SamplingProfiler() if profile else None
+    if profiler:
+        profiler.start()
+
+    snapshot = CrawlSnapshot(incremental=incremental)
+    http_before = _connection_totals()
+    # Only a run with the same parameters resumes the journal of a failed one.
+    journal = CrawlJournal(
+        params={"scope": scope.to_dict(), "incremental": incremental, "lazy_assets": lazy_assets}, job_id=job.id
+    )
+    try:
+        for attempt in range(MAX_RETRIES):
+            try:
+                job.set_stage("discovering")
+                with stage_timer("fetch_category_tree", profiler):
+                    data = scope.select_categories(fetch_category_tree(journal=journal, scope=scope))
+                job.check_cancelled()
+
+                job.set_stage("fetching_products")
+                with stage_timer("fetch_products_data", profiler):
+                    data = fetch_products_data(data, job=job, journal=journal, scope=scope, snapshot=snapshot)
+
+                with stage_timer("clean_bom", profiler):
+                    clean_bom(data)
+
+                if lazy_assets:
+                    logging.info(f"  |_ Lazy assets: files are fetched on first request")
+                else:
+                    job.set_stage("downloading")
+                    logging.info(f"  |_ Downloading ...")
+                    with stage_timer("download_product_files", profiler):
+                        download_product_files(
+                            data, job=job, journal=journal, scope=scope, unchanged=snapshot.unchanged,
+                            output_dir=generation.output_dir, update_manifest=not scope.partial,
+                        )
+
+                job.set_stage("formatting")
+                logging.info(f"  |_ Formatting ...")
+                # Product JSONs keep asset references only; base64 is produced when serializing.
+                with stage_timer("output_formater", profiler):
+                    output_formater(data, assets_mode="reference", lazy_assets=lazy_assets, output_dir=generation.output_dir)
+
+                job.set_stage("exporting")
+                with stage_timer("export_catalog", profiler):
+                    export_catalog(data, sqlite_path=generation.catalog_sqlite, parquet_dir=generation.catalog_parquet)
+
+                job.set_stage("finalizing")
+                with stage_timer("build_final_output", profiler):
+                    tree = catalog_tree(data)
+
+                    with open(generation.catalog_tree, "w", encoding="utf-8") as f:
+                        f.write(dumps(tree))
+
+                    # Single pass from the in-memory records; product JSONs are not read back.
+                    write_final_output(data, generation.final_output, output_dir=generation.output_dir)
+
+                if scope.partial:
+                    keep_partial_generation(generation)
+                else:
+                    publish_generation(generation)
+                # Blobs only the removed generations linked to.
+                gc_store()
+
+                # Removals can only be told from a listing read in full.
+                feed = snapshot.changes(data, complete=not scope.products and scope.truncated is None)
+                write_changes(feed, job.id)
+                job.changes = feed["counts"]
+                # The snapshot and the manifest describe the current generation, which a
+                # partial run does not replace; the next full run compares against them.
+                if not scope.partial:
+                    snapshot.save()
+
+                journal.discard()
+
+                job.set_progress("truncated", scope.truncated)
+                sent, opened = (total - start for total, start in zip(_connection_totals(), http_before))
+                logging.info(f"  |_ HTTP: {sent} requests, {opened} new connections")
+                logging.info(f"  |_ Process completed successfully!")
+
+                return str(generation.final_output)
+
+            except JobCancelled:
+                raise
+
+            except Exception as exc:
+                # Request-level throttling is handled by the rate controller; a failed run
+                # backs off with jitter, from RETRY_BASE up to RETRY_WAIT seconds.
+                delay = backoff_delay(attempt + 1, base=RETRY_BASE, cap=RETRY_WAIT)
+                logging.info(f"  |_ Attempt {attempt+1}/{MAX_RETRIES} failed: {exc}. Retrying in {delay:.0f} seconds...")
+                get_http_session().cookies.clear()
+                job.set_stage("waiting_retry")
+                job.wait(delay)
+
+        raise RuntimeError("Maximum retries reached. Process aborted.")
+
+    finally:
+        journal.close()
+        if profiler:
+            profiler.stop()
+            job.profile = profiler.write(generation.profile_dir, job.id)
+
+def get_job_or_404(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+@app.post("/collect_data", tags=["SCRAP"], status_code=202)
+async def data_collection_process(
+    query: str,
+    categories: Optional[List[str]] = Query(None),
+    products: Optional[List[str]] = Query(None),
+    max_products: Optional[int] = Query(None, ge=1),
+    time_budget: Optional[float] = Query(None, gt=0),
+    incremental: bool = False,
+    lazy_assets: Optional[bool] = None,
+    profile: bool = False,
+) -> Dict[str, Any]:
+    """
+    Starts an automated machinery‑data collection from the specified website in the background.
     
     Currently supported websites
     - **BALDOR** - [Baldor Electric Company](https://www.baldor.com/)
@@ -43,9 +281,26 @@ async def data_collection_process(query: str) -> Union[FileResponse, Dict[str, A
     Parameters
     - **Query** (str) - Name of the website to query.  
     - **Example** - **BALDOR**
+    - **categories** (list[str]) - Category, subcategory or sub-subcategory ids to crawl
+      (repeat the parameter for several ids); the whole catalog by default.
+    - **products** (list[str]) - Product codes to collect; only these products are fetched.
+    - **max_products** (int) - Maximum number of products collected, in catalog order. No limit by default.
+    - **time_budget** (float) - Wall-clock budget of the run, in seconds. When it runs out the
+      job finishes with the products completed so far (`truncated` in its progress).
+    - **incremental** (bool) - Only fetch the drawings, BOM and files of products that are new
+      or whose listing (UPC, price, image, attributes) changed since the last successful run.
+      Every run reports the products added, modified and removed at `/jobs/{job_id}/changes`.
+    - **lazy_assets** (bool) - Do not download the manuals, CAD files and images: only their
+      URLs are recorded, and `/assets/{code}/{file}` fetches each one on its first request
+      into a size-bounded disk cache. Defaults to `ASSET_FETCH=lazy`.
+    - **profile** (bool) - Run a sampling profiler during the collection and write a speedscope
+      file, collapsed stacks and a per-stage wall/CPU breakdown to the `profile` folder of the
+      generation of the run, listed under `profile` in the job status (also enabled for every
+      run by `COLLECT_PROFILE=1`).
 
      Returns
-    - A JSON file containing the data extracted from the selected site.
+    - The id and status of the collection job. Use `/jobs/{job_id}` to follow it and
+      `/jobs/{job_id}/result` to download the JSON file once it has finished.
 
     Estimated runtime
     - **Minimum:** 5 minutes  
@@ -54,52 +309,235 @@ async def data_collection_process(query: str) -> Union[FileResponse, Dict[str, A
       *Note:* The actual time depends on site stability and the amount of data returned.
     """
 
-    if os.path.exists("output"):
-        shutil.rmtree("output")
-
     if query.upper() != "BALDOR":
         raise HTTPException(status_code=400, detail="Query not yet supported.")
 
-    MAX_RETRIES = 5
-    for attempt in range(MAX_RETRIES):
-        try:
-            data = load_checkpoint()
-            if data is None:
-                data = fetch_category_data()
-                data = fetch_subcategory_data(data)
-                data = fetch_subsubcategory_data(data)
-                data = fetch_products_data(data)
+    scope = {
+        "categories": categories,
+        "products": products,
+        "max_products": max_products,
+        "time_budget": time_budget,
+    }
+    if lazy_assets is None:
+        lazy_assets = ASSET_FETCH == "lazy"
+    job = jobs.submit(
+        query.upper(), run_collection, profile=profile or PROFILE_ENABLED, scope=scope, incremental=incremental,
+        lazy_assets=lazy_assets,
+    )
+
+    return job.status_dict()
+
+
+@app.get("/jobs/{job_id}", tags=["SCRAP"], status_code=200)
+async def job_status(job_id: str) -> Dict[str, Any]:
+    """
+    Returns the status of a collection job: pending, running, succeeded, failed or cancelled.
+    """
+    return get_job_or_404(job_id).status_dict()
+
+
+@app.get("/jobs/{job_id}/progress", tags=["SCRAP"], status_code=200)
+async def job_progress(job_id: str) -> Dict[str, Any]:
+    """
+    Returns the current stage of a collection job, the products done/total and the bytes downloaded.
+    """
+    return get_job_or_404(job_id).progress_dict()
+
+
+@app.post("/jobs/{job_id}/cancel", tags=["SCRAP"], status_code=202)
+async def job_cancel(job_id: str) -> Dict[str, Any]:
+    """
+    Requests the cancellation of a collection job. The job stops at its next checkpoint.
+    """
+    job = get_job_or_404(job_id)
+    if job.status in ("succeeded", "failed", "cancelled"):
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}.")
+
+    job.cancel()
+
+    return job.status_dict()
+
+
+@app.get("/jobs/{job_id}/result", response_model=None, tags=["SCRAP"], status_code=200)
+async def job_result(job_id: str, format: str = "json", assets: str = "inline") -> Union[FileResponse, StreamingResponse]:
+    """
+    Returns the data extracted by a finished collection job.
+
+    Parameters
+    - **format** (str) - `json` for the nested JSON file, or `ndjson` to stream one line
+      per product with its category ids and names.
+    - **assets** (str) - `inline` to embed the manual, CAD and image as base64, or
+      `reference` to return only their paths and hashes (see `/assets/{code}/{file}`).
+    """
+    job = get_job_or_404(job_id)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}.")
 
-            clean_bom(data)
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="Format must be json or ndjson.")
+    if assets not in ("inline", "reference"):
+        raise HTTPException(status_code=400, detail="Assets must be inline or reference.")
 
-            logging.info(f"  |_ Downloading ...")
-            download_product_files(data)
+    generation = Generation(Path(job.result_path).parent)
+    if not generation.final_output.is_file():
+        raise HTTPException(status_code=410, detail="The data of this job was replaced by newer runs.")
 
-            logging.info(f"  |_ Formatting ...")
-            output_formater(data)  
+    if format == "json" and assets == "inline":
+        return FileResponse(generation.final_output, media_type="application/json", filename="final_output.json")
 
-            final_output = build_final_output(data) 
+    with open(generation.catalog_tree, "r", encoding="utf-8") as f:
+        tree = json.load(f)
 
-            os.makedirs("data", exist_ok=True)
-            with open("data/final_output.json", "w", encoding="utf-8") as f:
-                json.dump(final_output, f, ensure_ascii=False, indent=2)
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    return StreamingResponse(
+        iter_final_output(tree, format, output_dir=generation.output_dir, assets_mode=assets), media_type=media_type
+    )
 
-            if os.path.exists(CHECKPOINT):
-                os.remove(CHECKPOINT)
 
-            logging.info(f"  |_ Process completed successfully!")
+@app.get("/jobs/{job_id}/changes", response_model=None, tags=["SCRAP"], status_code=200)
+async def job_changes(job_id: str) -> FileResponse:
+    """
+    Returns the change feed of a finished collection job: the codes of the products added
+    and removed since the previous successful run, and the modified ones with the listing
+    fields that changed (old and new values).
+    """
+    job = get_job_or_404(job_id)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}.")
 
-            return JSONResponse(content=final_output)
+    path = Path(CHANGES_DIR) / f"{job.id}.json"
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Change feed not found.")
 
-        except Exception as exc:
-            logging.info(f"  |_ Attempt {attempt+1}/{MAX_RETRIES} failed: {exc}. Retrying in 5 minutes...")
-            save_checkpoint(data)
-            session.cookies.clear()
-            time.sleep(5 * 60)
+    return FileResponse(path, media_type="application/json")
 
-    raise HTTPException(status_code=500, detail="Maximum retries reached. Process aborted.")
+
+@app.get("/products", tags=["PRODUCTS"], status_code=200)
+async def list_products(
+    hp: Optional[str] = None,
+    voltage: Optional[str] = None,
+    rpm: Optional[str] = None,
+    frame: Optional[str] = None,
+    category: Optional[str] = None,
+    upc: Optional[str] = None,
+    part_number: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+) -> Dict[str, Any]:
+    """
+    Searches the products of the last complete collection run, from its SQLite catalog export,
+    without contacting the website.
+
+    Parameters
+    - **hp**, **voltage**, **rpm**, **frame** (str) - Spec value, or one of its values for lists
+      such as `230/460`; case and units are ignored (`voltage=460V` matches `230/460`).
+    - **category** (str) - Category, subcategory or sub-subcategory id.
+    - **upc** (str) - UPC of the product.
+    - **part_number** (str) - Part number found in the product BOM.
+    - **cursor** (str) - `next_cursor` of the previous page.
+    - **limit** (int) - Products per page (1 to 500).
+
+    Returns
+    - `items` with the code, name, description, UPC, price and specs of each product, in code
+      order, and `next_cursor` to request the next page (null on the last one).
+    """
+    filters = {
+        "hp": hp, "voltage": voltage, "rpm": rpm, "frame": frame,
+        "category": category, "upc": upc, "part_number": part_number,
+    }
+    try:
+        return catalog.search(filters, cursor=cursor, limit=limit)
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="No catalog collected yet.")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# Plain def: inline assets of a lazy run may be fetched from the source, off the event loop.
+@app.get("/products/{code}", response_model=None, tags=["PRODUCTS"], status_code=200)
+def get_product(code: str, assets: str = "reference") -> Union[Dict[str, Any], StreamingResponse]:
+    """
+    Returns one product of the last complete collection run: specs, categories, BOM and assets.
+
+    Parameters
+    - **assets** (str) - `reference` (default) for the asset paths, hashes and `/assets` links
+      only, or `inline` to also embed the manual, CAD and image as base64 under `docs_base64`
+      (streamed: the documents are encoded while the response is sent).
+    """
+    if assets not in ("inline", "reference"):
+        raise HTTPException(status_code=400, detail="Assets must be inline or reference.")
+
+    try:
+        product = catalog.get(code)
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="No catalog collected yet.")
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found.")
+
+    product["links"] = {
+        kind: f"/assets/{code}/{ASSET_FILES[kind]}" if path or product["source_urls"][kind] else None
+        for kind, path in product["assets"].items()
+    }
+
+    if assets == "inline":
+        docs_base64 = {}
+        pinned = []
+        for kind in product["assets"]:
+            path = _asset_path(product, kind, pinned)
+            docs_base64[kind] = RawString(iter_base64(path, path.suffix)) if path else None
+        product["docs_base64"] = docs_base64
+        return StreamingResponse(_iter_pinned(iter_json(product, pretty=False), pinned), media_type="application/json")
+
+    return product
+
+
+# Plain def: a lazy asset is fetched from the source on its first request, off the event loop.
+@app.get("/assets/{code}/{file}", response_model=None, tags=["ASSETS"], status_code=200)
+def asset_file(code: str, file: str) -> FileResponse:
+    """
+    Serves a product asset (`manual.pdf`, `cad.dwg` or `img.jpg`).
+
+    Downloaded assets are served from disk. Assets of a lazy run (`lazy_assets`) are fetched
+    from Baldor on their first request and kept in a size-bounded disk cache (least recently
+    used files are evicted); concurrent requests for the same asset share one fetch.
+
+    Supports HTTP Range requests, and the file is handed to the server as a path so it can
+    be sent without copying it through Python.
+    """
+    if file not in ASSET_FILES.values() or not code or "/" in code or code in (".", ".."):
+        raise HTTPException(status_code=404, detail="Asset not found.")
+    kind = next(kind for kind, name in ASSET_FILES.items() if name == file)
+
+    try:
+        product = catalog.get(code)
+    except FileNotFoundError:
+        product = None
+
+    pinned = []
+    if product is None:
+        path = _output_dir() / "assets" / code / file
+        path = path if path.is_file() else None
+    else:
+        path = _asset_path(product, kind, pinned)
+        if path is None and product["source_urls"][kind]:
+            raise HTTPException(status_code=502, detail="Asset could not be fetched from the source.")
+
+    if path is None:
+        raise HTTPException(status_code=404, detail="Asset not found.")
+
+    return PinnedFileResponse(path, pinned)
 
 
 @app.get("/ready", tags=["Status"], status_code=200)
 async def status():
-    return {"status": "API running correctly!"}
\ No newline at end of file
+    return {"status": "API running correctly!"}
+
+@app.get("/metrics", tags=["Status"], status_code=200)
+async def metrics():
+    """
+    Exposes the collection metrics in the Prometheus text format: HTTP requests by endpoint
+    class and status, request latency, retries and backoff time, connections opened and
+    reused per host, bytes downloaded per asset type, products processed and time spent in
+    each stage.
+    """
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
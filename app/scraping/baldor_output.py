@@ -1,42 +1,123 @@
-import json
 from pathlib import Path
 from utils.base64_converter import encode_base64
 from utils.pre_process import clean_bom 
+from utils.download_files import load_manifest, file_sha256, asset_key
+from utils.cpu_pool import get_cpu_pool
+from utils.serializer import OUTPUT_PRETTY, dumps
+from scraping.product_record import ProductRecord, ASSET_FILES, PRODUCT_NAME
+
+# Products rendered per CPU pool task; one product alone is too small to be worth shipping.
+FORMAT_BATCH = 32
+
+##########################################################################################################
+# Helper function to read the specs of a product #########################################################
+##########################################################################################################
+
+def product_specs(product):
+    """
+    Specs of a product (hp, voltage, rpm, frame), from the listing attributes.
+
+    Parameters:
+        product (dict) - Product from fetch_products_data.
+
+    Returns:
+        dict of the specs, None when the attribute is missing.
+    """
+    return {
+        "hp": product.get("output_at_frequency"),
+        "voltage": product.get("voltage_at_frequency"),
+        "rpm": product.get("synchronous_speed_at_freq"),
+        "frame": product.get("frame"),
+    }
+
+##########################################################################################################
+# Helper function to render product JSON files ###########################################################
+##########################################################################################################
+
+def _render_products(batch):
+    """
+    CPU-bound half of output_formater, run on the CPU pool: encodes the documents of each
+    product in base64 (inline mode) and writes its JSON file. The encoded documents only
+    go to the file; they are not sent back to the caller. Files are compact JSON unless
+    OUTPUT_PRETTY is set.
+
+    Parameters:
+        batch (list) - (json_path, output_data, docs) tuples; docs maps each document to its
+            file path (None when missing), or is None in reference mode.
+
+    Returns:
+        Number of JSON files written.
+    """
+    for json_path, output_data, docs in batch:
+        if docs is not None:
+            output_data["docs_base64"] = {
+                kind: encode_base64(path, Path(path).suffix) if path else None
+                for kind, path in docs.items()
+            }
+
+        Path(json_path).write_text(dumps(output_data, OUTPUT_PRETTY), encoding="utf-8")
+
+    return len(batch)
 
 ##########################################################################################################
 # Funcrion to format baldor website output ###############################################################
 ##########################################################################################################
 
-def output_formater(products):
+def output_formater(products, assets_mode="inline", lazy_assets=False, output_dir="output"):
     """
     Creates JSON output files for each product, including base64-encoded documents.
 
+    The base64 encoding and JSON rendering run on the CPU pool in batches of FORMAT_BATCH
+    products, while this thread keeps preparing the next batches.
+
+    Each product dict of the tree is replaced by a ProductRecord holding its metadata and
+    asset references only: the documents are written to the JSON files but never kept in
+    memory, and are read again only by the serializers that embed them.
+
     Parameters:
         products (list) - List of product categories, each with subcategories and products.
+        assets_mode (str) - "inline" to embed the documents as base64 under "docs_base64", or
+            "reference" to keep only the asset paths and their SHA-256 hashes.
+        lazy_assets (bool) - The files were not downloaded (lazy asset mode): the assets and
+            hashes are left empty, whatever an earlier run left on disk, and the files are
+            fetched on demand from their source URLs (see AssetCache).
+        output_dir (str) - Folder of the product JSONs and of their assets (in assets/).
 
     Returns:
         A dictionary containing the paths to the generated JSON files and the enriched product data.
         - "output_paths": List of paths to the generated JSON files.
-        - "products_enriched": List of products with additional data.
+        - "products_enriched": The tree, with a ProductRecord in place of each product.
 
     Example use:
-        output_paths = output_formater(products)
+        output_paths = output_formater(products, assets_mode="reference")
     """
 
+    if assets_mode not in ("inline", "reference"):
+        raise ValueError(f"Unsupported assets mode: {assets_mode}")
+
     clean_bom(products)
 
-    base_folder = Path("output/assets")     
-    json_out_dir = Path("output")           
+    manifest = load_manifest()
+
+    base_folder = Path(output_dir) / "assets"
+    json_out_dir = Path(output_dir)
     json_out_dir.mkdir(parents=True, exist_ok=True)
 
     output_paths = []
+    pool = get_cpu_pool()
+    batch, rendering = [], []
+
+    def flush():
+        if batch:
+            rendering.append(pool.submit(_render_products, list(batch)))
+            batch.clear()
 
     for category in products:
         for subcat in category.get("subcategories", []):
             for subsub in subcat.get("sub_subcategory", []):
                 products_list = subsub.setdefault("product", [])
 
-                for product in products_list:
+                for position, product in enumerate(products_list):
                     code = product.get("code")
                     if not code:
                         continue
@@ -47,39 +128,49 @@ def output_formater(products):
                     img_path    = folder / "img.jpg"
                     json_path   = json_out_dir / f"{code}.json"   # agora é Path
 
-                    docs_base64 = {
-                        "manual": encode_base64(manual_path, ".pdf") if manual_path.exists() else None,
-                        "cad"   : encode_base64(cad_path,  ".dwg") if cad_path.exists() else None,
-                        "image" : encode_base64(img_path,  ".jpg") if img_path.exists() else None,
+                    # Files on disk, by asset kind; none in lazy mode.
+                    files = {
+                        kind: path if not lazy_assets and path.exists() else None
+                        for kind, path in (("manual", manual_path), ("cad", cad_path), ("image", img_path))
                     }
 
+                    hashes = {}
+                    for kind, path in files.items():
+                        entry = manifest.get(asset_key(code, path.name)) if path else None
+                        if path is None:
+                            hashes[kind] = None
+                        elif entry and entry.get("size") == path.stat().st_size:
+                            hashes[kind] = entry.get("sha256")
+                        else:
+                            hashes[kind] = file_sha256(path)
+
                     output_data = {
                         "product_id": code,
-                        "name": "Motor AC Trifásico",
+                        "name": PRODUCT_NAME,
                         "description": product.get("description"),
                         "upc": product.get("upc"),
                         "USD": product.get("USD"),
-                        "specs": {
-                            "hp": product.get("output_at_frequency"),
-                            "voltage": product.get("voltage_at_frequency"),
-                            "rpm": product.get("synchronous_speed_at_freq"),
-                            "frame": product.get("frame"),
-                        },
+                        "specs": product_specs(product),
                         "bom": product.get("bom", []),
                         "assets": {
-                            "manual": f"assets/{code}/manual.pdf" if manual_path.exists() else None,
-                            "cad": f"assets/{code}/cad.dwg" if cad_path.exists() else None,
-                            "image": f"assets/{code}/img.jpg" if img_path.exists() else None,
+                            kind: f"assets/{code}/{path.name}" if path else None
+                            for kind, path in files.items()
                         },
-                        "docs_base64": docs_base64,
+                        "hashes": hashes,
                     }
 
-                    json_path.write_text(
-                        json.dumps(output_data, ensure_ascii=False, indent=2),
-                        encoding="utf-8",
-                    )
+                    docs = None
+                    if assets_mode == "inline":
+                        docs = {kind: str(path) if path else None for kind, path in files.items()}
+
+                    batch.append((str(json_path), output_data, docs))
+                    products_list[position] = ProductRecord.from_output(product, output_data)
                     output_paths.append(json_path.as_posix())
+                    if len(batch) >= FORMAT_BATCH:
+                        flush()
 
-                    product.update(output_data)
+    flush()
+    for future in rendering:
+        future.result()
 
     return {"output_paths": output_paths, "products_enriched": products,}
@@ -1,194 +1,457 @@
 import requests
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, TimeoutError, wait
 import logging
-import json
 import xml.etree.ElementTree as ET
-from bs4 import BeautifulSoup
-import time
 import os
 
-from utils.general_utils import setup_logging, CHECKPOINT, save_checkpoint, load_checkpoint
+from utils.concurrency import HostLimiter, MAX_WORKERS, MAX_PER_HOST
+from utils.http_cache import get_response_cache
+from utils.rate_limiter import get_rate_controller
+from utils.http_transport import get_http_session
+from utils.metrics import PRODUCTS_PROCESSED
+from utils.scope import prune_unvisited
+from utils.cpu_pool import get_cpu_pool
+from scraping.bom_parser import extract_bom
+
+# Root of the Baldor site; pointed at a local stand-in server by the benchmarks.
+BALDOR_BASE_URL = os.getenv("BALDOR_BASE_URL", "https://www.baldor.com").rstrip("/")
 
 ##########################################################################################################
-# Funcrion to scrape category data #######################################################################
+# Helper function to perform a cached GET ################################################################
 ##########################################################################################################
 
-def fetch_category_data():
+def _get(session, limiter, url, endpoint, **kwargs):
     """
-    Fetches main product category data from the Baldor API.
+    Performs a GET through the on-disk response cache; only real network requests take a
+    slot of the concurrency limiter and are paced (and retried on 429/5xx) by the shared
+    rate controller, with the timeout of the endpoint class unless one is given.
 
     Parameters:
-        None
+        session (requests.Session) - Shared HTTP session.
+        limiter (HostLimiter) - Global/per-host concurrency limiter.
+        url (str) - URL to request.
+        endpoint (str) - Endpoint class ("category", "listing", "drawings" or "parts").
+        **kwargs - Additional arguments for session.get().
 
     Returns:
-        A list of dictionaries containing:
-            - id: category ID
-            - text: category name
-            - count: number of products in the category
-            - imageId: image ID for the category
-    
+        requests.Response
+
     Example use:
-        categories = fetch_category_data()
+        response = _get(session, limiter, url, "listing")
     """
+    def fetch():
+        with limiter.slot(url):
+            return get_rate_controller().request(session, url, endpoint=endpoint, **kwargs)
 
-    url = "https://www.baldor.com/api/products?include=results&language=en-US&include=filters&include=category&pageSize=10"
-    
-    headers = {
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
-    }
+    accept = (kwargs.get("headers") or {}).get("Accept")
+    return get_response_cache().get(url, endpoint, fetch, accept=accept)
 
-    logging.info(f"_ Fetching main categories from Baldor API")
-    logging.info(f"  |_ URL: {url}")
+##########################################################################################################
+# Helper function to fetch category children #############################################################
+##########################################################################################################
 
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        categories = data.get("category", {}).get("children", [])
-        return [
-            {
-                "id": cat.get("id"),
-                "text": cat.get("text"),
-                "count": cat.get("count"),
-                "imageId": cat.get("imageId")
-            }
-            for cat in categories
-        ]
-    except requests.RequestException as e:
-        logging.error(f"Error fetching categories: {e}")
+CATEGORY_URL = f"{BALDOR_BASE_URL}/api/products?include=results&language=en-US&include=filters&include=category&pageSize=10"
 
-        return []
+def _fetch_children(session, limiter, category_id=None, journal=None):
+    """
+    Fetches the direct children of a category node from the Baldor API.
+
+    Parameters:
+        session (requests.Session) - Shared HTTP session.
+        limiter (HostLimiter) - Global/per-host concurrency limiter.
+        category_id (str) - Category ID, or None for the main categories.
+        journal (CrawlJournal) - Journal of finished work to resume from (optional).
+
+    Returns:
+        A list of dictionaries containing id, text, count and imageId.
+        Raises requests.RequestException if the request fails.
+    """
+    key = "root" if category_id is None else str(category_id)
+    if journal:
+        children = journal.get("node", key)
+        if children is not None:
+            return children
+
+    url = CATEGORY_URL if category_id is None else f"{CATEGORY_URL}&category={category_id}"
+
+    response = _get(session, limiter, url, "category")
+    response.raise_for_status()
+    data = response.json()
+
+    children = [
+        {
+            "id": child.get("id"),
+            "text": child.get("text"),
+            "count": child.get("count"),
+            "imageId": child.get("imageId")
+        }
+        for child in data.get("category", {}).get("children", [])
+    ]
+
+    if journal:
+        journal.record("node", key, children)
+
+    return children
 
 ##########################################################################################################
-# Funcrion to scrape subcategory data ####################################################################
+# Funcrion to discover the whole category tree ###########################################################
 ##########################################################################################################
 
-def fetch_subcategory_data(categories):
+def fetch_category_tree(max_workers=MAX_WORKERS, max_per_host=MAX_PER_HOST, journal=None, scope=None):
     """
-    Fetches all main categories and their respective subcategories.
+    Discovers categories, subcategories and sub-subcategories in a single concurrent pass.
+
+    Every node is expanded as soon as its parent's response arrives, over one pooled
+    session, so discovery time grows with the depth of the tree rather than its size.
+    With a category filter, branches outside the requested ids stop being expanded as
+    soon as every requested id has been found. When the time budget of the scope runs out,
+    the nodes discovered so far are returned.
 
     Parameters:
-        categories (list) - List of dictionaries containing category information.
+        max_workers (int) - Maximum number of concurrent requests.
+        max_per_host (int) - Maximum number of concurrent requests against a single host.
+        journal (CrawlJournal) - Journal of finished work; journaled nodes are not requested again (optional).
+        scope (CrawlScope) - Slice of the catalog to discover (optional). The tree still has
+            to be filtered with scope.select_categories().
 
     Returns:
-        Updated list with subcategory data included in each category.
+        The category tree, each node with its id, text (name), count (number of products)
+        and imageId:
             - {here data from category},
-            - subcategories:
-                - id: subcategory ID
-                - text: subcategory name
-                - count: number of products in the subcategory
-                - imageId: image ID for the subcategory
-    
+                - subcategories:
+                    - {here data from subcategory},
+                        - sub_subcategory:
+                            - {here data from sub_subcategory}
+
     Example use:
-        data = fetch_subcategory_data(categories)
+        data = fetch_category_tree(max_workers=32)
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
-    }
 
-    all_data = []
+    session = get_http_session()
+    limiter = HostLimiter(max_total=max_workers, max_per_host=max_per_host)
 
-    for category in categories:
-        category_id = category["id"]
-        url = f"https://www.baldor.com/api/products?include=results&language=en-US&include=filters&include=category&pageSize=10&category={category_id}"
-        logging.info(f"  |_ Fetching subcategories for category ID: {category_id}")
-        logging.info(f"  |  |_ URL: {url}") 
+    # Child key filled at each depth; sub-subcategories are leaves of the discovery.
+    child_keys = ["subcategories", "sub_subcategory"]
 
-        try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
+    logging.info(f"_ Fetching category tree from Baldor API")
+    logging.info(f"  |_ URL: {CATEGORY_URL}")
+
+    requested = scope.categories if scope else set()
+    found = set()
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crawl")
+    expired = False
+    try:
+        pending = {pool.submit(_fetch_children, session, limiter, None, journal): (None, -1, False)}
+        categories = []
+
+        while pending:
+            done, _ = wait(pending, timeout=scope.remaining if scope else None, return_when=FIRST_COMPLETED)
+            if not done and scope.expired:
+                # Out of time: keep the nodes discovered so far.
+                expired = True
+                break
+
+            for future in done:
+                node, depth, inside = pending.pop(future)
+                try:
+                    children = future.result()
+                except requests.RequestException as e:
+                    if node is None:
+                        logging.error(f"Error fetching categories: {e}")
+                        return []
+                    logging.error(f"Error fetching children for category {node.get('id')}: {e}")
+                    children = []
+
+                if node is None:
+                    categories.extend(children)
+                else:
+                    node[child_keys[depth]] = children
+                    logging.info(f"  |_ Category ID {node.get('id')}: {len(children)} children")
+
+                found.update(str(child.get("id")) for child in children if str(child.get("id")) in requested)
+
+                if depth + 1 < len(child_keys):
+                    for child in children:
+                        child_inside = inside or str(child.get("id")) in requested
+                        if scope and not scope.expands(child_inside, found):
+                            continue
+                        child_future = pool.submit(_fetch_children, session, limiter, child.get("id"), journal)
+                        pending[child_future] = (child, depth + 1, child_inside)
+
+    finally:
+        pool.shutdown(wait=not expired, cancel_futures=True)
+
+    return categories
 
-            subcategories = data.get("category", {}).get("children", [])
+##########################################################################################################
+# Helper functions to fetch product listing and details ##################################################
+##########################################################################################################
 
-            category["subcategories"] = [
-                {
-                    "id": sub.get("id"),
-                    "text": sub.get("text"),
-                    "count": sub.get("count"),
-                    "imageId": sub.get("imageId")
-                }
-                for sub in subcategories
-            ]
+LISTING_PAGE_SIZE = 100
 
-        except requests.RequestException as e:
-            logging.error(f"\nError fetching subcategories for category {category_id}: {e} \n")
-            category["subcategories"] = []
+def _fetch_listing_page(session, limiter, sub_id, page, journal=None):
+    """
+    Fetches one listing page of a sub-subcategory.
 
-        all_data.append(category)
+    Parameters:
+        session (requests.Session) - Shared HTTP session.
+        limiter (HostLimiter) - Global/per-host concurrency limiter.
+        sub_id (str) - Sub-subcategory ID.
+        page (int) - Page index, starting at 1.
+        journal (CrawlJournal) - Journal of finished work to resume from (optional).
 
-    return all_data
+    Returns:
+        List of raw product entries (empty when the page has no results).
+        None if the request failed.
+    """
+    key = f"{sub_id}:{page}"
+    if journal:
+        matches = journal.get("listing", key)
+        if matches is not None:
+            return matches
+
+    url = (
+        f"{BALDOR_BASE_URL}/api/products"
+        f"?include=results&language=en-US&pageIndex={page}"
+        f"&pageSize={LISTING_PAGE_SIZE}&category={sub_id}"
+    )
+    logging.info(f"  |     |     |_ sub_subcategory {sub_id} page {page}")
 
-##########################################################################################################
-# Funcrion to scrape sub-subcategory data ################################################################
-##########################################################################################################
+    try:
+        resp = _get(session, limiter, url, "listing")
+        resp.raise_for_status()
+        payload = resp.json()
+
+        raw = payload.get("results", {})
+        matches = raw.get("matches", raw if isinstance(raw, list) else [])
+
+        if journal:
+            journal.record("listing", key, matches)
+
+        return matches
 
-def fetch_subsubcategory_data(categories_with_subcategories):
+    except requests.RequestException as e:
+        logging.error(f" _ erro subSubCat {sub_id} page {page}: {e}")
+        return None
+
+def _listing_pages(subsubcat):
     """
-    Fetches sub-subcategory data for each subcategory in the provided list.
+    Number of listing pages requested up front for a sub-subcategory: the pages announced
+    by its product count and the empty page expected after them, which ends the listing.
 
     Parameters:
-        subcategories (list) - List of dictionaries containing subcategory information.
+        subsubcat (dict) - Sub-subcategory entry with "count".
 
     Returns:
-        Updated list with sub-subcategory data included in each subcategory.
-            - {here data from category},
-                - {here data from subcategory},
-                - sub_subcategory:
-                    - id: sub-subcategory ID
-                    - text: sub-subcategory name
-                    - count: number of products in the sub-subcategory
-                    - imageId: image ID for the sub-subcategory
-    
-    Example use:
-        data = fetch_subsubcategory_data(subcategories)
+        int, at least 1.
+    """
+    count = subsubcat.get("count") or 0
+    return -(-int(count) // LISTING_PAGE_SIZE) + 1
+
+def _collect_listing(session, limiter, subsubcat, futures, journal=None, scope=None):
+    """
+    Gathers the listing pages of a sub-subcategory in page order, stopping at the first
+    empty or failed page. The count may be out of date, so the length of a page is not
+    taken as the end of the listing; pages beyond the ones requested up front are fetched
+    sequentially.
+
+    Parameters:
+        session (requests.Session) - Shared HTTP session.
+        limiter (HostLimiter) - Global/per-host concurrency limiter.
+        subsubcat (dict) - Sub-subcategory entry.
+        futures (list) - Futures of the pages requested in parallel, in page order.
+        journal (CrawlJournal) - Journal of finished work to resume from (optional).
+        scope (CrawlScope) - Scope of the run; pages are not waited for beyond its time budget (optional).
+
+    Returns:
+        List of raw product entries, in page order.
+        None if the time budget ran out before the listing was complete.
+    """
+    sub_id = subsubcat.get("id")
+    matches = []
+    page = 0
+
+    for page, future in enumerate(futures, start=1):
+        try:
+            page_matches = future.result(timeout=scope.remaining if scope else None)
+        except TimeoutError:
+            if not scope.expired:
+                raise
+            for pending in futures:
+                pending.cancel()
+            return None
+        matches.extend(page_matches or [])
+        if not page_matches:
+            for pending in futures[page:]:
+                pending.cancel()
+            return matches
+
+    while True:
+        if scope and scope.expired:
+            return None
+        page += 1
+        page_matches = _fetch_listing_page(session, limiter, sub_id, page, journal)
+        matches.extend(page_matches or [])
+        if not page_matches:
+            return matches
+
+def _resolved(value):
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
+    Wraps an already known value in a finished Future, so journaled work can be consumed
+    like work still in flight.
+    """
+    future = Future()
+    future.set_result(value)
+    return future
+
+def _build_product(prod):
+    """
+    Builds the product dictionary from a raw listing entry.
+
+    Parameters:
+        prod (dict) - Raw product entry from the listing API.
+
+    Returns:
+        Product dictionary without the drawing and BOM fields.
+    """
+    code = prod.get("code")
+    imageId = prod.get("imageId") if prod.get("imageId") else None
+    product_data = {
+        "code"       : code,
+        "description": prod.get("description"),
+        "imageId"    : imageId,
+        "upc"        : prod.get("upc"),
+        "USD"        : prod.get("listPrice", {}).get("amount"),
+        "pdf"        : f"{BALDOR_BASE_URL}/api/products/{code}/infopacket",
+        "img"        : f"{BALDOR_BASE_URL}/api/images/{imageId}",
     }
 
-    for category in categories_with_subcategories:
-        subcategories = category.get("subcategories", [])
-        for subcat in subcategories:
-            subcat_id = subcat.get("id")
-            url = f"https://www.baldor.com/api/products?include=results&language=en-US&include=filters&include=category&pageSize=10&category={subcat_id}"
-            logging.info(f"  |     |_ Fetching sub-subcategories for subcategory ID: {subcat_id}")
-            logging.info(f"  |     |  |_ URL: {url}")
-
-            try:
-                response = requests.get(url, headers=headers)
-                response.raise_for_status()
-                data = response.json()
-
-                children = data.get("category", {}).get("children", [])
-                subcat["sub_subcategory"] = [
-                    {
-                        "id": child.get("id"),
-                        "text": child.get("text"),
-                        "count": child.get("count"),
-                        "imageId": child.get("imageId")
-                    }
-                    for child in children
-                ]
+    for attr in prod.get("attributes", []):
+        name   = (attr.get("name") or "").lower()
+        values = attr.get("values") or []
+        if values:
+            product_data[name] = values[0].get("value")
+
+    return product_data
+
+def _pick_drawing_number(xml_txt):
+    """
+    Reads the number of the dimension sheet (or of the first drawing listed) from the
+    drawings XML of a product.
+
+    Parameters:
+        xml_txt (str) - Drawings XML.
+
+    Returns:
+        The drawing number, or None if the product has no drawing.
+    """
+    root = ET.fromstring(xml_txt)
+    chosen_number = None
+
+    for drawing in root.findall(".//{*}Drawing"):
+        kind   = drawing.find("./{*}Kind")
+        number = drawing.find("./{*}Number")
+        if number is None:
+            continue
+
+        if kind is not None and kind.text == "DimensionSheet":
+            return number.text
+
+        if chosen_number is None:
+            chosen_number = number.text
+
+    return chosen_number
+
+def _fetch_drawing_url(session, limiter, code):
+    """
+    Picks the dimension sheet (or the first drawing available) for a product.
+
+    Parameters:
+        session (requests.Session) - Shared HTTP session.
+        limiter (HostLimiter) - Global/per-host concurrency limiter.
+        code (str) - Product code.
+
+    Returns:
+        URL of the chosen drawing, or None if there is none.
+    """
+    try:
+        dwg_list_url = f"{BALDOR_BASE_URL}/api/products/{code}/drawings"
+        resp = _get(
+            session, limiter, dwg_list_url, "drawings",
+            headers={"Accept": "application/xml"}
+        )
+
+        xml_txt = resp.text.strip()
+        chosen_number = None
+
+        if resp.ok and xml_txt.startswith("<"):
+            # Drawing lists are usually small enough to be parsed inline.
+            chosen_number = get_cpu_pool().run(_pick_drawing_number, xml_txt, size=len(xml_txt))
+
+        return (
+            f"{BALDOR_BASE_URL}/api/products/{code}/drawings/{chosen_number}"
+            if chosen_number else None
+        )
+
+    except Exception as e:
+        logging.warning(f"  |  |  |_ dwg {code}: {e}")
+        return None
+
+def _fetch_bom(session, limiter, code):
+    """
+    Reads the bill of materials from the product "parts" tab.
+
+    Parameters:
+        session (requests.Session) - Shared HTTP session.
+        limiter (HostLimiter) - Global/per-host concurrency limiter.
+        code (str) - Product code.
 
-            except requests.RequestException as e:
-                logging.error(f"Error fetching sub-subcategories for subcategory {subcat_id}: {e}")
-                subcat["sub_subcategory"] = []
+    Returns:
+        List of BOM items, each with part_number, description, and quantity.
+    """
+    try:
+        parts_url = f"{BALDOR_BASE_URL}/catalog/{code}?tab=%22parts%22"
+        html = _get(session, limiter, parts_url, "parts").text
 
-    return categories_with_subcategories
+        return get_cpu_pool().run(extract_bom, html, size=len(html))
+    except Exception as e:
+        logging.warning(f"  |  |  |_ bom {code}: {e}")
+        return []
 
 ##########################################################################################################
 # Funcrion to scrape product data ########################################################################
 ##########################################################################################################
 
-def fetch_products_data(data):
+def fetch_products_data(data, max_workers=MAX_WORKERS, max_per_host=MAX_PER_HOST, job=None, journal=None, scope=None, snapshot=None):
     """
     Fetches product data for each sub-subcategory in the provided data.
 
+    Listing pages, drawing lists and parts pages are requested concurrently by a bounded
+    worker pool; results are assembled in catalog order, so the output is the same as a
+    sequential crawl. Listing pages are requested at most max_workers pages ahead of the
+    sub-subcategory being read, so a run that stops early (product codes found, product
+    limit or time budget reached) does not request the rest of the catalog.
+
+    A scope restricts the run to some product codes and/or a maximum number of products,
+    and bounds it in time: once the budget runs out no new listing is read and only the
+    products whose details are already complete are kept. Sub-subcategories the run did
+    not reach are then left out of the returned tree.
+
+    Every collected product is recorded in the snapshot, when one is given. In incremental
+    mode, products whose listing fields (UPC, price, image, attributes) match the snapshot
+    reuse its drawing URL and BOM, so only new and changed products cost extra requests.
+
     Parameters:
         data (list) - List of dictionaries containing category and subcategory information.
+        max_workers (int) - Maximum number of concurrent requests.
+        max_per_host (int) - Maximum number of concurrent requests against a single host.
+        job (Job) - Background job to report progress to and check for cancellation (optional).
+        journal (CrawlJournal) - Journal of finished work; journaled listing pages and products
+            are not requested again (optional).
+        scope (CrawlScope) - Product codes, product limit and time budget of the run (optional).
+        snapshot (CrawlSnapshot) - Products of the previous run, to compare with and, in
+            incremental mode, to reuse unchanged details from (optional).
 
     Returns:
         Updated list with product data included in each sub-subcategory.
@@ -207,148 +470,157 @@ def fetch_products_data(data):
                         - bom: list of BOM items, each with part_number, description, and quantity
 
     Example use:
-        data = fetch_products_data(data)
+        data = fetch_products_data(data, max_workers=32, max_per_host=16)
     """
 
-    headers = {
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
-    }
+    session = get_http_session()
+    limiter = HostLimiter(max_total=max_workers, max_per_host=max_per_host)
+
+    subsubcats = [
+        subsubcat
+        for category in data
+        for subcat in category.get("subcategories", [])
+        for subsubcat in subcat.get("sub_subcategory", [])
+    ]
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crawl")
+    try:
+        # Listing page futures of each sub-subcategory, submitted ahead of the reader.
+        listings = []
+
+        def prefetch(position, allowance=None):
+            # With a product limit, listings announcing the remaining allowance are enough.
+            in_flight = sum(not f.done() for futures in listings[position:] for f in futures)
+            announced = sum(int(s.get("count") or 0) for s in subsubcats[position:len(listings)])
+            while len(listings) < len(subsubcats) and in_flight < max_workers:
+                if allowance is not None and announced >= allowance and len(listings) > position:
+                    break
+                subsubcat = subsubcats[len(listings)]
+                futures = [
+                    pool.submit(_fetch_listing_page, session, limiter, subsubcat.get("id"), page, journal)
+                    for page in range(1, _listing_pages(subsubcat) + 1)
+                ]
+                listings.append(futures)
+                in_flight += len(futures)
+                announced += int(subsubcat.get("count") or 0)
+
+        ########################################################################
+
+        selected = []
+        collected = 0
+        found_codes = set()
+        for index, subsubcat in enumerate(subsubcats):
+            if job:
+                job.check_cancelled()
+            # Sub-subcategories announcing no products cannot hold any beyond the limit.
+            if scope and scope.done(collected, found_codes, more=any(s.get("count", 1) for s in subsubcats[index:])):
+                break
+
+            prefetch(index, scope.max_products - collected if scope and scope.max_products is not None else None)
+            matches = _collect_listing(session, limiter, subsubcat, listings[index], journal, scope)
+            if matches is None:
+                break
+            if scope:
+                matches = scope.select_products(matches, collected)
+                found_codes.update(prod.get("code") for prod in matches)
+                if scope.products and not matches:
+                    continue
+
+            selected.append((subsubcat, matches))
+            collected += len(matches)
+
+        for pending in (f for futures in listings for f in futures):
+            pending.cancel()
+
+        ########################################################################
+
+        if job:
+            job.set_progress("products_done", 0)
+            job.set_progress("products_total", collected)
+
+        def submit_details(prod):
+            code = prod.get("code")
+            fields, reusable = snapshot.lookup(prod) if snapshot else (None, None)
+
+            finished = journal.get("product", code) if journal and code else None
+            if finished is not None:
+                return _build_product(prod), _resolved(finished["dwg"]), _resolved(finished["bom"]), True, fields, False
+
+            if reusable is not None:
+                return _build_product(prod), _resolved(reusable["dwg"]), _resolved(reusable["bom"]), True, fields, True
+
+            return (
+                _build_product(prod),
+                pool.submit(_fetch_drawing_url, session, limiter, code),
+                pool.submit(_fetch_bom, session, limiter, code),
+                False,
+                fields,
+                False,
+            )
+
+        details = [
+            [submit_details(prod) for prod in matches]
+            for subsubcat, matches in selected
+        ]
 
-    session = requests.Session()
-    session.headers.update(headers)
-
-    for category in data:
-        for subcat in category.get("subcategories", []):
-            for subsubcat in subcat.get("sub_subcategory", []):
-                sub_id   = subsubcat.get("id")
-                page     = 1
-                products = []
-
-                while True:
-                    url = (
-                        "https://www.baldor.com/api/products"
-                        f"?include=results&language=en-US&pageIndex={page}"
-                        f"&pageSize=100&category={sub_id}"
-                    )
-                    logging.info(f"  |     |     |_ sub_subcategory {sub_id} page {page}")
-
-                    try:
-                        resp = session.get(url, timeout=30)
-                        resp.raise_for_status()
-                        payload = resp.json()
-
-                        raw = payload.get("results", {})
-                        matches = raw.get("matches", raw if isinstance(raw, list) else [])
-
-                        if not matches:
-                            break
-
-                        for prod in matches:
-                            code = prod.get("code")
-                            imageId = prod.get("imageId") if prod.get("imageId") else None
-                            product_data = {
-                                "code"       : code,
-                                "description": prod.get("description"),
-                                "imageId"    : imageId,
-                                "upc"        : prod.get("upc"),
-                                "USD"        : prod.get("listPrice", {}).get("amount"),
-                                "pdf"        : f"https://www.baldor.com/api/products/{code}/infopacket",
-                                "img"        : f"https://www.baldor.com/api/images/{imageId}",
-                            }                        
-
-                            for attr in prod.get("attributes", []):
-                                name   = (attr.get("name") or "").lower()
-                                values = attr.get("values") or []
-                                if values:
-                                    product_data[name] = values[0].get("value")
-
-                            try:
-                                dwg_list_url = f"https://www.baldor.com/api/products/{code}/drawings"
-                                resp         = session.get(
-                                    dwg_list_url,
-                                    timeout=20,
-                                    headers={"Accept": "application/xml"}        
-                                )
-
-                                xml_txt = resp.text.strip()
-                                chosen_number = None
-
-                                if resp.ok and xml_txt.startswith("<"):
-                                    root = ET.fromstring(xml_txt)                
-
-                                    for drawing in root.findall(".//{*}Drawing"):
-                                        kind   = drawing.find("./{*}Kind")
-                                        number = drawing.find("./{*}Number")
-                                        if number is None:                      
-                                            continue
-
-                                        if kind is not None and kind.text == "DimensionSheet":
-                                            chosen_number = number.text
-                                            break
-
-                                        if chosen_number is None:
-                                            chosen_number = number.text
-
-                                product_data["dwg"] = (
-                                    f"https://www.baldor.com/api/products/{code}/drawings/{chosen_number}"
-                                    if chosen_number else None
-                                )
-
-                            except Exception as e:
-                                logging.warning(f"  |  |  |_ dwg {code}: {e}")
-                                product_data["dwg"] = None
-
-                            try:
-                                parts_url = f"https://www.baldor.com/catalog/{code}?tab=%22parts%22"
-                                html      = session.get(parts_url, timeout=20).text
-                                soup      = BeautifulSoup(html, "html.parser")
-
-                                bom = []
-                                rows = soup.select("table tbody tr")
-                                for r in rows:
-                                    cols = r.find_all("td")
-                                    if len(cols) >= 3:
-                                        part_number = cols[0].get_text(strip=True)
-                                        if not part_number:                    
-                                            continue
-
-                                        bom.append(
-                                            {
-                                                "part_number": part_number,
-                                                "description": cols[1].get_text(strip=True),
-                                                "quantity"   : cols[2].get_text(strip=True),
-                                            }
-                                        )
-
-                                product_data["bom"] = bom                     
-                            except Exception as e:
-                                logging.warning(f"  |  |  |_ bom {code}: {e}")
-                                product_data["bom"] = []
-
-                            products.append(product_data)
-
-                            logging.info(f"  |     |     |  |_ code {code}")
-                            logging.info(f"  |     |     |  |_ manual {f'https://www.baldor.com/api/products/{code}/infopacket'}")
-                            logging.info(f"  |     |     |  |_ drawing {f'https://www.baldor.com/api/products/{code}/drawings/{chosen_number}'}")
-                            logging.info(f"  |     |     |  |_ image {f'https://www.baldor.com/api/images/{imageId}'}")
-                            logging.info(f"  |     |     |  |_ bom {product_data['bom']}")
-
-                            ########################################################################
-
-                            if len(products) >= 15:
-                                logging.info("  |_ Limit of 15 products reached. Stopping collection.")
-                                subsubcat["product"] = products
-                                return data 
-
-                            ########################################################################
-
-                        page += 1  
-
-                    except requests.RequestException as e:
-                        logging.error(f" _ erro subSubCat {sub_id} page {page}: {e}")
-                        break
-
-                subsubcat["product"] = products or []
+        def finished(future):
+            return future.done() and not future.cancelled()
+
+        def cancel_details():
+            for _, pending_dwg, pending_bom, *_ in (entry for entries in details for entry in entries):
+                pending_dwg.cancel()
+                pending_bom.cancel()
+
+        expired = False
+        for (subsubcat, _), entries in zip(selected, details):
+            products = []
+            for product_data, dwg_future, bom_future, journaled, fields, reused in entries:
+                if job:
+                    job.check_cancelled()
+
+                if not expired and scope and scope.expired:
+                    # Out of time: stop waiting, keep only the products already complete.
+                    expired = True
+                    cancel_details()
+                if expired and not (finished(dwg_future) and finished(bom_future)):
+                    continue
+
+                code = product_data["code"]
+                try:
+                    product_data["dwg"] = dwg_future.result(timeout=scope.remaining if scope else None)
+                    product_data["bom"] = bom_future.result(timeout=scope.remaining if scope else None)
+                except TimeoutError:
+                    # Out of time while waiting: the product is left out, like the ones after it.
+                    if not scope.expired:
+                        raise
+                    expired = True
+                    cancel_details()
+                    continue
+                products.append(product_data)
+
+                if journal and code and not journaled:
+                    journal.record("product", code, {"dwg": product_data["dwg"], "bom": product_data["bom"]})
+                if snapshot and code:
+                    snapshot.record(code, fields, subsubcat.get("id"), product_data["dwg"], product_data["bom"], reused)
+
+                logging.info(f"  |     |     |  |_ code {code}")
+                logging.info(f"  |     |     |  |_ manual {product_data['pdf']}")
+                logging.info(f"  |     |     |  |_ drawing {product_data['dwg']}")
+                logging.info(f"  |     |     |  |_ image {product_data['img']}")
+                logging.info(f"  |     |     |  |_ bom {product_data['bom']}")
+
+                PRODUCTS_PROCESSED.inc()
+                if job:
+                    job.advance("products_done")
+
+            if products or not expired:
+                subsubcat["product"] = products
+
+    finally:
+        # Requests still in flight when the budget ran out are not waited for.
+        pool.shutdown(wait=not (scope and scope.truncated == "time_budget"), cancel_futures=True)
+
+    if scope:
+        data = prune_unvisited(data)
 
     return data
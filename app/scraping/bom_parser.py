@@ -0,0 +1,166 @@
+import os
+import re
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+BOM_PARSER = os.getenv("BOM_PARSER", "auto")
+
+BOM_BACKENDS = ("auto", "targeted", "lxml", "html.parser")
+
+_TABLE_START = re.compile(r"<table\b", re.I)
+_TABLE_END = re.compile(r"</table\s*>", re.I)
+_TAG = re.compile(r"<(/?)([a-z][a-z0-9:-]*)", re.I)
+_TABLE_TAGS = {"table", "thead", "tbody", "tfoot", "tr", "td", "th"}
+# Comments, scripts, styles and templates, written as unrolled loops so the page is scanned once.
+_IGNORED = re.compile(r"<!--[^-]*(?:-(?!->)[^-]*)*-->|<(script|style|template)\b[^<]*(?:<(?!/\1)[^<]*)*</\1\s*>", re.I)
+
+# Text nodes BeautifulSoup leaves out of get_text().
+_CELL_TEXT = ".//text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::template)]"
+
+##########################################################################################################
+# Helper functions to read BOM rows with each parser #####################################################
+##########################################################################################################
+
+def _bom_row(part_number, description, quantity):
+    return {
+        "part_number": part_number,
+        "description": description,
+        "quantity"   : quantity,
+    }
+
+def _bom_html_parser(html):
+    """
+    Reference extractor: BeautifulSoup with Python's html.parser over the given markup.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+
+    bom = []
+    for r in soup.select("table tbody tr"):
+        cols = r.find_all("td")
+        if len(cols) >= 3:
+            part_number = cols[0].get_text(strip=True)
+            if not part_number:
+                continue
+
+            bom.append(_bom_row(part_number, cols[1].get_text(strip=True), cols[2].get_text(strip=True)))
+
+    return bom
+
+def _bom_lxml(html):
+    """
+    Same selection as _bom_html_parser ("table tbody tr", descendant "td" cells, stripped
+    text joined without separator) on top of lxml's C parser.
+    """
+    if not html.strip():
+        return []
+
+    root = lxml.html.fromstring(html)
+
+    bom = []
+    for r in root.xpath("//table//tbody//tr"):
+        cols = r.xpath(".//td")
+        if len(cols) >= 3:
+            text = ["".join(s.strip() for s in col.xpath(_CELL_TEXT)) for col in cols[:3]]
+            if not text[0]:
+                continue
+
+            bom.append(_bom_row(*text))
+
+    return bom
+
+def _table_region(html):
+    """
+    Slice of the page going from the first <table> to the end of the last </table> (or to
+    the end of the page when the last table is never closed), or None when the page has no
+    table at all.
+    """
+    start = _TABLE_START.search(html)
+    if start is None:
+        return None
+
+    last_start = start
+    for last_start in _TABLE_START.finditer(html, start.start()):
+        pass
+
+    end = None
+    for end in _TABLE_END.finditer(html, last_start.start()):
+        pass
+    return html[start.start():end.end() if end else len(html)]
+
+def _is_well_formed(region):
+    """
+    True when the table markup can be parsed on its own with the same result as the whole
+    page: table tags are explicitly closed and properly nested, and no end tag refers to an
+    element opened outside the region. html.parser does not close implied end tags (e.g.
+    "<td>1<td>2") the way lxml does, so other markup goes through html.parser unchanged.
+    """
+    stack = []
+    opened = {}
+    for closing, tag in _TAG.findall(region):
+        tag = tag.lower()
+        if not closing:
+            opened[tag] = opened.get(tag, 0) + 1
+            if tag in _TABLE_TAGS:
+                stack.append(tag)
+            continue
+
+        if not opened.get(tag):
+            return False
+        opened[tag] -= 1
+        if tag in _TABLE_TAGS and (not stack or stack.pop() != tag):
+            return False
+
+    return not stack
+
+##########################################################################################################
+# Function to extract the bill of materials from a catalog page ##########################################
+##########################################################################################################
+
+def extract_bom(html, backend=None):
+    """
+    Reads the bill of materials from the "parts" tab of a Baldor catalog page.
+
+    Backends:
+        - html.parser: BeautifulSoup over the whole page (reference behaviour).
+        - lxml: lxml over the whole page.
+        - targeted: isolates the table markup and, when lxml is installed and the tables are
+          well formed, parses only that with lxml; otherwise falls back to html.parser.
+        - auto: targeted.
+
+    Parameters:
+        html (str) - Catalog page HTML.
+        backend (str) - One of BOM_BACKENDS; defaults to the BOM_PARSER environment variable.
+
+    Returns:
+        List of BOM items, each with part_number, description, and quantity.
+
+    Example use:
+        bom = extract_bom(html)
+    """
+    backend = backend or BOM_PARSER
+    if backend not in BOM_BACKENDS:
+        raise ValueError(f"Unsupported BOM parser: {backend}")
+
+    if backend == "html.parser" or (backend == "lxml" and lxml is None):
+        return _bom_html_parser(html)
+
+    if backend == "lxml":
+        return _bom_lxml(html)
+
+    # Tables inside comments, scripts and styles are not part of the page.
+    region = _table_region(_IGNORED.sub("", html))
+    if region is None:
+        return []
+
+    if lxml is None or not _is_well_formed(region):
+        return _bom_html_parser(html)
+
+    if not re.search(r"<tbody\b", region, re.I):
+        return []
+
+    return _bom_lxml(region)
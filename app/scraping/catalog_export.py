@@ -0,0 +1,321 @@
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from scraping.baldor_output import ASSET_FILES, product_specs
+
+CATALOG_EXPORT = os.getenv("CATALOG_EXPORT", "sqlite")
+CATALOG_SQLITE = os.getenv("CATALOG_SQLITE", "data/catalog.sqlite")
+CATALOG_PARQUET_DIR = os.getenv("CATALOG_PARQUET_DIR", "data/catalog_parquet")
+
+EXPORT_FORMATS = ("sqlite", "parquet")
+
+# Columns of each table, in the order of the rows built by catalog_rows.
+TABLES = {
+    "categories": ("id", "parent_id", "level", "name", "count"),
+    "products": ("code", "name", "description", "upc", "usd", "manual_url", "cad_url", "image_url"),
+    "product_categories": ("code", "category_id", "subcategory_id", "sub_subcategory_id", "position"),
+    "specs": ("code", "name", "value"),
+    "spec_terms": ("code", "name", "term"),
+    "bom_lines": ("code", "line", "part_number", "description", "quantity"),
+    "assets": ("code", "kind", "path", "sha256", "url"),
+}
+
+SCHEMA = """
+CREATE TABLE categories (
+    id TEXT PRIMARY KEY, parent_id TEXT, level INTEGER NOT NULL, name TEXT, count INTEGER
+);
+CREATE TABLE products (
+    code TEXT PRIMARY KEY, name TEXT, description TEXT, upc TEXT, usd REAL,
+    manual_url TEXT, cad_url TEXT, image_url TEXT
+);
+CREATE TABLE product_categories (
+    code TEXT NOT NULL, category_id TEXT, subcategory_id TEXT, sub_subcategory_id TEXT,
+    position INTEGER NOT NULL
+);
+CREATE TABLE specs (
+    code TEXT NOT NULL, name TEXT NOT NULL, value TEXT
+);
+CREATE TABLE spec_terms (
+    code TEXT NOT NULL, name TEXT NOT NULL, term TEXT NOT NULL
+);
+CREATE TABLE bom_lines (
+    code TEXT NOT NULL, line INTEGER NOT NULL, part_number TEXT, description TEXT, quantity TEXT
+);
+CREATE TABLE assets (
+    code TEXT NOT NULL, kind TEXT NOT NULL, path TEXT, sha256 TEXT, url TEXT
+);
+CREATE TABLE export_info (
+    key TEXT PRIMARY KEY, value TEXT
+);
+CREATE INDEX categories_parent ON categories (parent_id);
+CREATE INDEX products_upc ON products (upc);
+CREATE INDEX product_categories_code ON product_categories (code);
+CREATE INDEX product_categories_category ON product_categories (category_id);
+CREATE INDEX product_categories_subcategory ON product_categories (subcategory_id);
+CREATE INDEX product_categories_sub_subcategory ON product_categories (sub_subcategory_id, position);
+CREATE INDEX specs_code ON specs (code);
+CREATE INDEX specs_name_value ON specs (name, value);
+CREATE INDEX spec_terms_name_term ON spec_terms (name, term, code);
+CREATE INDEX bom_lines_code ON bom_lines (code, line);
+CREATE INDEX bom_lines_part_number ON bom_lines (part_number);
+CREATE INDEX assets_code ON assets (code);
+CREATE INDEX assets_sha256 ON assets (sha256);
+"""
+
+##########################################################################################################
+# Helper function to flatten the catalog into table rows #################################################
+##########################################################################################################
+
+_UNIT = re.compile(r"^([\d.]+) ?(hp|v|vac|rpm)$")
+_SPEC_PART = re.compile(r"^[\d.]+(-[\d.]+)? ?[a-z]*$")
+
+def spec_term(value):
+    """
+    Normalized form of a spec value or of a query on it: lower case, single spaces, and the
+    unit dropped from a plain number ("5 HP" -> "5", "460V" -> "460").
+    """
+    value = re.sub(r"\s+", " ", str(value).strip().lower())
+    match = _UNIT.match(value)
+    return match.group(1) if match else value
+
+def spec_terms(value):
+    """
+    Terms a spec value can be searched by: the whole value and, for lists of values such
+    as "230/460", each of them.
+
+    Parameters:
+        value (str) - Spec value.
+
+    Returns:
+        set of normalized terms (empty for a missing value).
+
+    Example use:
+        spec_terms("230/460")  # {"230/460", "230", "460"}
+    """
+    if value in (None, ""):
+        return set()
+
+    terms = {spec_term(value)}
+    parts = [spec_term(part) for part in re.split(r"[/,]", str(value))]
+    if len(parts) > 1 and all(_SPEC_PART.match(part) for part in parts):
+        terms.update(parts)
+    return terms
+
+def _number(value):
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+def catalog_rows(data):
+    """
+    Flattens the crawl tree into the rows of the normalized tables (see TABLES): the
+    category hierarchy, one row per product, its place in the hierarchy (a product listed
+    in several sub-subcategories has one row for each), its specs (and the terms they can
+    be searched by, see spec_terms), BOM lines and assets.
+
+    Parameters:
+        data (list) - Category tree after output_formater (ProductRecords, or product dicts
+            carrying their "bom", "assets" and "hashes").
+
+    Returns:
+        dict mapping each table name to its list of row tuples.
+
+    Example use:
+        rows = catalog_rows(data)
+        len(rows["products"])
+    """
+    rows = {table: [] for table in TABLES}
+    seen = set()
+
+    for category in data:
+        cat_id = str(category.get("id"))
+        rows["categories"].append((cat_id, None, 0, category.get("text"), category.get("count")))
+
+        for subcat in category.get("subcategories", []):
+            sub_id = str(subcat.get("id"))
+            rows["categories"].append((sub_id, cat_id, 1, subcat.get("text"), subcat.get("count")))
+
+            for subsub in subcat.get("sub_subcategory", []):
+                subsub_id = str(subsub.get("id"))
+                rows["categories"].append((subsub_id, sub_id, 2, subsub.get("text"), subsub.get("count")))
+
+                for position, product in enumerate(subsub.get("product", [])):
+                    code = product.get("code")
+                    if not code:
+                        continue
+
+                    rows["product_categories"].append((code, cat_id, sub_id, subsub_id, position))
+                    if code in seen:
+                        continue
+                    seen.add(code)
+
+                    rows["products"].append((
+                        code,
+                        product.get("name"),
+                        product.get("description"),
+                        product.get("upc"),
+                        _number(product.get("USD")),
+                        product.get("pdf"),
+                        product.get("dwg"),
+                        product.get("img"),
+                    ))
+
+                    for name, value in (product.get("specs") or product_specs(product)).items():
+                        rows["specs"].append((code, name, value))
+                        for term in sorted(spec_terms(value)):
+                            rows["spec_terms"].append((code, name, term))
+
+                    for line, item in enumerate(product.get("bom") or [], start=1):
+                        rows["bom_lines"].append(
+                            (code, line, item.get("part_number"), item.get("description"), item.get("quantity"))
+                        )
+
+                    assets = product.get("assets") or {}
+                    hashes = product.get("hashes") or {}
+                    urls = {"manual": product.get("pdf"), "cad": product.get("dwg"), "image": product.get("img")}
+                    for kind in ASSET_FILES:
+                        rows["assets"].append((code, kind, assets.get(kind), hashes.get(kind), urls[kind]))
+
+    return rows
+
+##########################################################################################################
+# Functions to write the catalog to SQLite and Parquet ###################################################
+##########################################################################################################
+
+def write_sqlite(rows, path=CATALOG_SQLITE):
+    """
+    Writes the catalog tables to a new SQLite database, with indexes on product code,
+    category ids, UPC, spec values and BOM part numbers, and atomically replaces the
+    previous database once it is complete.
+
+    Parameters:
+        rows (dict) - Table rows from catalog_rows.
+        path (str) - Path of the database.
+
+    Returns:
+        str - Path of the database.
+
+    Example use:
+        write_sqlite(catalog_rows(data), "data/catalog.sqlite")
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".part")
+    os.close(fd)
+
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(SCHEMA)
+            for table, columns in TABLES.items():
+                placeholders = ", ".join("?" for _ in columns)
+                conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows[table]
+                )
+            conn.executemany("INSERT INTO export_info (key, value) VALUES (?, ?)", [
+                ("exported_at", datetime.now(timezone.utc).isoformat()),
+                ("products", str(len(rows["products"]))),
+            ])
+            conn.commit()
+            conn.execute("ANALYZE")
+        finally:
+            conn.close()
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return str(path)
+
+def write_parquet(rows, directory=CATALOG_PARQUET_DIR):
+    """
+    Writes one Parquet file per catalog table (<directory>/<table>.parquet), each one
+    replaced atomically. Requires pyarrow.
+
+    Parameters:
+        rows (dict) - Table rows from catalog_rows.
+        directory (str) - Folder of the Parquet files.
+
+    Returns:
+        str - Path of the folder.
+
+    Example use:
+        write_parquet(catalog_rows(data), "data/catalog_parquet")
+    """
+    if pyarrow is None:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow).")
+
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    for table, columns in TABLES.items():
+        table_data = pyarrow.Table.from_pydict(
+            {column: [row[i] for row in rows[table]] for i, column in enumerate(columns)}
+        )
+        path = os.path.join(directory, f"{table}.parquet")
+        tmp_path = os.path.join(directory, f".{table}.parquet.part")
+        pyarrow.parquet.write_table(table_data, tmp_path)
+        os.replace(tmp_path, path)
+
+    return str(directory)
+
+##########################################################################################################
+# Function to export the collected catalog ###############################################################
+##########################################################################################################
+
+def export_catalog(data, formats=None, sqlite_path=CATALOG_SQLITE, parquet_dir=CATALOG_PARQUET_DIR):
+    """
+    Exports the collected catalog to normalized tables (categories, products,
+    product_categories, specs, bom_lines, assets) in SQLite and/or Parquet, so it can be
+    loaded or queried without parsing the JSON outputs.
+
+    Parameters:
+        data (list) - Category tree after output_formater.
+        formats (list) - Any of EXPORT_FORMATS; CATALOG_EXPORT (comma-separated, "sqlite"
+            by default, "none" to disable) when not given.
+        sqlite_path (str) - Path of the SQLite database.
+        parquet_dir (str) - Folder of the Parquet files.
+
+    Returns:
+        dict mapping each written format to its path.
+
+    Example use:
+        paths = export_catalog(data, formats=["sqlite", "parquet"])
+    """
+    if formats is None:
+        formats = [f.strip() for f in CATALOG_EXPORT.split(",") if f.strip() and f.strip() != "none"]
+
+    unknown = set(formats) - set(EXPORT_FORMATS)
+    if unknown:
+        raise ValueError(f"Unsupported export formats: {sorted(unknown)}")
+    if not formats:
+        return {}
+
+    rows = catalog_rows(data)
+    paths = {}
+
+    if "sqlite" in formats:
+        paths["sqlite"] = write_sqlite(rows, sqlite_path)
+
+    if "parquet" in formats:
+        if pyarrow is None:
+            logging.warning("  |_ Parquet export skipped: pyarrow is not installed.")
+        else:
+            paths["parquet"] = write_parquet(rows, parquet_dir)
+
+    logging.info(
+        f"  |_ Catalog exported ({len(rows['products'])} products, {len(rows['bom_lines'])} BOM lines): "
+        + ", ".join(f"{fmt} {path}" for fmt, path in paths.items())
+    )
+    return paths
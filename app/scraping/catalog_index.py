@@ -0,0 +1,209 @@
+import base64
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from scraping.baldor_output import ASSET_FILES
+from scraping.catalog_export import CATALOG_SQLITE, spec_term
+from utils.generations import current_generation
+
+SPEC_FILTERS = ("hp", "voltage", "rpm", "frame")
+
+##########################################################################################################
+# Helper functions to encode pagination cursors ##########################################################
+##########################################################################################################
+
+def encode_cursor(code):
+    return base64.urlsafe_b64encode(code.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """
+    Product code a cursor points after; raises ValueError for a malformed cursor.
+    """
+    try:
+        return base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode("utf-8")
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+##########################################################################################################
+# Class to query the exported catalog ####################################################################
+##########################################################################################################
+
+class CatalogIndex:
+    """
+    Read-only queries over the SQLite catalog written by export_catalog, i.e. the products
+    of the last complete collection run: the current generation, which partial runs (scoped
+    or truncated) never replace, so products do not disappear because a run skipped them.
+
+    Each thread keeps its own connection, reopened when a new generation is published (or
+    the export replaces the database), so a query never sees a half-written catalog and
+    always reads the latest complete one.
+
+    Parameters:
+        path (str) - Path of the SQLite catalog; by default the one of the current
+            generation, or CATALOG_SQLITE before the first generation is published.
+
+    Example use:
+        index = CatalogIndex()
+        page = index.search({"voltage": "460", "frame": "56C"}, limit=20)
+        product = index.get(page["items"][0]["product_id"])
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        """
+        Connection of the calling thread to the current database file.
+
+        Raises:
+            FileNotFoundError - No catalog has been exported yet.
+        """
+        path = self.path
+        if path is None:
+            generation = current_generation()
+            path = generation.catalog_sqlite if generation else CATALOG_SQLITE
+
+        stat = os.stat(path)
+        version = (str(path), stat.st_ino, stat.st_mtime_ns)
+
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.version == version:
+            return conn
+        if conn is not None:
+            conn.close()
+
+        conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        self._local.conn = conn
+        self._local.version = version
+        return conn
+
+    ######################################################################################################
+
+    def search(self, filters=None, cursor=None, limit=50):
+        """
+        Products matching all the given filters, in product code order, one page at a time.
+
+        Parameters:
+            filters (dict) - Any of:
+                - hp, voltage, rpm, frame: spec value, or one of its values for lists
+                  such as "230/460"; case and units are ignored ("460V" matches "230/460").
+                - category: category, subcategory or sub-subcategory id.
+                - upc: exact UPC.
+                - part_number: part number of one of the BOM lines.
+            cursor (str) - next_cursor of the previous page (optional).
+            limit (int) - Maximum number of products in the page.
+
+        Returns:
+            dict with "items" (product summaries: code, name, description, UPC, price and
+            specs) and "next_cursor" (None on the last page).
+
+        Raises:
+            ValueError - Malformed cursor.
+        """
+        filters = {name: value for name, value in (filters or {}).items() if value not in (None, "")}
+
+        where, params = [], []
+        for name in SPEC_FILTERS:
+            if name in filters:
+                where.append("p.code IN (SELECT code FROM spec_terms WHERE name = ? AND term = ?)")
+                params += [name, spec_term(filters[name])]
+        if "category" in filters:
+            category = str(filters["category"])
+            where.append(
+                "p.code IN (SELECT code FROM product_categories"
+                " WHERE category_id = ? OR subcategory_id = ? OR sub_subcategory_id = ?)"
+            )
+            params += [category, category, category]
+        if "upc" in filters:
+            where.append("p.upc = ?")
+            params.append(str(filters["upc"]))
+        if "part_number" in filters:
+            where.append("p.code IN (SELECT code FROM bom_lines WHERE part_number = ?)")
+            params.append(str(filters["part_number"]))
+        if cursor:
+            where.append("p.code > ?")
+            params.append(decode_cursor(cursor))
+
+        sql = "SELECT p.code, p.name, p.description, p.upc, p.usd FROM products p"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY p.code LIMIT ?"
+
+        conn = self._connect()
+        rows = conn.execute(sql, params + [limit + 1]).fetchall()
+        page = rows[:limit]
+
+        specs = self._specs(conn, [row["code"] for row in page])
+        items = [self._summary(row, specs.get(row["code"], {})) for row in page]
+
+        return {
+            "items": items,
+            "next_cursor": encode_cursor(page[-1]["code"]) if len(rows) > limit else None,
+        }
+
+    def get(self, code):
+        """
+        Full record of one product: summary, categories, BOM lines and assets (paths,
+        SHA-256 hashes and source URLs).
+
+        Parameters:
+            code (str) - Product code.
+
+        Returns:
+            dict, or None if the product is not in the catalog.
+        """
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT code, name, description, upc, usd FROM products WHERE code = ?", (code,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        product = self._summary(row, self._specs(conn, [code]).get(code, {}))
+        product["categories"] = [
+            dict(category) for category in conn.execute(
+                "SELECT category_id, subcategory_id, sub_subcategory_id FROM product_categories"
+                " WHERE code = ? ORDER BY category_id, subcategory_id, sub_subcategory_id", (code,)
+            )
+        ]
+        product["bom"] = [
+            dict(line) for line in conn.execute(
+                "SELECT part_number, description, quantity FROM bom_lines WHERE code = ? ORDER BY line", (code,)
+            )
+        ]
+
+        assets = {kind: None for kind in ASSET_FILES}
+        hashes = dict(assets)
+        urls = dict(assets)
+        for asset in conn.execute("SELECT kind, path, sha256, url FROM assets WHERE code = ?", (code,)):
+            assets[asset["kind"]] = asset["path"]
+            hashes[asset["kind"]] = asset["sha256"]
+            urls[asset["kind"]] = asset["url"]
+        product.update({"assets": assets, "hashes": hashes, "source_urls": urls})
+
+        return product
+
+    @staticmethod
+    def _specs(conn, codes):
+        specs = {}
+        for start in range(0, len(codes), 500):
+            chunk = codes[start:start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            for row in conn.execute(f"SELECT code, name, value FROM specs WHERE code IN ({placeholders})", chunk):
+                specs.setdefault(row["code"], {})[row["name"]] = row["value"]
+        return specs
+
+    @staticmethod
+    def _summary(row, specs):
+        return {
+            "product_id": row["code"],
+            "name": row["name"],
+            "description": row["description"],
+            "upc": row["upc"],
+            "USD": row["usd"],
+            "specs": {name: specs.get(name) for name in SPEC_FILTERS},
+        }
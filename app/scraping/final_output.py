@@ -1,17 +1,30 @@
 import json
 from pathlib import Path
+import tempfile
 import logging
+import os
+
+from utils.base64_converter import iter_base64
+from utils.serializer import LazyList, RawString, OUTPUT_PRETTY, iter_json
+from scraping.product_record import ProductRecord
 
 ##########################################################################################################
 # Funcrion to format final output ########################################################################
 ##########################################################################################################
 
-def build_final_output(data):
+def build_final_output(data, output_dir="output", assets_mode="reference"):
     """
     Merge detailed product JSONs back into the original category hierarchy structure.
 
+    Products formatted in this run are taken from their ProductRecord; only plain product
+    entries (e.g. a catalog tree read back from disk) load their JSON from output_dir.
+
     Parameters:
         data (List[dict]) - Hierarchical data with categories → subcategories → sub-subcategories → product codes.
+        output_dir (str) - Folder holding the product JSONs and assets.
+        assets_mode (str) - "reference" for the asset paths and hashes only, or "inline" to
+            also embed the documents as base64 (read from disk, all kept in memory; prefer
+            write_final_output for large catalogs).
 
     Returns:
         List[dict] - Complete nested structure with product JSONs fully embedded.
@@ -20,17 +33,6 @@ def build_final_output(data):
         final_output = build_final_output(data)
     """
 
-    product_jsons = {}
-    for file in Path("output").glob("*.json"):
-        try:
-            with open(file, "r", encoding="utf-8") as f:
-                prod_data = json.load(f)
-                code = prod_data.get("product_id")
-                if code:
-                    product_jsons[code] = prod_data
-        except Exception as e:
-            logging.error(f"  |  |_ Error loading product JSON {file}: {e}")
-
     final_structure = []
 
     for category in data:
@@ -58,9 +60,16 @@ def build_final_output(data):
                 }
 
                 for product in subsub.get("product", []):
-                    code = product.get("code")
-                    if code in product_jsons:
-                        subsub_entry["product"].append(product_jsons[code])
+                    prod_data = _product_data(product, output_dir)
+                    if prod_data is None:
+                        continue
+
+                    docs_base64 = prod_data.pop("docs_base64", None)
+                    if assets_mode == "inline":
+                        prod_data["docs_base64"] = (
+                            product.docs_base64(output_dir) if isinstance(product, ProductRecord) else docs_base64
+                        )
+                    subsub_entry["product"].append(prod_data)
 
                 subcat_entry["sub_subcategory"].append(subsub_entry)
             cat_entry["subcategories"].append(subcat_entry)
@@ -68,3 +77,218 @@ def build_final_output(data):
         final_structure.append(cat_entry)
 
     return final_structure
+
+
+##########################################################################################################
+# Helper function to load a single product JSON ##########################################################
+##########################################################################################################
+
+def _load_product(code, output_dir="output"):
+    """
+    Loads the detailed JSON of one product, or None if it was not generated.
+    """
+    path = Path(output_dir) / f"{code}.json"
+    if not path.is_file():
+        return None
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logging.error(f"  |  |_ Error loading product JSON {path}: {e}")
+        return None
+
+def _product_data(product, output_dir="output"):
+    """
+    Product JSON of a tree entry: built from its ProductRecord when it has one, loaded from
+    output_dir otherwise.
+    """
+    if isinstance(product, ProductRecord):
+        return product.to_dict()
+    return _load_product(product.get("code"), output_dir)
+
+def _product_value(product, assets_mode, output_dir="output"):
+    """
+    Value serialized for one product, or None when its JSON is missing. In "inline" mode the
+    documents become RawStrings read chunk by chunk from the asset files as the output is
+    written, so a product never holds its encoded documents in memory; in "reference" mode
+    only the asset paths and hashes are kept.
+    """
+    prod_data = _product_data(product, output_dir)
+    if prod_data is None:
+        return None
+
+    docs_base64 = prod_data.pop("docs_base64", None)
+    if assets_mode == "reference":
+        return prod_data
+
+    if docs_base64 is None:
+        docs_base64 = {}
+        for kind, rel_path in (prod_data.get("assets") or {}).items():
+            path = Path(output_dir) / rel_path if rel_path else None
+            docs_base64[kind] = RawString(iter_base64(path, path.suffix)) if path and path.is_file() else None
+    prod_data["docs_base64"] = docs_base64
+    return prod_data
+
+def _products(products, assets_mode, output_dir="output"):
+    for product in products:
+        value = _product_value(product, assets_mode, output_dir)
+        if value is not None:
+            yield value
+
+##########################################################################################################
+# Function to stream the final output ####################################################################
+##########################################################################################################
+
+def iter_final_output(data, fmt="json", output_dir="output", assets_mode="inline", pretty=OUTPUT_PRETTY):
+    """
+    Generates the final output incrementally, one product at a time, so memory use does not
+    grow with the size of the catalog. Products held as ProductRecords are serialized from
+    memory and the others are loaded from their JSON file; documents are read from the asset
+    files as they are written out.
+
+    Parameters:
+        data (List[dict]) - Hierarchical data with categories → subcategories → sub-subcategories → product codes.
+        fmt (str) - "json" for the same nested structure as build_final_output, or "ndjson"
+            for one line per product carrying its category ids and names.
+        output_dir (str) - Folder holding the product JSONs.
+        assets_mode (str) - "inline" to embed the documents as base64, or "reference" to
+            return only the asset paths and hashes.
+        pretty (bool) - Indent the "json" output with 2 spaces instead of the compact form
+            (OUTPUT_PRETTY by default); "ndjson" is always compact.
+
+    Returns:
+        Iterator of str chunks.
+
+    Example use:
+        for chunk in iter_final_output(data, "ndjson"):
+            stream.write(chunk)
+    """
+
+    if fmt == "ndjson":
+        for category in data:
+            for subcat in category.get("subcategories", []):
+                for subsub in subcat.get("sub_subcategory", []):
+                    for product in subsub.get("product", []):
+                        prod_data = _product_value(product, assets_mode, output_dir)
+                        if prod_data is None:
+                            continue
+
+                        yield from iter_json({
+                            "category_id": category.get("id"),
+                            "category_name": category.get("text"),
+                            "subcategory_id": subcat.get("id"),
+                            "subcategory_name": subcat.get("text"),
+                            "sub_subcategory_id": subsub.get("id"),
+                            "sub_subcategory_name": subsub.get("text"),
+                            "product": prod_data,
+                        }, pretty=False)
+                        yield "\n"
+        return
+
+    if fmt != "json":
+        raise ValueError(f"Unsupported output format: {fmt}")
+
+    yield from iter_json(LazyList(
+        {
+            "category_id": category.get("id"),
+            "name": category.get("text"),
+            "count": category.get("count"),
+            "subcategories": LazyList(
+                {
+                    "subcategory_id": subcat.get("id"),
+                    "name": subcat.get("text"),
+                    "count": subcat.get("count"),
+                    "sub_subcategory": LazyList(
+                        {
+                            "sub_subcategory_id": subsub.get("id"),
+                            "name": subsub.get("text"),
+                            "count": subsub.get("count"),
+                            "product": LazyList(_products(subsub.get("product", []), assets_mode, output_dir)),
+                        }
+                        for subsub in subcat.get("sub_subcategory", [])
+                    ),
+                }
+                for subcat in category.get("subcategories", [])
+            ),
+        }
+        for category in data
+    ), pretty=pretty)
+
+##########################################################################################################
+# Function to write the final output to disk #############################################################
+##########################################################################################################
+
+def write_final_output(data, path, fmt="json", output_dir="output", assets_mode="inline", pretty=OUTPUT_PRETTY):
+    """
+    Streams the final output to a file, replacing it atomically once complete.
+
+    Parameters:
+        data (List[dict]) - Hierarchical data with categories → subcategories → sub-subcategories → product codes.
+        path (str) - Destination file.
+        fmt (str) - "json" or "ndjson" (see iter_final_output).
+        output_dir (str) - Folder holding the product JSONs.
+        assets_mode (str) - "inline" or "reference" (see iter_final_output).
+        pretty (bool) - Indented instead of compact JSON (see iter_final_output).
+
+    Returns:
+        str - Path of the written file.
+
+    Example use:
+        write_final_output(data, "data/final_output.json")
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=path.parent, prefix=f".{path.name}.", suffix=".part", delete=False
+    ) as tmp:
+        for chunk in iter_final_output(data, fmt, output_dir, assets_mode, pretty):
+            tmp.write(chunk)
+    os.replace(tmp.name, path)
+
+    return str(path)
+
+##########################################################################################################
+# Function to reduce the crawl tree to its catalog structure #############################################
+##########################################################################################################
+
+def catalog_tree(data):
+    """
+    Keeps only the category hierarchy and product codes of the crawl data, which is all the
+    final output needs to be rebuilt from the product JSONs.
+
+    Parameters:
+        data (List[dict]) - Hierarchical crawl data.
+
+    Returns:
+        List[dict] - Same hierarchy, with each product reduced to {"code": ...}.
+
+    Example use:
+        tree = catalog_tree(data)
+    """
+    return [
+        {
+            "id": category.get("id"),
+            "text": category.get("text"),
+            "count": category.get("count"),
+            "subcategories": [
+                {
+                    "id": subcat.get("id"),
+                    "text": subcat.get("text"),
+                    "count": subcat.get("count"),
+                    "sub_subcategory": [
+                        {
+                            "id": subsub.get("id"),
+                            "text": subsub.get("text"),
+                            "count": subsub.get("count"),
+                            "product": [{"code": product.get("code")} for product in subsub.get("product", [])],
+                        }
+                        for subsub in subcat.get("sub_subcategory", [])
+                    ],
+                }
+                for subcat in category.get("subcategories", [])
+            ],
+        }
+        for category in data
+    ]
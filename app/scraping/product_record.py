@@ -0,0 +1,143 @@
+from pathlib import Path
+
+from utils.base64_converter import encode_base64
+
+ASSET_FILES = {"manual": "manual.pdf", "cad": "cad.dwg", "image": "img.jpg"}
+SPEC_NAMES = ("hp", "voltage", "rpm", "frame")
+PRODUCT_NAME = "Motor AC Trifásico"
+
+##########################################################################################################
+# Class to hold a formatted product in memory ############################################################
+##########################################################################################################
+
+class ProductRecord:
+    """
+    Compact in-memory form of a formatted product: metadata and asset references only.
+
+    Specs, BOM lines, asset paths and hashes are kept as tuples on slots instead of nested
+    dicts, and the documents are never held: docs_base64() reads them from disk when a
+    serializer asks for them. Read access mirrors the product dicts of the crawl tree
+    (record.get("code"), record["bom"], ...), so the stages after output_formater work on
+    either form.
+
+    Parameters:
+        code (str) - Product code.
+        description (str) - Product description.
+        upc (str) - Product UPC.
+        usd (float) - List price in USD.
+        urls (tuple) - Source URLs of the manual, drawing and image.
+        specs (tuple) - Spec values, in SPEC_NAMES order.
+        bom (tuple) - BOM lines as (part_number, description, quantity).
+        assets (tuple) - Asset paths relative to the output folder, in ASSET_FILES order.
+        hashes (tuple) - SHA-256 of the assets, in ASSET_FILES order.
+
+    Example use:
+        record = ProductRecord.from_output(product, output_data)
+        json.dumps(record.to_dict())
+    """
+
+    __slots__ = ("code", "description", "upc", "usd", "urls", "specs", "bom", "assets", "hashes")
+
+    def __init__(self, code, description=None, upc=None, usd=None, urls=(None, None, None),
+                 specs=(None, None, None, None), bom=(), assets=(None, None, None), hashes=(None, None, None)):
+        self.code = code
+        self.description = description
+        self.upc = upc
+        self.usd = usd
+        self.urls = tuple(urls)
+        self.specs = tuple(specs)
+        self.bom = tuple(bom)
+        self.assets = tuple(assets)
+        self.hashes = tuple(hashes)
+
+    @classmethod
+    def from_output(cls, product, output_data):
+        """
+        Record of a product from its crawl dict (source URLs) and its formatted output data.
+        """
+        specs = output_data.get("specs") or {}
+        assets = output_data.get("assets") or {}
+        hashes = output_data.get("hashes") or {}
+        return cls(
+            code=output_data.get("product_id"),
+            description=output_data.get("description"),
+            upc=output_data.get("upc"),
+            usd=output_data.get("USD"),
+            urls=(product.get("pdf"), product.get("dwg"), product.get("img")),
+            specs=tuple(specs.get(name) for name in SPEC_NAMES),
+            bom=tuple(
+                (item.get("part_number"), item.get("description"), item.get("quantity"))
+                for item in output_data.get("bom") or []
+            ),
+            assets=tuple(assets.get(kind) for kind in ASSET_FILES),
+            hashes=tuple(hashes.get(kind) for kind in ASSET_FILES),
+        )
+
+    ######################################################################################################
+
+    def to_dict(self):
+        """
+        The product JSON written by output_formater, without the documents.
+        """
+        return {
+            "product_id": self.code,
+            "name": PRODUCT_NAME,
+            "description": self.description,
+            "upc": self.upc,
+            "USD": self.usd,
+            "specs": dict(zip(SPEC_NAMES, self.specs)),
+            "bom": self.bom_items(),
+            "assets": dict(zip(ASSET_FILES, self.assets)),
+            "hashes": dict(zip(ASSET_FILES, self.hashes)),
+        }
+
+    def bom_items(self):
+        return [
+            {"part_number": part_number, "description": description, "quantity": quantity}
+            for part_number, description, quantity in self.bom
+        ]
+
+    def docs_base64(self, output_dir="output"):
+        """
+        Reads and base64-encodes the documents of the product; None for a missing one.
+        """
+        docs = {}
+        for kind, rel_path in zip(ASSET_FILES, self.assets):
+            path = Path(output_dir) / rel_path if rel_path else None
+            docs[kind] = encode_base64(path, path.suffix) if path and path.is_file() else None
+        return docs
+
+    ######################################################################################################
+
+    def get(self, key, default=None):
+        field = _FIELDS.get(key)
+        return field(self) if field else default
+
+    def __getitem__(self, key):
+        field = _FIELDS.get(key)
+        if field is None:
+            raise KeyError(key)
+        return field(self)
+
+    def __contains__(self, key):
+        return key in _FIELDS
+
+    def __repr__(self):
+        return f"ProductRecord({self.code!r})"
+
+# Keys of the product dicts a record answers to.
+_FIELDS = {
+    "code": lambda r: r.code,
+    "product_id": lambda r: r.code,
+    "name": lambda r: PRODUCT_NAME,
+    "description": lambda r: r.description,
+    "upc": lambda r: r.upc,
+    "USD": lambda r: r.usd,
+    "pdf": lambda r: r.urls[0],
+    "dwg": lambda r: r.urls[1],
+    "img": lambda r: r.urls[2],
+    "specs": lambda r: dict(zip(SPEC_NAMES, r.specs)),
+    "bom": lambda r: r.bom_items(),
+    "assets": lambda r: dict(zip(ASSET_FILES, r.assets)),
+    "hashes": lambda r: dict(zip(ASSET_FILES, r.hashes)),
+}
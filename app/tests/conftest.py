@@ -0,0 +1,119 @@
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+APP_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(APP_DIR))
+
+from benchmarks.mock_baldor import MockBaldorServer, MockCatalog
+
+# 2 x 2 x 2 sub-subcategories of 5 products: 40 products, small assets.
+CATALOG = {"categories": 2, "subcategories": 2, "subsubcategories": 2, "products": 5, "asset_kb": 4,
+           "images": 5, "bom_parts": 5, "churn": 0.3}
+TOTAL = CATALOG["categories"] * CATALOG["subcategories"] * CATALOG["subsubcategories"] * CATALOG["products"]
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+##########################################################################################################
+# Mock Baldor site shared by the test session ############################################################
+##########################################################################################################
+
+_server = None
+
+def pytest_configure(config):
+    """
+    Starts the mock site before the app modules are imported, as they read their settings
+    (base URL, cache mode, rate limits) from the environment at import time.
+    """
+    global _server
+    _server = MockBaldorServer(("127.0.0.1", 0), MockCatalog(**CATALOG))
+    threading.Thread(target=_server.serve_forever, name="mock-baldor", daemon=True).start()
+
+    os.environ["BALDOR_BASE_URL"] = f"http://127.0.0.1:{_server.server_address[1]}"
+    os.environ["HTTP_CACHE_MODE"] = "bypass"
+    os.environ["RATE_LIMIT_INITIAL"] = "1000"
+    os.environ["RATE_LIMIT_MAX"] = "1000"
+    os.environ["CPU_WORKERS"] = "0"
+
+def pytest_unconfigure(config):
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+
+@pytest.fixture
+def mock_server():
+    """
+    The mock site, back at catalog revision 0 after the test.
+    """
+    yield _server
+    _server.catalog.revision = 0
+
+def requests_to(server, endpoint):
+    """
+    Requests served so far by the mock site for an endpoint class (listing, drawings, ...).
+    """
+    return server.stats()["requests"].get(endpoint, 0)
+
+##########################################################################################################
+# Working directory and app state of each test ###########################################################
+##########################################################################################################
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """
+    Runs each test in its own folder, where the app writes its generations, journal,
+    snapshot and caches, with fresh process-wide caches.
+    """
+    from utils import asset_cache, http_cache
+
+    monkeypatch.chdir(tmp_path)
+    http_cache.set_response_cache(None)
+    monkeypatch.setattr(asset_cache, "_cache", None)
+    yield tmp_path
+    if asset_cache._cache is not None:
+        asset_cache._cache.close()
+    http_cache.set_response_cache(None)
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+@pytest.fixture
+def job(client):
+    """
+    A full collection run through the API, finished.
+    """
+    job = collect(client)
+    assert job["status"] == "succeeded"
+    return job
+
+def collect(client, timeout=60, **params):
+    """
+    Starts a collection through the API and waits for it to finish.
+
+    Returns:
+        The final status of the job.
+    """
+    return wait(client, client.post("/collect_data", params={"query": "BALDOR", **params}).json(), timeout)
+
+def wait(client, job, timeout=60):
+    """
+    Waits for a job, given by the status returned when it was started, to finish.
+
+    Returns:
+        The final status of the job.
+    """
+    deadline = time.monotonic() + timeout
+    while job["status"] not in FINISHED:
+        assert time.monotonic() < deadline, f"job {job['job_id']} still {job['status']}"
+        time.sleep(0.05)
+        job = client.get(f"/jobs/{job['job_id']}").json()
+    return job
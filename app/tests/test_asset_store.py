@@ -0,0 +1,49 @@
+import shutil
+
+from utils.download_files import ASSET_STORE, add_to_store, file_sha256, gc_store
+from utils.generations import current_generation
+from conftest import CATALOG, TOTAL, collect
+
+##########################################################################################################
+# Asset store ############################################################################################
+##########################################################################################################
+
+def test_identical_assets_are_stored_once(client, mock_server, workdir, job):
+    assets = [path for path in (current_generation().output_dir / "assets").glob("*/*") if path.is_file()]
+    blobs = list((workdir / ASSET_STORE).glob("*/*"))
+
+    assert len(assets) > len(blobs) == len({path.read_bytes() for path in assets})
+    # Every product path of an image links to one of the few image blobs.
+    images = [path for path in assets if path.name == "img.jpg"]
+    assert len(images) == TOTAL and len({path.stat().st_ino for path in images}) == CATALOG["images"]
+
+def test_unreferenced_blobs_are_removed_after_a_run(client, mock_server, workdir):
+    collect(client)
+    store = workdir / ASSET_STORE
+    blobs = set(store.glob("*/*"))
+    assert blobs and all(blob.stat().st_nlink > 1 for blob in blobs)
+
+    orphan = workdir / "orphan.bin"
+    orphan.write_bytes(b"asset of a removed generation")
+    add_to_store(orphan, file_sha256(orphan), ASSET_STORE)
+    orphan.unlink()
+
+    collect(client)
+
+    assert set(store.glob("*/*")) == blobs
+    assert client.get("/assets/C1S1X1P00001/manual.pdf").content == mock_server.catalog.asset("C1S1X1P00001")
+
+def test_assets_are_stored_again_after_their_blob_was_removed(client, mock_server, workdir):
+    collect(client)
+    store = workdir / ASSET_STORE
+    blobs = set(store.glob("*/*"))
+    for generation in (workdir / "data" / "generations").iterdir():
+        if generation.is_dir():
+            shutil.rmtree(generation)
+    (workdir / "data" / "generations" / "CURRENT").unlink()
+
+    assert gc_store(ASSET_STORE)[0] == len(blobs)
+    collect(client)
+
+    assert set(store.glob("*/*")) == blobs
+    assert client.get("/assets/C1S1X1P00001/manual.pdf").content == mock_server.catalog.asset("C1S1X1P00001")
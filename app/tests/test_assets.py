@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from utils.asset_cache import AssetCache
+from conftest import TOTAL, collect, requests_to
+
+CODE = "C1S2X1P00003"
+
+##########################################################################################################
+# Assets #################################################################################################
+##########################################################################################################
+
+def test_result_json_reference_keeps_asset_paths_only(client, job):
+    response = client.get(f"/jobs/{job['job_id']}/result", params={"format": "ndjson", "assets": "reference"})
+
+    products = [json.loads(line)["product"] for line in response.text.splitlines()]
+    assert len(products) == TOTAL
+    assert all("docs_base64" not in product for product in products)
+    assert products[0]["assets"]["manual"] == f"assets/{products[0]['product_id']}/manual.pdf"
+    assert len(products[0]["hashes"]["manual"]) == 64
+
+def test_asset_is_served_from_disk(client, mock_server, job):
+    response = client.get(f"/assets/{CODE}/manual.pdf")
+
+    assert response.status_code == 200
+    assert response.content == mock_server.catalog.asset(CODE)
+
+def test_asset_range_request(client, mock_server, job):
+    body = mock_server.catalog.asset(CODE)
+
+    response = client.get(f"/assets/{CODE}/manual.pdf", headers={"Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 10-19/{len(body)}"
+    assert response.content == body[10:20]
+
+def test_asset_range_past_the_end(client, mock_server, job):
+    size = len(mock_server.catalog.asset(CODE))
+
+    response = client.get(f"/assets/{CODE}/manual.pdf", headers={"Range": f"bytes={size}-"})
+
+    assert response.status_code == 416
+
+@pytest.mark.parametrize("path", [f"/assets/{CODE}/notes.txt", "/assets/NOPE/manual.pdf", "/assets/../manual.pdf"])
+def test_unknown_asset(client, job, path):
+    assert client.get(path).status_code == 404
+
+##########################################################################################################
+# Lazy assets ############################################################################################
+##########################################################################################################
+
+def test_lazy_asset_is_fetched_once_and_served_by_range(client, mock_server):
+    job = collect(client, lazy_assets=True)
+    assert job["status"] == "succeeded"
+    body = mock_server.catalog.asset(CODE)
+    before = requests_to(mock_server, "manual")
+
+    first = client.get(f"/assets/{CODE}/manual.pdf", headers={"Range": "bytes=0-9"})
+    second = client.get(f"/assets/{CODE}/manual.pdf")
+
+    assert (first.status_code, first.content) == (206, body[:10])
+    assert (second.status_code, second.content) == (200, body)
+    assert requests_to(mock_server, "manual") - before == 1
+
+def test_lazy_asset_cache_evicts_the_least_recently_used_unpinned_files(mock_server):
+    base_url = f"http://127.0.0.1:{mock_server.server_address[1]}/api/products"
+    urls = [f"{base_url}/{code}/infopacket" for code in ("C1S1X1P00001", "C1S1X1P00002", "C1S1X1P00003")]
+    size = len(mock_server.catalog.asset("C1S1X1P00001"))
+    cache = AssetCache("cache/assets", max_bytes=size * 2 + size // 2)
+
+    pinned = cache.get(urls[0], "manual.pdf", pin=True)
+    evicted = cache.get(urls[1], "manual.pdf")
+    kept = cache.get(urls[2], "manual.pdf")
+
+    # Over the budget: the second file goes, as the first one is still being sent.
+    assert pinned.is_file() and kept.is_file() and not evicted.exists()
+    cache.release(urls[0])
+    cache.close()
@@ -0,0 +1,52 @@
+import pytest
+
+from benchmarks.bom_parser_bench import build_catalog_page
+from scraping import bom_parser
+from scraping.bom_parser import BOM_BACKENDS, extract_bom
+
+ROW = "<tr><td>PN1</td><td>Bearing</td><td>2</td></tr>"
+
+PAGES = {
+    "catalog page": build_catalog_page(parts=25),
+    "empty page": "",
+    "no table": "<html><body><p>No parts</p></body></html>",
+    "no tbody": f"<table>{ROW}</table>",
+    "implied end tags": "<table><tbody><tr><td>PN1<td>Bearing<td>2<tr><td>PN2<td>Seal<td>1</tbody></table>",
+    "unclosed last table": f"<table><tbody>{ROW}",
+    "table in a comment": f"<!-- <table><tbody>{ROW}</tbody></table> --><p>No parts</p>",
+    "table in a script": f"<script>var row = '<table><tbody>{ROW}</tbody></table>';</script>",
+    "end tag opened outside": f"<div><table><tbody>{ROW}</tbody></table></div></div>",
+    "empty part number": "<table><tbody><tr><td> </td><td>Note</td><td>1</td></tr>" + ROW + "</tbody></table>",
+    "nested cells": "<table><tbody><tr><td> <a>PN1</a> </td><td>Bearing <b>steel</b></td><td>2</td></tr></tbody></table>",
+}
+
+##########################################################################################################
+# BOM extraction backends ################################################################################
+##########################################################################################################
+
+@pytest.mark.parametrize("backend", ["auto", "targeted"])
+@pytest.mark.parametrize("page", PAGES)
+def test_targeted_backend_matches_html_parser(backend, page):
+    assert extract_bom(PAGES[page], backend) == extract_bom(PAGES[page], "html.parser")
+
+@pytest.mark.parametrize("page", [page for page in PAGES if page != "implied end tags"])
+def test_lxml_backend_matches_html_parser_on_closed_markup(page):
+    # lxml closes implied end tags ("<td>1<td>2") where html.parser nests the cells.
+    assert extract_bom(PAGES[page], "lxml") == extract_bom(PAGES[page], "html.parser")
+
+def test_catalog_page_parts_are_read():
+    bom = extract_bom(PAGES["catalog page"])
+
+    assert len(bom) == 25
+    assert bom[0] == {"part_number": "PN000000", "description": "Part description 0 –bearing", "quantity": "1"}
+
+@pytest.mark.parametrize("backend", BOM_BACKENDS)
+def test_backends_without_lxml_use_html_parser(monkeypatch, backend):
+    monkeypatch.setattr(bom_parser, "lxml", None)
+
+    for html in PAGES.values():
+        assert extract_bom(html, backend) == bom_parser._bom_html_parser(html)
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match="Unsupported BOM parser"):
+        extract_bom(ROW, "regex")
@@ -0,0 +1,40 @@
+import sqlite3
+from collections import Counter
+
+import pytest
+
+import main
+from scraping import catalog_export
+from scraping.catalog_export import TABLES
+from utils.generations import current_generation
+from utils.jobs import Job
+
+def sqlite_table(path, table):
+    with sqlite3.connect(path) as conn:
+        return Counter(tuple(row) for row in conn.execute(f"SELECT {', '.join(TABLES[table])} FROM {table}"))
+
+def test_parquet_export_holds_the_sqlite_tables(mock_server, monkeypatch):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    monkeypatch.setattr(catalog_export, "CATALOG_EXPORT", "sqlite,parquet")
+    main.run_collection(Job("BALDOR"))
+
+    generation = current_generation()
+    for table, columns in TABLES.items():
+        parquet = pyarrow.parquet.read_table(generation.catalog_parquet / f"{table}.parquet")
+        assert parquet.column_names == list(columns)
+        rows = Counter(tuple(row[column] for column in columns) for row in parquet.to_pylist())
+        assert rows == sqlite_table(generation.catalog_sqlite, table), table
+    assert not list(generation.catalog_parquet.glob(".*.part"))
+
+def test_parquet_export_is_skipped_without_pyarrow(mock_server, monkeypatch):
+    monkeypatch.setattr(catalog_export, "CATALOG_EXPORT", "sqlite,parquet")
+    monkeypatch.setattr(catalog_export, "pyarrow", None)
+    main.run_collection(Job("BALDOR"))
+
+    generation = current_generation()
+    assert generation.catalog_sqlite.is_file()
+    assert not generation.catalog_parquet.exists()
+    with pytest.raises(RuntimeError, match="pyarrow"):
+        catalog_export.write_parquet(catalog_export.catalog_rows([]), generation.catalog_parquet)
@@ -0,0 +1,78 @@
+import pytest
+
+from utils.download_files import asset_key, load_manifest
+from utils.generations import current_generation, keep_partial_generation, open_generation, publish_generation
+from conftest import TOTAL, collect
+
+def products(client):
+    return [item["product_id"] for item in client.get("/products", params={"limit": 500}).json()["items"]]
+
+##########################################################################################################
+# Partial runs and the state kept for the next run #######################################################
+##########################################################################################################
+
+@pytest.mark.parametrize("params", [{"categories": ["C2S1"]}, {"products": ["C1S1X1P00002"]}, {"max_products": 3}])
+def test_partial_run_keeps_the_rest_of_the_catalog(client, mock_server, params):
+    full = collect(client)
+    current = current_generation()
+
+    partial = collect(client, **params)
+
+    assert partial["status"] == "succeeded"
+    assert current_generation().id == current.id
+    assert len(products(client)) == TOTAL
+    assert client.get("/products/C2S2X2P00005").status_code == 200
+    result = client.get(f"/jobs/{partial['job_id']}/result", params={"format": "ndjson", "assets": "reference"})
+    assert 0 < len(result.text.splitlines()) < TOTAL
+    assert client.get(f"/jobs/{full['job_id']}/result", params={"format": "ndjson"}).status_code == 200
+
+def test_partial_run_is_not_resumed_by_the_next_run(client, mock_server):
+    partial = collect(client, max_products=3)
+    full = collect(client)
+
+    assert full["status"] == "succeeded"
+    assert current_generation().id.endswith(full["job_id"])
+    assert len(products(client)) == TOTAL
+    result = client.get(f"/jobs/{partial['job_id']}/result", params={"format": "ndjson", "assets": "reference"})
+    assert len(result.text.splitlines()) == 3
+
+def test_scoped_run_does_not_hide_changes_from_the_next_incremental_run(client, mock_server, monkeypatch):
+    code = "C1S1X1P00002"
+    collect(client, incremental=True)
+    manifest = load_manifest()
+
+    catalog = mock_server.catalog
+    product, asset = catalog.product, catalog.asset
+    monkeypatch.setattr(catalog, "product", lambda c, n: dict(product(c, n), listPrice={"amount": 999.0}) if c == code else product(c, n))
+    monkeypatch.setattr(catalog, "asset", lambda key: b"new manual" if key == code else asset(key))
+
+    scoped = collect(client, incremental=True, products=[code])
+    assert scoped["status"] == "succeeded"
+    assert client.get(f"/products/{code}").json()["USD"] != 999.0
+    assert load_manifest()[asset_key(code, "manual.pdf")] == manifest[asset_key(code, "manual.pdf")]
+
+    full = collect(client, incremental=True)
+
+    assert full["changes"]["modified"] == 1
+    assert current_generation().id.endswith(full["job_id"])
+    assert client.get(f"/products/{code}").json()["USD"] == 999.0
+    assert client.get(f"/assets/{code}/manual.pdf").content == b"new manual"
+
+##########################################################################################################
+# Generations kept on disk ###############################################################################
+##########################################################################################################
+
+def test_old_generations_are_pruned_on_publish(workdir):
+    published, partial = [], []
+    for n in range(4):
+        generation = open_generation(f"full{n}", directory="generations")
+        publish_generation(generation, directory="generations", keep=2)
+        published.append(generation)
+    for n in range(3):
+        generation = open_generation(f"partial{n}", directory="generations")
+        keep_partial_generation(generation, directory="generations", keep=2)
+        partial.append(generation)
+
+    assert current_generation("generations").id == published[-1].id
+    assert [generation.path.exists() for generation in published] == [False, False, True, True]
+    assert [generation.path.exists() for generation in partial] == [False, True, True]
@@ -0,0 +1,92 @@
+import pytest
+import requests
+
+from scraping.baldor_scraping import fetch_category_tree
+from utils.http_cache import OfflineCacheMiss, ResponseCache, set_response_cache
+from conftest import requests_to
+
+def crawl_tree(server):
+    """
+    Discovers the category tree and returns it with the category requests sent to the site.
+    """
+    before = requests_to(server, "category")
+    tree = fetch_category_tree()
+    return tree, requests_to(server, "category") - before
+
+def test_bypass_always_fetches_and_stores_nothing(mock_server, workdir):
+    set_response_cache(ResponseCache("cache/http_cache.sqlite", mode="bypass"))
+
+    first, sent = crawl_tree(mock_server)
+    again, sent_again = crawl_tree(mock_server)
+
+    assert sent == sent_again > 0
+    assert again == first
+    assert not (workdir / "cache" / "http_cache.sqlite").exists()
+
+def test_normal_serves_fresh_responses_from_the_cache(mock_server):
+    set_response_cache(ResponseCache("cache/http_cache.sqlite", mode="normal"))
+
+    first, sent = crawl_tree(mock_server)
+    again, sent_again = crawl_tree(mock_server)
+
+    assert sent > 0 and sent_again == 0
+    assert again == first
+
+def test_normal_fetches_again_once_expired(mock_server):
+    set_response_cache(ResponseCache("cache/http_cache.sqlite", mode="normal", ttls={"category": 0}))
+
+    _, sent = crawl_tree(mock_server)
+    _, sent_again = crawl_tree(mock_server)
+
+    assert sent_again == sent
+
+def test_refresh_fetches_and_overwrites_the_cache(mock_server):
+    set_response_cache(ResponseCache("cache/http_cache.sqlite", mode="refresh"))
+    _, sent = crawl_tree(mock_server)
+    _, sent_again = crawl_tree(mock_server)
+    assert sent == sent_again > 0
+
+    set_response_cache(ResponseCache("cache/http_cache.sqlite", mode="offline"))
+    _, sent_offline = crawl_tree(mock_server)
+    assert sent_offline == 0
+
+def test_offline_replays_the_cache_whatever_its_age(mock_server):
+    set_response_cache(ResponseCache("cache/http_cache.sqlite", mode="normal"))
+    first, _ = crawl_tree(mock_server)
+
+    set_response_cache(ResponseCache("cache/http_cache.sqlite", mode="offline", ttls={"category": 0}))
+    again, sent = crawl_tree(mock_server)
+
+    assert sent == 0
+    assert again == first
+
+def test_offline_miss_fails_without_a_request(mock_server):
+    cache = ResponseCache("cache/http_cache.sqlite", mode="offline")
+    set_response_cache(cache)
+
+    with pytest.raises(OfflineCacheMiss):
+        cache.get("http://127.0.0.1/api/products", "category", lambda: pytest.fail("fetched in offline mode"))
+
+    # A crawl treats the miss like any failed request.
+    tree, sent = crawl_tree(mock_server)
+    assert tree == [] and sent == 0
+
+def test_least_recently_used_entries_are_evicted_over_the_budget(workdir):
+    def fetch():
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b"x" * 40
+        return response
+
+    cache = ResponseCache("cache/http_cache.sqlite", mode="normal", max_bytes=100)
+    # "a" is read again before "c" goes over the budget, so "b" is the one evicted.
+    for url in ("http://site/a", "http://site/b", "http://site/a", "http://site/c"):
+        cache.get(url, "parts", fetch)
+    cache.close()
+
+    offline = ResponseCache("cache/http_cache.sqlite", mode="offline")
+    for url in ("http://site/a", "http://site/c"):
+        assert offline.get(url, "parts", fetch).content == b"x" * 40
+    with pytest.raises(OfflineCacheMiss):
+        offline.get("http://site/b", "parts", fetch)
+    offline.close()
@@ -0,0 +1,59 @@
+from utils.generations import current_generation
+from conftest import CATALOG, TOTAL, collect, requests_to
+
+##########################################################################################################
+# Change feed ############################################################################################
+##########################################################################################################
+
+def test_incremental_run_reports_the_catalog_changes(client, mock_server):
+    first = collect(client, incremental=True)
+    assert first["changes"] == {"added": TOTAL, "modified": 0, "removed": 0, "unchanged": 0}
+
+    catalog = mock_server.catalog
+    catalog.revision = 1
+    codes = [
+        f"C{c}S{s}X{x}P{n:05d}"
+        for c in range(1, CATALOG["categories"] + 1)
+        for s in range(1, CATALOG["subcategories"] + 1)
+        for x in range(1, CATALOG["subsubcategories"] + 1)
+        for n in range(1, CATALOG["products"] + 1)
+    ]
+    removed = {code for code in codes if catalog._churned(code, "removed", catalog.churn / 5)}
+    modified = {code for code in codes if catalog._churned(code, "price", catalog.churn)} - removed
+    assert modified, "the catalog revision should change some prices"
+
+    before = requests_to(mock_server, "drawings")
+    second = collect(client, incremental=True)
+
+    assert second["changes"] == {
+        "added": 0,
+        "modified": len(modified),
+        "removed": len(removed),
+        "unchanged": TOTAL - len(modified) - len(removed),
+    }
+    # Only the changed products are fetched again.
+    assert requests_to(mock_server, "drawings") - before == len(modified)
+    feed = client.get(f"/jobs/{second['job_id']}/changes").json()
+    assert {entry["code"] for entry in feed["modified"]} == modified
+    assert set(feed["removed"]) == removed
+
+##########################################################################################################
+# Files of unchanged products ############################################################################
+##########################################################################################################
+
+def test_unchanged_product_file_is_downloaded_again_when_it_differs(client, mock_server):
+    code = "C1S1X1P00001"
+    collect(client, incremental=True)
+
+    manual = current_generation().output_dir / "assets" / code / "manual.pdf"
+    content = manual.read_bytes()
+    # Replaced by a file of the same size, so only its hash tells it apart.
+    manual.unlink()
+    manual.write_bytes(bytes(len(content)))
+
+    before = requests_to(mock_server, "manual")
+    second = collect(client, incremental=True)
+
+    assert second["changes"]["modified"] == 0
+    assert requests_to(mock_server, "manual") - before == 1
+    assert client.get(f"/assets/{code}/manual.pdf").content == content
@@ -0,0 +1,38 @@
+from conftest import TOTAL, wait
+
+##########################################################################################################
+# Collection jobs ########################################################################################
+##########################################################################################################
+
+def test_collection_runs_as_a_background_job(client, mock_server):
+    response = client.post("/collect_data", params={"query": "BALDOR"})
+
+    assert response.status_code == 202
+    assert response.json()["status"] in ("pending", "running")
+    job = wait(client, response.json())
+
+    assert job["status"] == "succeeded"
+    progress = client.get(f"/jobs/{job['job_id']}/progress").json()
+    assert progress["products_done"] == TOTAL
+    assert progress["truncated"] is None
+
+def test_cancelled_job_stops_at_its_next_checkpoint(client, mock_server):
+    mock_server.latency = 0.05
+    try:
+        job = client.post("/collect_data", params={"query": "BALDOR"}).json()
+        assert client.post(f"/jobs/{job['job_id']}/cancel").status_code == 202
+        job = wait(client, job)
+    finally:
+        mock_server.latency = 0.0
+
+    assert job["status"] == "cancelled"
+    assert client.post(f"/jobs/{job['job_id']}/cancel").status_code == 409
+    assert client.get(f"/jobs/{job['job_id']}/result").status_code != 200
+
+def test_unsupported_query_is_rejected(client):
+    assert client.post("/collect_data", params={"query": "WEG"}).status_code == 400
+
+def test_unknown_job(client):
+    for path in ("/jobs/nope", "/jobs/nope/progress", "/jobs/nope/result"):
+        assert client.get(path).status_code == 404
+    assert client.post("/jobs/nope/cancel").status_code == 404
@@ -0,0 +1,45 @@
+import pytest
+
+import main
+from utils.general_utils import JOURNAL
+from utils.jobs import Job
+from conftest import requests_to
+
+##########################################################################################################
+# Crawl journal ##########################################################################################
+##########################################################################################################
+
+def run_with_failing_downloads(monkeypatch, **kwargs):
+    """
+    Runs a collection whose downloads fail, with a single attempt and no retry wait.
+    """
+    def fail(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(main, "MAX_RETRIES", 1)
+        patch.setattr(main, "RETRY_BASE", 0)
+        patch.setattr(main, "download_product_files", fail)
+        with pytest.raises(RuntimeError, match="Maximum retries"):
+            main.run_collection(Job("BALDOR"), **kwargs)
+
+def test_failed_run_is_resumed_from_the_journal(mock_server, monkeypatch, workdir):
+    run_with_failing_downloads(monkeypatch)
+    assert (workdir / JOURNAL).is_file()
+
+    before = {endpoint: requests_to(mock_server, endpoint) for endpoint in ("category", "listing", "drawings", "parts")}
+    main.run_collection(Job("BALDOR"))
+
+    # Discovery, listings and product details all come from the journal.
+    assert {endpoint: requests_to(mock_server, endpoint) - count for endpoint, count in before.items()} == {
+        "category": 0, "listing": 0, "drawings": 0, "parts": 0,
+    }
+    assert not (workdir / JOURNAL).exists()
+
+def test_run_with_other_parameters_discards_the_journal(mock_server, monkeypatch):
+    run_with_failing_downloads(monkeypatch, scope={"max_products": 3})
+
+    before = requests_to(mock_server, "drawings")
+    main.run_collection(Job("BALDOR"), scope={"max_products": 4})
+
+    assert requests_to(mock_server, "drawings") - before == 4
@@ -0,0 +1,56 @@
+from conftest import CATALOG, TOTAL, collect
+
+def products(client, **params):
+    """
+    Codes of all the products matching params, read page by page.
+    """
+    codes, cursor = [], None
+    while True:
+        page = client.get("/products", params={"limit": 7, **params, "cursor": cursor}).json()
+        codes.extend(item["product_id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return codes
+
+##########################################################################################################
+# Product queries ########################################################################################
+##########################################################################################################
+
+def test_products_before_any_run(client):
+    assert client.get("/products").status_code == 503
+    assert client.get("/products/C1S1X1P00001").status_code == 503
+
+def test_products_are_listed_in_code_order_by_pages(client, job):
+    codes = products(client)
+
+    assert len(codes) == TOTAL
+    assert codes == sorted(set(codes))
+
+def test_products_are_filtered_by_spec_and_category(client, job):
+    # Every product is 230/460 V; frames go from 140T to 149T by product number.
+    assert len(products(client, voltage="460V")) == TOTAL
+    assert len(products(client, frame="142t")) == TOTAL // CATALOG["products"]
+    assert products(client, category="C2S1X2", frame="142T") == ["C2S1X2P00002"]
+
+def test_product_of_the_last_run(client, job):
+    product = client.get("/products/C1S2X1P00003").json()
+
+    assert product["product_id"] == "C1S2X1P00003"
+    assert product["links"]["manual"] == "/assets/C1S2X1P00003/manual.pdf"
+    assert client.get("/products/NOPE").status_code == 404
+    assert client.get("/products/C1S2X1P00003", params={"assets": "xml"}).status_code == 400
+
+def test_truncated_run_keeps_the_products_it_did_not_reach(client, mock_server, job):
+    mock_server.latency = 0.05
+    try:
+        partial = collect(client, time_budget=0.2)
+    finally:
+        mock_server.latency = 0.0
+
+    assert client.get(f"/jobs/{partial['job_id']}/progress").json()["truncated"] == "time_budget"
+    assert len(products(client)) == TOTAL
+    per_subsub = CATALOG["products"]
+    per_subcat = per_subsub * CATALOG["subsubcategories"]
+    per_category = per_subcat * CATALOG["subcategories"]
+    for category, count in (("C1", per_category), ("C2S1", per_subcat), ("C2S2X2", per_subsub)):
+        assert len(products(client, category=category)) == count
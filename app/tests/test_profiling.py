@@ -0,0 +1,39 @@
+import json
+import threading
+from pathlib import Path
+
+import main
+from utils.generations import current_generation
+from utils.jobs import Job
+
+def test_profile_is_written_next_to_the_output_of_the_run(mock_server):
+    job = Job("BALDOR")
+    main.run_collection(job, profile=True)
+
+    generation = current_generation()
+    assert set(job.profile) == {"speedscope", "collapsed", "stages"}
+    for path in job.profile.values():
+        assert Path(path).parent == generation.profile_dir
+        assert Path(path).name.startswith(job.id)
+    stages = json.loads(Path(job.profile["stages"]).read_text(encoding="utf-8"))
+    assert [record["stage"] for record in stages["stages"]][0] == "fetch_category_tree"
+
+def test_profile_leaves_out_the_threads_of_the_server(mock_server):
+    stop = threading.Event()
+
+    def serve_requests():
+        while not stop.is_set():
+            sum(range(1000))
+
+    other = threading.Thread(target=serve_requests, name="AnyIO worker thread")
+    job = Job("BALDOR")
+    other.start()
+    try:
+        main.run_collection(job, profile=True)
+    finally:
+        stop.set()
+        other.join()
+
+    collapsed = open(job.profile["collapsed"], encoding="utf-8").read()
+    assert "serve_requests" not in collapsed
+    assert "_fetch_children" in collapsed or "fetch_products_data" in collapsed
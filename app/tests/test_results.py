@@ -0,0 +1,54 @@
+import base64
+import json
+
+import pytest
+
+from conftest import TOTAL
+
+CODE = "C1S2X1P00003"
+
+def nested_products(output):
+    return [
+        product
+        for category in output
+        for subcat in category["subcategories"]
+        for subsub in subcat["sub_subcategory"]
+        for product in subsub["product"]
+    ]
+
+##########################################################################################################
+# Result of a job ########################################################################################
+##########################################################################################################
+
+def test_result_json_inline_embeds_the_documents(client, mock_server, job):
+    response = client.get(f"/jobs/{job['job_id']}/result")
+
+    assert response.status_code == 200
+    products = {product["product_id"]: product for product in nested_products(response.json())}
+    assert len(products) == TOTAL
+    manual = products[CODE]["docs_base64"]["manual"]
+    assert base64.b64decode(manual) == mock_server.catalog.asset(CODE)
+
+@pytest.mark.parametrize("assets", ["inline", "reference"])
+def test_result_ndjson_streams_one_line_per_product(client, job, assets):
+    response = client.get(f"/jobs/{job['job_id']}/result", params={"format": "ndjson", "assets": assets})
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == TOTAL
+    line = next(line for line in lines if line["product"]["product_id"] == CODE)
+    assert (line["category_id"], line["subcategory_id"], line["sub_subcategory_id"]) == ("C1", "C1S2", "C1S2X1")
+    assert ("docs_base64" in line["product"]) == (assets == "inline")
+
+def test_result_matches_the_json_of_the_nested_format(client, job):
+    nested = nested_products(client.get(f"/jobs/{job['job_id']}/result", params={"assets": "reference"}).json())
+    lines = client.get(f"/jobs/{job['job_id']}/result", params={"format": "ndjson", "assets": "reference"}).text
+
+    assert [json.loads(line)["product"] for line in lines.splitlines()] == nested
+
+@pytest.mark.parametrize("params, status", [
+    ({"format": "xml"}, 400),
+    ({"assets": "none"}, 400),
+])
+def test_result_rejects_unknown_options(client, job, params, status):
+    assert client.get(f"/jobs/{job['job_id']}/result", params=params).status_code == status
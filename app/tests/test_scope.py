@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from conftest import CATALOG, TOTAL, collect, requests_to
+
+def codes(client, job):
+    result = client.get(f"/jobs/{job['job_id']}/result", params={"format": "ndjson", "assets": "reference"})
+    return [json.loads(line)["product"]["product_id"] for line in result.text.splitlines()]
+
+##########################################################################################################
+# Scope of a run #########################################################################################
+##########################################################################################################
+
+@pytest.mark.parametrize("max_products, truncated", [(3, "max_products"), (TOTAL, None), (TOTAL + 1, None)])
+def test_max_products_truncates_only_when_products_are_left(client, mock_server, max_products, truncated):
+    job = collect(client, max_products=max_products)
+
+    assert job["status"] == "succeeded"
+    assert client.get(f"/jobs/{job['job_id']}/progress").json()["truncated"] == truncated
+    assert len(codes(client, job)) == min(max_products, TOTAL)
+
+def test_max_products_requests_only_the_listing_pages_it_needs(client, mock_server):
+    before = requests_to(mock_server, "listing")
+    collect(client, max_products=3)
+
+    # The page holding its products and the empty page that ends the listing.
+    assert requests_to(mock_server, "listing") - before == 2
+
+def test_category_scope_collects_only_its_products(client, mock_server):
+    job = collect(client, categories=["C2S1"])
+
+    assert job["status"] == "succeeded"
+    collected = codes(client, job)
+    assert len(collected) == CATALOG["subsubcategories"] * CATALOG["products"]
+    assert all(code.startswith("C2S1X") for code in collected)
+
+def test_product_scope_collects_only_its_products(client, mock_server):
+    before = requests_to(mock_server, "drawings")
+    job = collect(client, products=["C1S2X1P00003", "C2S2X2P00005"])
+
+    assert job["status"] == "succeeded"
+    assert sorted(codes(client, job)) == ["C1S2X1P00003", "C2S2X2P00005"]
+    assert requests_to(mock_server, "drawings") - before == 2
+
+##########################################################################################################
+# Listing pages ##########################################################################################
+##########################################################################################################
+
+def test_short_listing_page_does_not_end_the_listing(client, mock_server, monkeypatch):
+    catalog = mock_server.catalog
+    listing = catalog.listing
+    # The site answers pages of 3 products, fewer than the page size asked for.
+    monkeypatch.setattr(catalog, "listing", lambda category_id, page, page_size: listing(category_id, page, 3))
+
+    job = collect(client)
+
+    assert job["status"] == "succeeded"
+    result = client.get(f"/jobs/{job['job_id']}/result", params={"format": "ndjson", "assets": "reference"})
+    assert len(result.text.splitlines()) == TOTAL
@@ -0,0 +1,229 @@
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+from utils.download_files import download_with_retry
+from utils.metrics import ASSET_CACHE_REQUESTS
+
+# "eager" downloads every asset during the crawl, "lazy" fetches them on first request.
+ASSET_FETCH = os.getenv("ASSET_FETCH", "eager")
+ASSET_CACHE_DIR = os.getenv("ASSET_CACHE_DIR", "cache/assets")
+ASSET_CACHE_MAX_BYTES = int(os.getenv("ASSET_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+##########################################################################################################
+# Class to cache fetched assets on disk ##################################################################
+##########################################################################################################
+
+class AssetCache:
+    """
+    Read-through disk cache of product assets for the lazy asset mode: an asset is fetched
+    from its source URL the first time it is asked for, kept on disk and served from there
+    afterwards. Files are indexed in SQLite with their size and last access, and the least
+    recently used ones are deleted when the cache goes over its size budget.
+
+    Concurrent requests for the same asset share a single fetch. An asset asked for with
+    pin=True is not evicted until it is released, so a file is never deleted while a
+    response is still sending it.
+
+    Parameters:
+        directory (str) - Folder of the cached files and of their index.
+        max_bytes (int) - Size budget of the cached files.
+
+    Example use:
+        cache = AssetCache("cache/assets", max_bytes=512 * 1024 * 1024)
+        path = cache.get("https://www.baldor.com/api/products/M123/infopacket", "manual.pdf")
+        path = cache.get(url, "img.jpg", pin=True)
+        ...
+        cache.release(url)
+    """
+
+    def __init__(self, directory=ASSET_CACHE_DIR, max_bytes=ASSET_CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # Key -> Future of the path of an asset being fetched.
+        self._pending = {}
+        # Key -> number of responses serving the asset, which keep it from being evicted.
+        self._pins = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.directory / "index.sqlite", check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS assets ("
+            " key TEXT PRIMARY KEY, url TEXT, path TEXT, size INTEGER, sha256 TEXT,"
+            " stored_at REAL, accessed_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS assets_accessed ON assets (accessed_at)")
+        self._conn.commit()
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM assets").fetchone()[0]
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def get(self, url, filename, pin=False):
+        """
+        Path of the cached copy of an asset, fetched first if it is not in the cache.
+
+        Parameters:
+            url (str) - Source URL of the asset.
+            filename (str) - Name of the asset file (manual.pdf, cad.dwg or img.jpg), which
+                sets its type in the metrics and its timeout.
+            pin (bool) - Keep the file from being evicted until release(url) is called; only
+                pinned when a path is returned.
+
+        Returns:
+            Path of the file, or None if the asset could not be fetched.
+        """
+        key = self._key(url)
+
+        with self._lock:
+            path = self._load(key)
+            if path is not None:
+                if pin:
+                    self._pin(key)
+                ASSET_CACHE_REQUESTS.inc(result="hit")
+                return path
+
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+
+        if not owner:
+            ASSET_CACHE_REQUESTS.inc(result="shared")
+            path = future.result()
+            if path is None or not pin:
+                return path
+            # Reloaded under the lock, as the file may have been evicted since the fetch.
+            with self._lock:
+                path = self._load(key)
+                if path is not None:
+                    self._pin(key)
+                return path
+
+        path = None
+        try:
+            path = self._fetch(key, url, filename, pin)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            future.set_result(path)
+
+        ASSET_CACHE_REQUESTS.inc(result="miss" if path else "error")
+        return path
+
+    def release(self, url):
+        """
+        Releases an asset pinned by get(url, filename, pin=True).
+
+        Parameters:
+            url (str) - Source URL of the asset.
+
+        Returns:
+            None
+        """
+        key = self._key(url)
+        with self._lock:
+            count = self._pins.get(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+            else:
+                self._pins.pop(key, None)
+
+    def _pin(self, key):
+        self._pins[key] = self._pins.get(key, 0) + 1
+
+    def _load(self, key):
+        row = self._conn.execute("SELECT path, size FROM assets WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        path, size = row
+        if not os.path.isfile(path):
+            self._conn.execute("DELETE FROM assets WHERE key = ?", (key,))
+            self._conn.commit()
+            self._total -= size
+            return None
+
+        self._conn.execute("UPDATE assets SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return Path(path)
+
+    def _fetch(self, key, url, filename, pin=False):
+        folder = self.directory / key[:2] / key
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / filename
+
+        entry = download_with_retry(url, path, retries=3)
+        if entry is None:
+            logging.info(f"  |_ Asset cache: failed to fetch {url}")
+            shutil.rmtree(folder, ignore_errors=True)
+            return None
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, str(path), entry["size"], entry["sha256"], now, now),
+            )
+            self._total += entry["size"]
+            if pin:
+                self._pin(key)
+            if self._total > self.max_bytes:
+                self._evict(keep=key)
+            self._conn.commit()
+        return path
+
+    def _evict(self, keep=None):
+        """
+        Deletes least recently used files until the cache is back under 90% of its budget;
+        keep is the asset just fetched, which is about to be served. Pinned files are being
+        sent and are skipped; the budget is restored by a later eviction once released.
+        """
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for key, path, size in self._conn.execute(
+            "SELECT key, path, size FROM assets ORDER BY accessed_at"
+        ).fetchall():
+            if self._total <= target:
+                break
+            if key == keep or key in self._pins:
+                continue
+            shutil.rmtree(Path(path).parent, ignore_errors=True)
+            self._conn.execute("DELETE FROM assets WHERE key = ?", (key,))
+            self._total -= size
+            evicted += 1
+        logging.info(f"  |_ Asset cache: evicted {evicted} files")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+##########################################################################################################
+# Function to access the shared asset cache ##############################################################
+##########################################################################################################
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_asset_cache():
+    """
+    Returns the process-wide asset cache, configured from ASSET_CACHE_DIR and
+    ASSET_CACHE_MAX_BYTES.
+
+    Example use:
+        path = get_asset_cache().get(url, "img.jpg")
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AssetCache()
+        return _cache
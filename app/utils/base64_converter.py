@@ -4,6 +4,8 @@ import mimetypes
 import re
 from datetime import datetime
 
+CHUNK_SIZE = 3 * 256 * 1024
+
 ##########################################################################################################
 # Function to encode to base64 ###########################################################################
 ##########################################################################################################
@@ -12,6 +14,10 @@ def encode_base64(file_path, type_path):
     """
     Function to encode a file to Base64 format.
 
+    The whole encoded string is held in memory (4/3 of the file size), so it is meant for
+    documents that are kept as strings anyway; responses and output files embedding
+    documents stream them with iter_base64 instead.
+
     Parameters:
         file_path (str): Path to the file to be encoded.
         type_path (str): File extension including dot (e.g., '.pdf', '.dwg').
@@ -22,6 +28,29 @@ def encode_base64(file_path, type_path):
     Example use:
         encoded_file = encode_base64("path/to/file.pdf", ".pdf")
     """
+    return "".join(iter_base64(file_path, type_path))
+
+##########################################################################################################
+# Function to encode to base64 in chunks #################################################################
+##########################################################################################################
+
+def iter_base64(file_path, type_path, chunk_size=CHUNK_SIZE):
+    """
+    Function to encode a file to Base64 chunk by chunk, without reading it whole.
+
+    Parameters:
+        file_path (str): Path to the file to be encoded.
+        type_path (str): File extension including dot (e.g., '.pdf', '.dwg').
+        chunk_size (int): Bytes read per chunk; rounded down to a multiple of 3 so the
+            chunks concatenate into one valid Base64 string.
+
+    Returns:
+        Iterator of str: Consecutive pieces of the Base64 encoded file.
+
+    Example use:
+        for piece in iter_base64("path/to/file.pdf", ".pdf"):
+            stream.write(piece)
+    """
     path = Path(file_path)
     if not path.is_file():
         raise FileNotFoundError(f"File not found: {file_path}")
@@ -38,10 +67,14 @@ def encode_base64(file_path, type_path):
     if not mime_type:
         raise ValueError(f"Unsupported or unknown file type: {type_path}")
 
-    with open(path, "rb") as f:
-        encoded = base64.b64encode(f.read()).decode("utf-8")
+    chunk_size = max(3, chunk_size - chunk_size % 3)
 
-    return encoded
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield base64.b64encode(chunk).decode("utf-8")
 
 ##########################################################################################################
 # Function to decode to base64  ##########################################################################
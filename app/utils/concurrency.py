@@ -0,0 +1,48 @@
+import os
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+MAX_WORKERS = int(os.getenv("SCRAPER_MAX_WORKERS", "16"))
+MAX_PER_HOST = int(os.getenv("SCRAPER_MAX_PER_HOST", "8"))
+
+##########################################################################################################
+# Class to limit concurrent requests globally and per host ###############################################
+##########################################################################################################
+
+class HostLimiter:
+    """
+    Bounds the number of in-flight HTTP requests, both globally and for each host.
+
+    Parameters:
+        max_total (int) - Maximum number of concurrent requests across all hosts.
+        max_per_host (int) - Maximum number of concurrent requests against a single host.
+
+    Example use:
+        limiter = HostLimiter(max_total=16, max_per_host=8)
+        with limiter.slot(url):
+            response = session.get(url)
+    """
+
+    def __init__(self, max_total=MAX_WORKERS, max_per_host=MAX_PER_HOST):
+        self.max_total = max(1, int(max_total))
+        self.max_per_host = max(1, int(max_per_host))
+        self._global = threading.BoundedSemaphore(self.max_total)
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host_semaphore(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._hosts.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_per_host)
+                self._hosts[host] = semaphore
+            return semaphore
+
+    @contextmanager
+    def slot(self, url):
+        host_semaphore = self._host_semaphore(url)
+        with host_semaphore:
+            with self._global:
+                yield
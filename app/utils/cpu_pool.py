@@ -0,0 +1,133 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(max(0, min(8, (os.cpu_count() or 1) - 1)))))
+CPU_QUEUE_SIZE = int(os.getenv("CPU_QUEUE_SIZE", str(max(1, CPU_WORKERS) * 4)))
+CPU_OFFLOAD_MIN_BYTES = int(os.getenv("CPU_OFFLOAD_MIN_BYTES", str(16 * 1024)))
+
+##########################################################################################################
+# Class to run CPU-bound work in a process pool ##########################################################
+##########################################################################################################
+
+class CpuPool:
+    """
+    Process pool for CPU-bound steps (BOM parsing, base64 encoding, JSON rendering), fed by
+    the I/O threads through a bounded queue: submit() blocks while `queue_size` tasks are
+    already in flight, so the crawl cannot run ahead of the parsers.
+
+    The workers are started with the "spawn" method, which is safe next to the crawler
+    threads, and only on first use. With 0 workers, or if the pool breaks, tasks run inline
+    on the calling thread.
+
+    Parameters:
+        workers (int) - Worker processes; 0 runs everything inline.
+        queue_size (int) - Maximum number of tasks submitted and not finished yet.
+        min_bytes (int) - Payloads smaller than this run inline, where shipping them to a
+            worker would cost more than the work itself.
+
+    Example use:
+        bom = get_cpu_pool().run(extract_bom, html, size=len(html))
+    """
+
+    def __init__(self, workers=CPU_WORKERS, queue_size=CPU_QUEUE_SIZE, min_bytes=CPU_OFFLOAD_MIN_BYTES):
+        self.workers = workers
+        self.min_bytes = min_bytes
+        self._slots = threading.BoundedSemaphore(max(1, queue_size))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None and self.workers > 0:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                logging.info(f"  |_ CPU pool started with {self.workers} worker processes")
+            return self._executor
+
+    def submit(self, fn, *args, size=None):
+        """
+        Schedules fn(*args) on a worker process and returns its Future. Blocks while the
+        queue is full. fn and its arguments must be picklable (module-level functions).
+
+        Parameters:
+            fn (callable) - Function to run.
+            *args - Its arguments.
+            size (int) - Size of the payload in bytes; below min_bytes it runs inline.
+
+        Returns:
+            concurrent.futures.Future
+        """
+        executor = self._get_executor()
+        if executor is None or (size is not None and size < self.min_bytes):
+            return self._inline(fn, *args)
+
+        self._slots.acquire()
+        try:
+            future = executor.submit(fn, *args)
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._slots.release()
+            self._reset(e)
+            return self._inline(fn, *args)
+
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args, size=None):
+        """
+        Runs fn(*args) on a worker process and waits for its result. If the pool broke
+        meanwhile (e.g. a worker was killed), the call is retried inline.
+        """
+        future = self.submit(fn, *args, size=size)
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            self._reset(e)
+            return fn(*args)
+
+    @staticmethod
+    def _inline(fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _reset(self, error):
+        with self._lock:
+            if self._executor is not None:
+                logging.warning(f"  |_ CPU pool broken ({error}), it will be restarted")
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+##########################################################################################################
+# Function to access the shared CPU pool #################################################################
+##########################################################################################################
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_cpu_pool():
+    """
+    Returns the process-wide CPU pool, configured from CPU_WORKERS, CPU_QUEUE_SIZE and
+    CPU_OFFLOAD_MIN_BYTES.
+
+    Example use:
+        future = get_cpu_pool().submit(render_products, batch)
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = CpuPool()
+        return _pool
@@ -1,69 +1,427 @@
 import requests
+from concurrent.futures import ThreadPoolExecutor, Future
 from pathlib import Path
-import time
+import tempfile
+import threading
+import shutil
+import hashlib
+import json
 import logging
+import time
+import os
+
+from utils.rate_limiter import RETRY_STATUS, get_rate_controller
+from utils.http_transport import get_http_session, timeout_for
+from utils.metrics import HTTP_REQUESTS, HTTP_LATENCY, HTTP_RETRIES, DOWNLOADED_BYTES
+
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "8"))
+CHUNK_SIZE = 1024 * 1024
+MANIFEST = "data/asset_manifest.json"
+ASSET_STORE = "data/asset_store"
+
+##########################################################################################################
+# Functions to load and save the asset manifest ##########################################################
+##########################################################################################################
+
+def load_manifest(path=MANIFEST):
+    """
+    Loads the asset manifest kept between runs.
+
+    Parameters:
+        path (str) - Path of the manifest file.
+
+    Returns:
+        dict mapping each asset path to its url, etag, last_modified, size and sha256.
+        An empty dict if there is no manifest yet or it cannot be read.
+
+    Example use:
+        manifest = load_manifest()
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logging.warning(f"  |  |_ Ignoring unreadable asset manifest {path}: {e}")
+        return {}
+
+def save_manifest(manifest, path=MANIFEST):
+    """
+    Atomically writes the asset manifest.
+
+    Parameters:
+        manifest (dict) - Asset entries keyed by asset path.
+        path (str) - Path of the manifest file.
+
+    Returns:
+        None
+
+    Example use:
+        save_manifest(manifest)
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=path.parent, prefix=f".{path.name}.", suffix=".part", delete=False
+    ) as tmp:
+        json.dump(manifest, tmp, ensure_ascii=False, indent=2)
+    os.replace(tmp.name, path)
+
+def asset_key(code, filename):
+    """
+    Key of an asset in the manifest and the crawl journal: its path relative to the output
+    folder of a run, the same whichever generation (see utils.generations) it is saved in.
+
+    Example use:
+        entry = load_manifest().get(asset_key("M123", "manual.pdf"))
+    """
+    return f"output/assets/{code}/{filename}"
+
+##########################################################################################################
+# Function to hash a file ################################################################################
+##########################################################################################################
+
+def file_sha256(path, chunk_size=CHUNK_SIZE):
+    """
+    Computes the SHA-256 of a file, reading it in chunks.
+
+    Parameters:
+        path (str) - Path of the file.
+        chunk_size (int) - Bytes read per chunk.
+
+    Returns:
+        str - Hex digest of the file.
+
+    Example use:
+        digest = file_sha256("output/assets/M123/manual.pdf")
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+##########################################################################################################
+# Functions to keep assets in a content-addressed store ##################################################
+##########################################################################################################
+
+def store_path(sha256, store=ASSET_STORE):
+    """
+    Path of the blob holding the content with the given SHA-256 in the asset store.
+    """
+    return Path(store) / sha256[:2] / sha256
+
+def link_from_store(sha256, dest_path, store=ASSET_STORE):
+    """
+    Atomically points dest_path at a blob of the asset store, through a hardlink (or a
+    copy when the filesystem does not support hardlinks).
+
+    Parameters:
+        sha256 (str) - Hash of the stored content.
+        dest_path (Path) - Per-product path of the asset.
+        store (str) - Root folder of the asset store.
+
+    Returns:
+        None
+
+    Example use:
+        link_from_store(entry["sha256"], Path("output/assets/M123/img.jpg"))
+    """
+    blob = store_path(sha256, store)
+    dest_path = Path(dest_path)
+    if dest_path.is_file() and os.path.samefile(blob, dest_path):
+        return
+
+    tmp_path = dest_path.parent / f".{dest_path.name}.{threading.get_ident()}.link"
+    try:
+        os.link(blob, tmp_path)
+    except OSError:
+        shutil.copyfile(blob, tmp_path)
+    os.replace(tmp_path, dest_path)
+
+def add_to_store(file_path, sha256, store=ASSET_STORE):
+    """
+    Hardlinks (or copies) a file into the asset store under its hash, unless the same
+    content is already stored.
+
+    Parameters:
+        file_path (Path) - File holding the content.
+        sha256 (str) - Hash of the content.
+        store (str) - Root folder of the asset store.
+
+    Returns:
+        Path of the stored blob.
+
+    Example use:
+        blob = add_to_store(tmp_path, digest.hexdigest())
+    """
+    blob = store_path(sha256, store)
+    if blob.is_file():
+        return blob
+
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(file_path, blob)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.copyfile(file_path, blob)
+    return blob
+
+def gc_store(store=ASSET_STORE):
+    """
+    Deletes the blobs of the asset store that no product path links to any more, i.e. whose
+    only link is the store's own, such as the assets of the generations removed since. An
+    asset whose blob is gone is stored again the next time it is downloaded, or answered
+    with a 304 while a product path still holds it. On a filesystem without hardlinks every
+    blob is a copy and is deleted, which only gives up the sharing of the store.
+
+    Parameters:
+        store (str) - Root folder of the asset store.
+
+    Returns:
+        (removed, freed) - Number of blobs deleted and their size in bytes.
+
+    Example use:
+        removed, freed = gc_store()
+    """
+    removed = freed = 0
+    for blob in Path(store).glob("*/*"):
+        try:
+            stat = blob.stat()
+        except FileNotFoundError:
+            continue
+        if stat.st_nlink > 1:
+            continue
+        blob.unlink(missing_ok=True)
+        removed += 1
+        freed += stat.st_size
+
+    if removed:
+        logging.info(f"  |_ Asset store: removed {removed} unreferenced blobs ({freed} bytes)")
+    return removed, freed
 
 ##########################################################################################################
 # Helper function to download files ######################################################################
 ##########################################################################################################
 
-def download_with_retry(url, retries=3, delay=5):
+def download_with_retry(url, dest_path, retries=3, session=None, chunk_size=CHUNK_SIZE, previous=None, store=None):
     """
-    Function to download a file from a URL with retries.
+    Function to stream a file from a URL to disk with retries.
+
+    Each attempt is paced by the shared rate controller: 429/5xx answers and errors slow the
+    host down and pause it (honouring Retry-After) before the next attempt, while other
+    error statuses (e.g. 404) are final and not retried.
+
+    The body is written in chunks to a temporary file next to the destination, which is
+    renamed over the destination only once the download is complete, so a partial file is
+    never visible under the final name. When a previous manifest entry for the same URL is
+    given and the file is still on disk, the request is made conditional and a 304 answer
+    leaves the file untouched. When an asset store is given, the content is kept there under
+    its SHA-256 and dest_path becomes a hardlink to it.
+
+    Requests and downloaded bytes are counted in the metrics under the asset type given by
+    the file name (manual, cad, img).
 
     Parameters:
         url (str) - URL of the file to download.
+        dest_path (Path) - Final path of the downloaded file.
         retries (int) - Number of retry attempts.
-        delay (int) - Delay between retries in seconds.
+        session (requests.Session) - Session to send the request with; the shared one by default.
+        chunk_size (int) - Size in bytes of each chunk written to disk.
+        previous (dict) - Manifest entry from the last run (optional).
+        store (str) - Root folder of the content-addressed asset store (optional).
 
     Returns:
         None if download fails.
-        The content of the file if download is successful.
+        The manifest entry (url, etag, last_modified, size, sha256) if the download is
+        successful; the previous entry itself if the server answered 304.
 
     Example use:
-        content = download_with_retry(URL, retries=5, delay=10)
+        entry = download_with_retry(URL, Path("output/assets/M123/manual.pdf"), retries=5)
     """
 
-    headers = {"User-Agent": "Mozilla/5.0"}
+    headers = {"Accept": "*/*"}
+    http = session or get_http_session()
+    dest_path = Path(dest_path)
+
+    if (
+        previous
+        and previous.get("url") == url
+        and dest_path.is_file()
+        and dest_path.stat().st_size == previous.get("size")
+    ):
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+    else:
+        previous = None
+
+    rate = get_rate_controller()
+    asset = dest_path.stem
 
     for attempt in range(1, retries + 1):
+        tmp_path = None
+        if attempt > 1:
+            HTTP_RETRIES.inc(endpoint=asset)
+        rate.acquire(url)
+        start = time.perf_counter()
         try:
-            response = requests.get(url, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                return response.content
-            
-            else:
-                logging.info(f"  |  |_ Try {attempt}/{retries} - failed to download {url} (status {response.status_code})")
+            with http.get(url, headers=headers, timeout=timeout_for(asset), stream=True) as response:
+                HTTP_LATENCY.observe(time.perf_counter() - start, endpoint=asset)
+                HTTP_REQUESTS.inc(endpoint=asset, status=response.status_code)
+                rate.feedback(url, response.status_code, response.headers.get("Retry-After"))
+
+                if response.status_code == 304 and previous:
+                    if store and previous.get("sha256"):
+                        add_to_store(dest_path, previous["sha256"], store)
+                    return previous
+
+                if response.status_code == 200:
+                    size = 0
+                    digest = hashlib.sha256()
+                    with tempfile.NamedTemporaryFile(
+                        dir=dest_path.parent, prefix=f".{dest_path.name}.", suffix=".part", delete=False
+                    ) as tmp:
+                        tmp_path = tmp.name
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            tmp.write(chunk)
+                            digest.update(chunk)
+                            size += len(chunk)
+                    DOWNLOADED_BYTES.inc(size, asset=asset)
+
+                    if size:
+                        if store:
+                            add_to_store(tmp_path, digest.hexdigest(), store)
+                            os.remove(tmp_path)
+                            link_from_store(digest.hexdigest(), dest_path, store)
+                        else:
+                            os.replace(tmp_path, dest_path)
+                        return {
+                            "url": url,
+                            "etag": response.headers.get("ETag"),
+                            "last_modified": response.headers.get("Last-Modified"),
+                            "size": size,
+                            "sha256": digest.hexdigest(),
+                        }
+
+                    os.remove(tmp_path)
+                    return None
+
+                else:
+                    logging.info(f"  |  |_ Try {attempt}/{retries} - failed to download {url} (status {response.status_code})")
+                    if response.status_code not in RETRY_STATUS:
+                        return None
 
         except Exception as e:
             logging.info(f"  |  |_ Try {attempt}/{retries} - error downloading {url}: {e}")
-        time.sleep(delay)
+            if isinstance(e, requests.RequestException):
+                HTTP_REQUESTS.inc(endpoint=asset, status="error")
+                rate.feedback(url)
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
     return None
 
+##########################################################################################################
+# Helper function to download a single product file ######################################################
+##########################################################################################################
+
+def _download_file(session, url, dest_path, previous, store=None):
+    """
+    Downloads one product file and logs the outcome.
+
+    Parameters:
+        session (requests.Session) - Shared HTTP session.
+        url (str) - URL of the file.
+        dest_path (Path) - Final path of the file.
+        previous (dict) - Manifest entry from the last run, or None.
+        store (str) - Root folder of the content-addressed asset store (optional).
+
+    Returns:
+        The manifest entry of the file, or None if it could not be downloaded.
+    """
+    entry = download_with_retry(url, dest_path, retries=5, session=session, previous=previous, store=store)
+
+    if entry is None:
+        logging.info(f"  |  |_ Failed to download after retries: {url}")
+    elif entry is previous:
+        logging.info(f"  |  |_ File not modified: {dest_path}")
+    else:
+        logging.info(f"  |  |_ File saved: {dest_path}")
+
+    return entry
+
+def _holds_entry(dest_path, entry, store=None):
+    """
+    Whether a file on disk still holds the content recorded in its manifest entry: the same
+    size and, with a store, a link to the blob of the recorded hash; otherwise (or when it
+    is a copy) the file is hashed.
+
+    Parameters:
+        dest_path (Path) - Per-product path of the asset.
+        entry (dict) - Manifest entry of the asset from the last run.
+        store (str) - Root folder of the content-addressed asset store (optional).
+
+    Returns:
+        bool
+    """
+    sha256 = entry.get("sha256")
+    try:
+        if not sha256 or dest_path.stat().st_size != entry.get("size"):
+            return False
+        if store and os.path.samefile(store_path(sha256, store), dest_path):
+            return True
+    except FileNotFoundError:
+        return False
+    return file_sha256(dest_path) == sha256
+
 ##########################################################################################################
 # Function to download files #############################################################################
 ##########################################################################################################
 
-def download_product_files(data):
+def download_product_files(data, max_workers=DOWNLOAD_WORKERS, manifest_path=MANIFEST, job=None, journal=None, store=ASSET_STORE, scope=None, unchanged=None, output_dir="output", update_manifest=True):
     """
     Downloads product-related files (manual, CAD, image) for each product in the data.
 
+    Files are downloaded by a pool of workers and streamed to disk in chunks. The URL,
+    ETag, Last-Modified, size and hash of every file are kept in a manifest, so later runs
+    only transfer the files that changed on the server. Contents are kept once in a
+    content-addressed store and each product path is a hardlink to it; a URL shared by
+    several products (e.g. the same image) is requested only once per run. Files of
+    unchanged products (incremental runs) are not requested at all while their copy from
+    the last run is on disk under the same URL, with the size and hash recorded for it.
+
     Parameters:
         data (list) - List of product categories, each with subcategories and products.
+        max_workers (int) - Number of files downloaded in parallel.
+        manifest_path (str) - Path of the asset manifest.
+        job (Job) - Background job to report downloaded bytes to and check for cancellation (optional).
+        journal (CrawlJournal) - Journal of finished work; journaled files still on disk are skipped (optional).
+        store (str) - Root folder of the content-addressed asset store, or None to save plain files.
+        scope (CrawlScope) - Scope of the run; files not started before its time budget runs
+            out are skipped, keeping the copy from an earlier run if there is one (optional).
+        unchanged (set) - Codes of the products whose listing did not change since the last
+            run (see CrawlSnapshot.unchanged); their files are reused as they are (optional).
+        output_dir (str) - Folder the assets are saved under (in assets/<code>/).
+        update_manifest (bool) - Save the entries of this run to the manifest; a partial run
+            leaves it describing the files of the current generation.
 
     Returns:
-        list: Paths to successfully saved files.
+        list: Paths to successfully saved (or unchanged) files.
 
     Example use:
-        saved_files = download_product_files(data)
+        saved_files = download_product_files(data, max_workers=16)
     """
 
-    saved_files = []
-    base_path = Path("output/assets")
+    base_path = Path(output_dir) / "assets"
     base_path.mkdir(parents=True, exist_ok=True)
 
+    session = get_http_session()
+
+    downloads = []
     for category in data:
         for subcategory in category.get("subcategories", []):
             for sub_subcategory in subcategory.get("sub_subcategory", []):
@@ -85,20 +443,78 @@ def download_product_files(data):
                         if not url:
                             continue
 
-                        dest_path = product_folder / filename
-                        content = download_with_retry(url, retries=5, delay=10)
+                        downloads.append((code, url, product_folder / filename, asset_key(code, filename)))
 
-                        if content:
-                            try:
-                                with open(dest_path, "wb") as f:
-                                    f.write(content)
-                                saved_files.append(str(dest_path))
-                                logging.info(f"  |  |_ File saved: {dest_path}")
+    manifest = load_manifest(manifest_path)
 
-                            except Exception as e:
-                                logging.info(f"  |  |_ Error saving file {dest_path}: {e}")
+    # URL -> Future of its manifest entry, so each URL is fetched once per run.
+    fetched = {}
+    fetched_lock = threading.Lock()
 
-                        else:
-                            logging.info(f"  |  |_ Failed to download after retries: {url}")
+    def fetch_once(url, dest_path, previous):
+        if not store:
+            entry = _download_file(session, url, dest_path, previous)
+            return entry, entry is not None and entry is not previous
+
+        with fetched_lock:
+            future = fetched.get(url)
+            owner = future is None
+            if owner:
+                future = fetched[url] = Future()
+
+        if not owner:
+            entry = future.result()
+            if entry:
+                link_from_store(entry["sha256"], dest_path, store)
+                logging.info(f"  |  |_ File linked: {dest_path}")
+                return entry, False
+            return None, False
+
+        entry = None
+        try:
+            entry = _download_file(session, url, dest_path, previous, store)
+        finally:
+            future.set_result(entry)
+        return entry, entry is not None and entry is not previous
+
+    def run(code, url, dest_path, key):
+        finished = journal.get("asset", key) if journal else None
+        if finished is not None and finished.get("url") == url and dest_path.is_file():
+            return finished
+
+        previous = manifest.get(key)
+        if unchanged and code in unchanged and previous and previous.get("url") == url:
+            if _holds_entry(dest_path, previous, store):
+                return previous
+            # The file on disk is not the recorded one (e.g. replaced since): a 304 answer
+            # would keep it, so it is downloaded again.
+            logging.info(f"  |  |_ File differs from the manifest: {dest_path}")
+            previous = None
+
+        if scope and scope.expired:
+            return None
+
+        entry, downloaded = fetch_once(url, dest_path, previous)
+        if entry and journal:
+            journal.record("asset", key, entry)
+        if job and downloaded:
+            job.advance("bytes_downloaded", entry["size"])
+        return entry
+
+    saved_files = []
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="download")
+    try:
+        futures = [pool.submit(run, *download) for download in downloads]
+        for (_, url, dest_path, key), future in zip(downloads, futures):
+            if job:
+                job.check_cancelled()
+            entry = future.result()
+            if entry:
+                manifest[key] = entry
+                saved_files.append(str(dest_path))
+    finally:
+        pool.shutdown(cancel_futures=True)
+        if update_manifest:
+            save_manifest(manifest, manifest_path)
 
     return saved_files
@@ -1,17 +1,10 @@
 import logging
-import requests
-from typing import Any
-import json
 import os
 
-RETRY_STATUS = {429, 500, 502, 503, 504}
-CHECKPOINT = "checkpoint.json"
+from utils.rate_limiter import RETRY_STATUS, get_rate_controller
+from utils.http_transport import get_http_session
 
-session = requests.Session()
-session.headers.update({
-    "User-Agent": "Mozilla/5.0",
-    "Accept": "application/json"
-})
+JOURNAL = "crawl_journal.jsonl"
 
 ##########################################################################################################
 # Function to creates and saves logs in a directory ######################################################
@@ -43,55 +36,14 @@ def setup_logging(log_dir_path):
 
     return logging
 
-##########################################################################################################
-# Function to saves data to checkpoint ###################################################################
-##########################################################################################################
-
-def save_checkpoint(data: Any) -> None:
-    """
-    Function to save the current state of the data to a checkpoint file.
-    
-    Parameters:
-        data (Any) - The data to be saved to the checkpoint file.
-
-    Returns:
-        None
-
-    Example use:
-        save_checkpoint(data)
-    """
-    with open(CHECKPOINT, "w") as fp:
-        json.dump(data, fp)
-
-##########################################################################################################
-# Function to loads data from checkpoint #################################################################
-##########################################################################################################
-
-def load_checkpoint() -> Any | None:
-    """
-    Function to load the data from a checkpoint file.
-    
-    Parameters:
-        None
-
-    Returns:
-        None
-
-    Example use:
-        data = load_checkpoint()
-    """
-    if os.path.exists(CHECKPOINT):
-        with open(CHECKPOINT) as fp:
-            return json.load(fp)
-    return None
-
 ##########################################################################################################
 # Function to performs GET with error handling ###########################################################
 ##########################################################################################################
 
 def safe_get(url: str, **kwargs):
     """
-    Function to safely make a GET request to a URL, retrying on certain status codes.
+    Function to safely make a GET request to a URL over the shared HTTP session, paced by
+    the shared rate controller, which retries on certain status codes.
 
     Parameters:
         url (str) - The URL to make the GET request to.
@@ -101,7 +53,7 @@ def safe_get(url: str, **kwargs):
         response = safe_get("https://example.com/api/data")    
     """
     try:
-        resp = session.get(url, **kwargs)
+        resp = get_rate_controller().request(get_http_session(), url, **kwargs)
         if resp.status_code in RETRY_STATUS:
             raise RuntimeError(f"HTTP {resp.status_code}")
         resp.raise_for_status()
@@ -0,0 +1,235 @@
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+GENERATIONS_DIR = os.getenv("GENERATIONS_DIR", "data/generations")
+GENERATIONS_KEEP = int(os.getenv("GENERATIONS_KEEP", "3"))
+
+# File naming the published generation, replaced atomically on publish.
+CURRENT = "CURRENT"
+# Marker written into a generation when it is published.
+PUBLISHED = ".published"
+# Marker written into the generation of a partial run (scoped or truncated), never published.
+PARTIAL = ".partial"
+
+##########################################################################################################
+# Class to locate the files of a generation ##############################################################
+##########################################################################################################
+
+class Generation:
+    """
+    One version of the collected catalog: the product JSONs and assets (output/), the final
+    output, the catalog tree, the catalog export and the profile (profile/, for profiled
+    runs) of a single run, in their own folder.
+
+    Parameters:
+        path (str) - Folder of the generation.
+
+    Example use:
+        generation = current_generation()
+        generation.final_output  # data/generations/<id>/final_output.json
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.id = self.path.name
+        self.output_dir = self.path / "output"
+        self.final_output = self.path / "final_output.json"
+        self.catalog_tree = self.path / "catalog_tree.json"
+        self.catalog_sqlite = self.path / "catalog.sqlite"
+        self.catalog_parquet = self.path / "catalog_parquet"
+        self.profile_dir = self.path / "profile"
+
+    @property
+    def published(self):
+        return (self.path / PUBLISHED).is_file()
+
+    @property
+    def partial(self):
+        return (self.path / PARTIAL).is_file()
+
+    def __repr__(self):
+        return f"Generation({self.id!r})"
+
+##########################################################################################################
+# Helper function to hardlink a folder ###################################################################
+##########################################################################################################
+
+def _link_tree(source, dest):
+    """
+    Recreates the files of source under dest as hardlinks (copies when the filesystem does
+    not support them), so both trees share the same content on disk.
+    """
+    linked = 0
+    for folder, _, files in os.walk(source):
+        target = Path(dest) / Path(folder).relative_to(source)
+        target.mkdir(parents=True, exist_ok=True)
+        for name in files:
+            if name.startswith("."):
+                continue
+            try:
+                os.link(Path(folder) / name, target / name)
+            except FileExistsError:
+                continue
+            except OSError:
+                shutil.copy2(Path(folder) / name, target / name)
+            linked += 1
+    return linked
+
+##########################################################################################################
+# Functions to create, publish and find generations ######################################################
+##########################################################################################################
+
+def current_generation(directory=GENERATIONS_DIR):
+    """
+    The last published generation, or None before the first successful run.
+
+    Parameters:
+        directory (str) - Folder of the generations.
+
+    Returns:
+        Generation or None.
+
+    Example use:
+        generation = current_generation()
+    """
+    try:
+        name = (Path(directory) / CURRENT).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return Generation(Path(directory) / name) if name else None
+
+def _unpublished(directory=GENERATIONS_DIR):
+    """
+    Newest generation left unpublished by a failed or cancelled run after the current one.
+    """
+    current = current_generation(directory)
+    pending = [
+        path for path in Path(directory).iterdir()
+        if path.is_dir() and not (path / PUBLISHED).exists() and not (path / PARTIAL).exists()
+        and (current is None or path.name > current.id)
+    ]
+    return Generation(max(pending)) if pending else None
+
+def open_generation(name, directory=GENERATIONS_DIR, legacy_output="output"):
+    """
+    Folder the next run writes into. The generation left by a failed run is reopened, as the
+    crawl journal resumes into it; otherwise a new one is created, named after its creation
+    time and name, and the assets of the current generation (or of the output folder of a
+    version without generations) are hardlinked into it. Unchanged files are then neither
+    downloaded nor copied again, and since downloads replace a file instead of writing
+    into it, the files shared with older generations never change.
+
+    Parameters:
+        name (str) - Suffix of the generation id, e.g. the job id.
+        directory (str) - Folder of the generations.
+        legacy_output (str) - Output folder used before generations existed.
+
+    Returns:
+        Generation
+
+    Example use:
+        generation = open_generation(job.id)
+    """
+    Path(directory).mkdir(parents=True, exist_ok=True)
+
+    generation = _unpublished(directory)
+    if generation is not None:
+        logging.info(f"  |_ Resuming generation {generation.id}")
+        return generation
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    generation = Generation(Path(directory) / f"{stamp}-{name}")
+    generation.output_dir.mkdir(parents=True)
+
+    current = current_generation(directory)
+    source = current.output_dir / "assets" if current else Path(legacy_output) / "assets"
+    if source.is_dir():
+        linked = _link_tree(source, generation.output_dir / "assets")
+        logging.info(f"  |_ Generation {generation.id}: {linked} assets linked from {source}")
+
+    return generation
+
+def publish_generation(generation, directory=GENERATIONS_DIR, keep=GENERATIONS_KEEP):
+    """
+    Makes a complete generation the current one, by atomically replacing the CURRENT file,
+    then deletes the old generations (see _prune).
+
+    Parameters:
+        generation (Generation) - Generation to publish.
+        directory (str) - Folder of the generations.
+        keep (int) - Published generations kept, the new one included.
+
+    Returns:
+        None
+
+    Example use:
+        publish_generation(generation)
+    """
+    (generation.path / PUBLISHED).touch()
+
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=directory, prefix=f".{CURRENT}.", suffix=".part", delete=False
+    ) as tmp:
+        tmp.write(generation.id)
+        tmp.flush()
+        os.fsync(tmp.fileno())
+    os.replace(tmp.name, Path(directory) / CURRENT)
+    logging.info(f"  |_ Generation {generation.id} published")
+
+    _prune(directory, keep)
+
+def keep_partial_generation(generation, directory=GENERATIONS_DIR, keep=GENERATIONS_KEEP):
+    """
+    Closes the generation of a partial run (a category or product scope, or a run cut short
+    by max_products or its time budget) without publishing it: the current generation keeps
+    serving the whole catalog, and the partial one is only read through the result of its
+    job. It is not resumed by the next run, and is deleted like the others (see _prune).
+
+    Parameters:
+        generation (Generation) - Generation of the partial run.
+        directory (str) - Folder of the generations.
+        keep (int) - Partial generations kept, the new one included.
+
+    Returns:
+        None
+
+    Example use:
+        keep_partial_generation(generation)
+    """
+    (generation.path / PARTIAL).touch()
+    logging.info(f"  |_ Generation {generation.id} kept as partial, {CURRENT} unchanged")
+
+    _prune(directory, keep)
+
+def _prune(directory=GENERATIONS_DIR, keep=GENERATIONS_KEEP):
+    """
+    Deletes the generations beyond the last keep published ones and the last keep partial
+    ones, as well as the generations of failed runs older than the current one. A failed
+    run newer than the current one is kept, as the next run resumes into it.
+    """
+    current = current_generation(directory)
+    generations = sorted(
+        (Generation(path) for path in Path(directory).iterdir() if path.is_dir()),
+        key=lambda g: g.id,
+        reverse=True,
+    )
+    published = partial = 0
+    for generation in generations:
+        if current is not None and generation.id == current.id:
+            continue
+        if generation.published:
+            published += 1
+            if published < keep:
+                continue
+        elif generation.partial:
+            partial += 1
+            if partial <= keep:
+                continue
+        elif current is None or generation.id > current.id:
+            continue
+        shutil.rmtree(generation.path, ignore_errors=True)
+        logging.info(f"  |_ Generation {generation.id} removed")
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "cache/http_cache.sqlite")
+# Collections read the live site unless a cache mode is chosen (e.g. "normal" during development).
+CACHE_MODE = os.getenv("HTTP_CACHE_MODE", "bypass")
+CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+CACHE_MODES = ("normal", "bypass", "refresh", "offline")
+
+# Time to live, in seconds, of each endpoint class; HTTP_CACHE_TTL_<CLASS> overrides it.
+DEFAULT_TTLS = {
+    "category": 24 * 3600,
+    "listing": 6 * 3600,
+    "drawings": 24 * 3600,
+    "parts": 24 * 3600,
+}
+
+# Statuses worth replaying: a page, or a definitive "not found" (e.g. products without drawings).
+CACHEABLE_STATUS = {200, 404}
+
+##########################################################################################################
+# Exception raised on a cache miss in offline mode #######################################################
+##########################################################################################################
+
+class OfflineCacheMiss(requests.RequestException):
+    """
+    Raised in offline mode when a response is not in the cache. It is a RequestException, so
+    callers handle it like any other failed request.
+    """
+
+##########################################################################################################
+# Class to cache HTTP responses on disk ##################################################################
+##########################################################################################################
+
+class ResponseCache:
+    """
+    SQLite-backed cache of HTTP responses with a TTL per endpoint class and a size budget.
+
+    Modes:
+        - normal: serve fresh entries from the cache, fetch and store the others.
+        - bypass: always fetch, never read or write the cache.
+        - refresh: always fetch, and overwrite the cache with the new responses.
+        - offline: only serve from the cache, whatever the age; misses raise OfflineCacheMiss.
+
+    Parameters:
+        path (str) - Path of the SQLite database.
+        mode (str) - One of CACHE_MODES.
+        max_bytes (int) - Size budget of the stored bodies; least recently used entries are evicted.
+        ttls (dict) - Time to live in seconds per endpoint class.
+
+    Example use:
+        cache = ResponseCache("cache/http_cache.sqlite", mode="offline")
+        response = cache.get(url, "parts", lambda: session.get(url, timeout=20))
+    """
+
+    def __init__(self, path=CACHE_PATH, mode=CACHE_MODE, max_bytes=CACHE_MAX_BYTES, ttls=None):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unsupported cache mode: {mode}")
+
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS)
+        for endpoint in self.ttls:
+            override = os.getenv(f"HTTP_CACHE_TTL_{endpoint.upper()}")
+            if override:
+                self.ttls[endpoint] = int(override)
+        self.ttls.update(ttls or {})
+
+        self._lock = threading.Lock()
+        self._conn = None
+        if mode != "bypass":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, url TEXT, endpoint TEXT, status INTEGER, headers TEXT,"
+                " body BLOB, size INTEGER, stored_at REAL, accessed_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+            self._conn.commit()
+            self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def _key(url, accept):
+        return hashlib.sha256(f"{url}|{accept or ''}".encode("utf-8")).hexdigest()
+
+    def get(self, url, endpoint, fetch, accept=None):
+        """
+        Returns the response for url, from the cache or by calling fetch().
+
+        Parameters:
+            url (str) - Requested URL.
+            endpoint (str) - Endpoint class, used to pick the TTL.
+            fetch (callable) - Performs the real request and returns a requests.Response.
+            accept (str) - Accept header of the request, part of the cache key.
+
+        Returns:
+            requests.Response
+        """
+        if self.mode == "bypass":
+            return fetch()
+
+        key = self._key(url, accept)
+
+        if self.mode in ("normal", "offline"):
+            cached = self._load(key, endpoint, ignore_ttl=self.mode == "offline")
+            if cached is not None:
+                return cached
+            if self.mode == "offline":
+                raise OfflineCacheMiss(f"Not in cache (offline mode): {url}")
+
+        response = fetch()
+        if response.status_code in CACHEABLE_STATUS:
+            self._store(key, url, endpoint, response)
+        return response
+
+    def _load(self, key, endpoint, ignore_ttl=False):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status, headers, body, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            url, status, headers, body, stored_at = row
+            if not ignore_ttl and time.time() - stored_at > self.ttls.get(endpoint, 0):
+                return None
+
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(json.loads(headers))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body
+        response.url = url
+        response.reason = "OK" if status == 200 else ""
+        return response
+
+    def _store(self, key, url, endpoint, response):
+        body = response.content
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name.lower() in ("content-type", "etag", "last-modified")
+        }
+        now = time.time()
+
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, endpoint, response.status_code, json.dumps(headers), body, len(body), now, now),
+            )
+            self._total += len(body) - (previous[0] if previous else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """
+        Drops least recently used entries until the cache is back under 90% of its budget.
+        """
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            if self._total <= target:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._total -= size
+            evicted += 1
+        logging.info(f"  |_ HTTP cache: evicted {evicted} entries")
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
+
+##########################################################################################################
+# Function to access the shared response cache ###########################################################
+##########################################################################################################
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """
+    Returns the process-wide response cache, configured from the HTTP_CACHE_* environment
+    variables (HTTP_CACHE_MODE, HTTP_CACHE_PATH, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_TTL_<CLASS>).
+
+    Example use:
+        response = get_response_cache().get(url, "listing", fetch)
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+def set_response_cache(cache):
+    """
+    Replaces the process-wide response cache, e.g. to switch mode for a replay.
+
+    Example use:
+        set_response_cache(ResponseCache(mode="offline"))
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is not None and _cache is not cache:
+            _cache.close()
+        _cache = cache
@@ -0,0 +1,316 @@
+import importlib.util
+import logging
+import os
+import socket
+import threading
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import DEFAULT_ACCEPT_ENCODING, get_encoding_from_headers
+from urllib3.connection import HTTPConnection
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+# httpx negotiates HTTP/2 through h2, which is only needed installed, not imported.
+if importlib.util.find_spec("h2") is None:
+    httpx = None
+
+from utils.concurrency import MAX_WORKERS
+from utils.metrics import HTTP_CONNECTIONS, HTTP_CONNECTIONS_REUSED
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", str(MAX_WORKERS)))
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "10"))
+HTTP_KEEPALIVE = os.getenv("HTTP_KEEPALIVE", "true").lower() in ("1", "true", "yes")
+HTTP_HTTP2 = os.getenv("HTTP_HTTP2", "").lower() in ("1", "true", "yes")
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+
+# Read timeout, in seconds, of each endpoint class; HTTP_TIMEOUT_<CLASS> overrides it.
+DEFAULT_TIMEOUTS = {
+    "category": 30,
+    "listing": 30,
+    "drawings": 20,
+    "parts": 20,
+    "manual": 30,
+    "cad": 30,
+    "img": 30,
+}
+DEFAULT_TIMEOUT = 30
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Accept": "application/json",
+    # gzip and deflate, plus br when brotli is installed (decoded by urllib3).
+    "Accept-Encoding": DEFAULT_ACCEPT_ENCODING,
+}
+
+##########################################################################################################
+# Function to pick the timeout of an endpoint class ######################################################
+##########################################################################################################
+
+def timeout_for(endpoint):
+    """
+    (connect, read) timeout of an endpoint class: HTTP_CONNECT_TIMEOUT, and the read timeout
+    of DEFAULT_TIMEOUTS unless HTTP_TIMEOUT_<CLASS> overrides it.
+
+    Parameters:
+        endpoint (str) - Endpoint class ("category", "listing", "drawings", "parts", or the
+            asset types "manual", "cad" and "img").
+
+    Returns:
+        tuple of float seconds.
+
+    Example use:
+        session.get(url, timeout=timeout_for("parts"))
+    """
+    override = os.getenv(f"HTTP_TIMEOUT_{endpoint.upper()}")
+    read = float(override) if override else DEFAULT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+    return (HTTP_CONNECT_TIMEOUT, read)
+
+##########################################################################################################
+# Class to count the connections opened and reused #######################################################
+##########################################################################################################
+
+class _ConnectionStats:
+    """
+    Requests sent and connections opened per host by the shared transport. A response came
+    over a reused connection when its connection still holds the socket of the previous
+    response it carried; a connection urllib3 reopens after the server closed it gets a new
+    socket, so reconnects count as new connections.
+    """
+
+    def __init__(self):
+        self._hosts = {}
+        # Connection -> socket of the last response it carried.
+        self._sockets = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def record(self, conn):
+        host = f"{conn.host}:{conn.port}" if conn.port else conn.host
+        with self._lock:
+            reused = conn.sock is not None and self._sockets.get(conn) is conn.sock
+            self._sockets[conn] = conn.sock
+            counts = self._hosts.setdefault(host, [0, 0])
+            counts[0] += 1
+            counts[1] += not reused
+        if reused:
+            HTTP_CONNECTIONS_REUSED.inc(host=host)
+        else:
+            HTTP_CONNECTIONS.inc(host=host)
+
+    def snapshot(self):
+        with self._lock:
+            hosts = {host: tuple(counts) for host, counts in self._hosts.items()}
+        return {
+            host: {
+                "requests": requests_sent,
+                "connections": opened,
+                "reused": requests_sent - opened,
+                "reuse_ratio": round((requests_sent - opened) / requests_sent, 3) if requests_sent else 0.0,
+            }
+            for host, (requests_sent, opened) in hosts.items()
+        }
+
+_stats = _ConnectionStats()
+
+##########################################################################################################
+# Class of the pooled HTTP/1.1 transport #################################################################
+##########################################################################################################
+
+class PooledAdapter(HTTPAdapter):
+    """
+    requests adapter over a urllib3 pool per host, counting the connections it opens and
+    reuses (see connection_stats).
+
+    Parameters:
+        pool_size (int) - Connections kept alive per host.
+        pool_hosts (int) - Host pools kept.
+        keepalive (bool) - Keep idle connections open (with TCP keep-alive probes) instead
+            of closing them after each response.
+
+    Example use:
+        session.mount("https://", PooledAdapter(pool_size=16))
+    """
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, pool_hosts=HTTP_POOL_HOSTS, keepalive=HTTP_KEEPALIVE):
+        self.keepalive = keepalive
+        super().__init__(pool_connections=pool_hosts, pool_maxsize=pool_size)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        if self.keepalive:
+            pool_kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            ]
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+
+    def build_response(self, req, resp):
+        # The body is not read yet, so the response still holds its connection.
+        if resp.connection is not None:
+            _stats.record(resp.connection)
+        return super().build_response(req, resp)
+
+    def add_headers(self, request, **kwargs):
+        if not self.keepalive:
+            request.headers["Connection"] = "close"
+
+##########################################################################################################
+# Class of the optional HTTP/2 transport #################################################################
+##########################################################################################################
+
+class _HttpxRaw:
+    """
+    File-like body of an httpx response, read by requests' iter_content and content.
+    """
+
+    def __init__(self, response):
+        self._response = response
+        self._chunks = response.iter_bytes()
+        self._buffer = b""
+
+    def read(self, size=-1, **kwargs):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._response.close()
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        self._response.close()
+
+class Http2Adapter(HTTPAdapter):
+    """
+    requests adapter sending the requests over HTTP/2 through an httpx client (requires
+    httpx and h2), so the requests to a host are multiplexed over one connection.
+
+    Responses are plain requests.Response objects, so callers do not change. Cookies set by
+    the server are not stored in the session, and connection_stats does not cover this
+    transport (httpx does not expose its connections).
+
+    Parameters:
+        pool_size (int) - Connections kept alive per host.
+        http2 (bool) - Negotiate HTTP/2 (False keeps httpx on HTTP/1.1).
+
+    Example use:
+        session.mount("https://", Http2Adapter())
+    """
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, http2=True):
+        super().__init__()
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=pool_size)
+        self.client = httpx.Client(http2=http2, limits=limits, follow_redirects=False)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        else:
+            timeout = httpx.Timeout(timeout)
+
+        try:
+            sent = self.client.build_request(
+                request.method, request.url, headers=dict(request.headers), content=request.body, timeout=timeout
+            )
+            response = self.client.send(sent, stream=True)
+        except httpx.ConnectTimeout as e:
+            raise requests.ConnectTimeout(e, request=request)
+        except httpx.TimeoutException as e:
+            raise requests.ReadTimeout(e, request=request)
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(e, request=request)
+
+        result = requests.Response()
+        result.status_code = response.status_code
+        result.headers = CaseInsensitiveDict(response.headers)
+        result.encoding = get_encoding_from_headers(result.headers)
+        result.reason = response.reason_phrase
+        result.url = request.url
+        result.request = request
+        result.connection = self
+        result.raw = _HttpxRaw(response)
+
+        if not stream:
+            try:
+                result.content
+            except httpx.TransportError as e:
+                raise requests.ConnectionError(e, request=request)
+        return result
+
+    def close(self):
+        self.client.close()
+        super().close()
+
+##########################################################################################################
+# Function to build the shared HTTP session ##############################################################
+##########################################################################################################
+
+def build_session(pool_size=HTTP_POOL_SIZE, http2=HTTP_HTTP2):
+    """
+    Creates a requests session over a pooled transport: keep-alive connections (up to
+    pool_size per host), gzip/deflate (and brotli when installed) negotiation, and HTTP/2
+    when asked for and httpx/h2 are installed.
+
+    Parameters:
+        pool_size (int) - Connections kept alive per host.
+        http2 (bool) - Use HTTP/2 (falls back to HTTP/1.1 without httpx and h2).
+
+    Returns:
+        requests.Session configured with the default Baldor headers.
+
+    Example use:
+        session = build_session(pool_size=32)
+    """
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+
+    if http2 and httpx is None:
+        logging.warning("  |_ HTTP/2 disabled: it requires httpx and h2 (pip install httpx[http2]).")
+        http2 = False
+
+    adapter = Http2Adapter(pool_size) if http2 else PooledAdapter(pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+##########################################################################################################
+# Functions to access the shared HTTP session ############################################################
+##########################################################################################################
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_http_session():
+    """
+    Returns the process-wide HTTP session shared by the scraper and the downloader,
+    configured from the HTTP_* environment variables (HTTP_POOL_SIZE, HTTP_POOL_HOSTS,
+    HTTP_KEEPALIVE, HTTP_HTTP2, HTTP_CONNECT_TIMEOUT, HTTP_TIMEOUT_<CLASS>).
+
+    Example use:
+        response = get_http_session().get(url, timeout=timeout_for("listing"))
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+def connection_stats():
+    """
+    Requests sent, connections opened and connections reused per host by the shared
+    transport since the process started.
+
+    Returns:
+        dict mapping each host to its requests, connections, reused and reuse_ratio.
+
+    Example use:
+        connection_stats()  # {"www.baldor.com": {"requests": 2166, "connections": 16, ...}}
+    """
+    return _stats.snapshot()
@@ -0,0 +1,162 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+##########################################################################################################
+# Exception raised when a job is cancelled ###############################################################
+##########################################################################################################
+
+class JobCancelled(Exception):
+    """
+    Raised inside a running job once its cancellation has been requested.
+    """
+
+##########################################################################################################
+# Class to track the state and progress of a background job ##############################################
+##########################################################################################################
+
+class Job:
+    """
+    State, progress and cancellation flag of one background collection run.
+
+    Parameters:
+        query (str) - Website the job collects data from.
+
+    Example use:
+        job = Job("BALDOR")
+        job.advance("products_done")
+        job.check_cancelled()
+    """
+
+    def __init__(self, query):
+        self.id = uuid.uuid4().hex
+        self.query = query
+        self.status = "pending"
+        self.error = None
+        self.result_path = None
+        self.profile = None
+        self.changes = None
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = {
+            "stage": None,
+            "products_done": 0,
+            "products_total": 0,
+            "bytes_downloaded": 0,
+            "truncated": None,
+        }
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def set_stage(self, stage):
+        with self._lock:
+            self.progress["stage"] = stage
+
+    def set_progress(self, field, value):
+        with self._lock:
+            self.progress[field] = value
+
+    def advance(self, field, amount=1):
+        with self._lock:
+            self.progress[field] += amount
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled(f"Job {self.id} cancelled")
+
+    def wait(self, seconds):
+        """
+        Sleeps for the given time, waking up early and raising JobCancelled on cancellation.
+        """
+        if self._cancel.wait(seconds):
+            raise JobCancelled(f"Job {self.id} cancelled")
+
+    def status_dict(self):
+        return {
+            "job_id": self.id,
+            "query": self.query,
+            "status": self.status,
+            "error": self.error,
+            "profile": self.profile,
+            "changes": self.changes,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    def progress_dict(self):
+        with self._lock:
+            progress = dict(self.progress)
+        progress["job_id"] = self.id
+        progress["status"] = self.status
+        return progress
+
+##########################################################################################################
+# Class to run jobs off the event loop ###################################################################
+##########################################################################################################
+
+class JobManager:
+    """
+    Runs collection jobs on background threads and keeps them addressable by id.
+
+    Parameters:
+        max_workers (int) - Number of jobs allowed to run at the same time; the others wait.
+
+    Example use:
+        jobs = JobManager()
+        job = jobs.submit("BALDOR", run_collection)
+        jobs.get(job.id).status
+    """
+
+    def __init__(self, max_workers=1):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, query, target, *args, **kwargs):
+        """
+        Queues target(job, *args, **kwargs); its return value becomes the job result path.
+        """
+        job = Job(query)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, target, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, target, args, kwargs):
+        if job.cancelled:
+            job.status = "cancelled"
+            job.finished_at = _now()
+            return
+
+        job.status = "running"
+        job.started_at = _now()
+        try:
+            job.result_path = target(job, *args, **kwargs)
+            job.status = "succeeded"
+        except JobCancelled:
+            logging.info(f"  |_ Job {job.id} cancelled")
+            job.status = "cancelled"
+        except Exception as exc:
+            logging.error(f"  |_ Job {job.id} failed: {exc}")
+            job.error = str(exc)
+            job.status = "failed"
+        finally:
+            job.finished_at = _now()
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
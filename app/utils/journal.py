@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from utils.general_utils import JOURNAL
+
+# Age, in seconds, after which a journal left by a failed run is no longer resumed.
+JOURNAL_TTL = float(os.getenv("JOURNAL_TTL", str(24 * 3600)))
+
+##########################################################################################################
+# Class to record finished crawl work in an append-only journal ##########################################
+##########################################################################################################
+
+class CrawlJournal:
+    """
+    Append-only JSONL journal of finished crawl work, used to resume a failed run.
+
+    Each line holds one finished unit of work: a category node ("node"), a listing page
+    ("listing"), a product detail ("product") or an asset download ("asset"). Opening an
+    existing journal replays it, so a restarted run can skip everything already recorded.
+
+    The first line is a header with the parameters of the run that started the journal and
+    its start time. A journal started with other parameters, older than the TTL or without
+    a header is discarded instead of replayed, so a run never resumes stale or unrelated work.
+
+    Parameters:
+        path (str) - Path of the journal file.
+        params (dict) - Parameters of the run (scope, incremental, ...), JSON serializable.
+        job_id (str) - Id of the job opening the journal, recorded in a new header.
+        ttl (float) - Age in seconds after which an existing journal is discarded.
+
+    Example use:
+        journal = CrawlJournal(params={"scope": scope.to_dict(), "incremental": False}, job_id=job.id)
+        if journal.get("product", code) is None:
+            journal.record("product", code, {"dwg": dwg, "bom": bom})
+    """
+
+    def __init__(self, path=JOURNAL, params=None, job_id=None, ttl=JOURNAL_TTL):
+        self.path = path
+        self.params = json.loads(json.dumps(params or {}))
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._replay()
+
+        self._file = open(self.path, "a", encoding="utf-8")
+        try:
+            if self._file.tell() == 0:
+                header = {"kind": "header", "params": self.params, "job_id": job_id, "started_at": time.time()}
+                self._file.write(json.dumps(header, ensure_ascii=False) + "\n")
+                self._file.flush()
+        except Exception:
+            self._file.close()
+            raise
+
+    def _stale(self, header):
+        """
+        Reason not to resume a journal from its header, or None if it can be resumed.
+        """
+        if not isinstance(header, dict) or header.get("kind") != "header":
+            return "it has no header"
+        if header.get("params") != self.params:
+            return f"it was started with other parameters ({header.get('params')})"
+        if time.time() - header.get("started_at", 0) > self.ttl:
+            return f"it is older than {self.ttl:.0f}s"
+        return None
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            try:
+                reason = self._stale(json.loads(f.readline()))
+            except json.JSONDecodeError:
+                reason = "its header is unreadable"
+            if reason:
+                logging.info(f"  |_ Discarding journal {self.path}: {reason}")
+                f.close()
+                os.remove(self.path)
+                return
+
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave the last line half written.
+                    continue
+                self._entries.setdefault(entry["kind"], {})[entry["key"]] = entry["data"]
+
+        logging.info(
+            f"  |_ Resuming from journal {self.path}: "
+            + ", ".join(f"{len(items)} {kind}" for kind, items in self._entries.items())
+        )
+
+    def get(self, kind, key):
+        with self._lock:
+            return self._entries.get(kind, {}).get(key)
+
+    def record(self, kind, key, data):
+        line = json.dumps({"kind": kind, "key": key, "data": data}, ensure_ascii=False)
+        with self._lock:
+            self._entries.setdefault(kind, {})[key] = data
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def discard(self):
+        """
+        Closes and deletes the journal once the run it belongs to has completed.
+        """
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,244 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+##########################################################################################################
+# Classes of the metric types ############################################################################
+##########################################################################################################
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+class Counter(_Metric):
+    """
+    Monotonic counter, e.g. requests made or bytes downloaded.
+    """
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down, e.g. the duration of the last run of a stage.
+    """
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in cumulative buckets, with their sum and count.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self, key, value):
+        counts, total, count = value
+        lines = [
+            f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', _format_value(bound))])} {n}"
+            for bound, n in zip(self.buckets, counts)
+        ]
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+##########################################################################################################
+# Class to hold and expose the metrics ###################################################################
+##########################################################################################################
+
+class MetricsRegistry:
+    """
+    Process-wide set of metrics rendered in the Prometheus text exposition format.
+
+    Example use:
+        requests_total = REGISTRY.counter("requests_total", "Requests made.", ["status"])
+        requests_total.inc(status=200)
+        REGISTRY.render()
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), **kwargs):
+        return self._register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+##########################################################################################################
+# Metrics of the collection ##############################################################################
+##########################################################################################################
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "scraper_http_requests_total",
+    "HTTP requests sent to the scraped site, by endpoint class and status (\"error\" when no response).",
+    ["endpoint", "status"],
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "scraper_http_request_duration_seconds",
+    "Time until the response headers are received, by endpoint class.",
+    ["endpoint"],
+)
+HTTP_RETRIES = REGISTRY.counter(
+    "scraper_http_retries_total",
+    "Requests retried after a 429/5xx answer or a connection error, by endpoint class.",
+    ["endpoint"],
+)
+HTTP_CONNECTIONS = REGISTRY.counter(
+    "scraper_http_connections_total",
+    "Connections opened (or reopened) by the shared HTTP transport, by host.",
+    ["host"],
+)
+HTTP_CONNECTIONS_REUSED = REGISTRY.counter(
+    "scraper_http_connections_reused_total",
+    "Requests sent over a connection kept alive from an earlier request, by host.",
+    ["host"],
+)
+BACKOFF_SECONDS = REGISTRY.counter(
+    "scraper_backoff_seconds_total",
+    "Pauses imposed on a host by the rate controller, in seconds.",
+    ["host"],
+)
+DOWNLOADED_BYTES = REGISTRY.counter(
+    "scraper_downloaded_bytes_total",
+    "Bytes of product files downloaded, by asset type.",
+    ["asset"],
+)
+ASSET_CACHE_REQUESTS = REGISTRY.counter(
+    "scraper_asset_cache_requests_total",
+    "Assets asked to the lazy asset cache, by result (hit, miss, shared with a fetch in flight, error).",
+    ["result"],
+)
+PRODUCTS_PROCESSED = REGISTRY.counter(
+    "scraper_products_processed_total",
+    "Products whose details (drawing and BOM) were collected.",
+)
+STAGE_SECONDS = REGISTRY.counter(
+    "scraper_stage_seconds_total",
+    "Wall time spent in each stage of the collection, in seconds.",
+    ["stage"],
+)
+STAGE_CPU_SECONDS = REGISTRY.counter(
+    "scraper_stage_cpu_seconds_total",
+    "Process CPU time spent in each stage of the collection, in seconds.",
+    ["stage"],
+)
+STAGE_LAST_SECONDS = REGISTRY.gauge(
+    "scraper_stage_last_duration_seconds",
+    "Wall time of the last run of each stage of the collection, in seconds.",
+    ["stage"],
+)
+
+##########################################################################################################
+# Function to time a stage of the collection #############################################################
+##########################################################################################################
+
+@contextmanager
+def stage_timer(stage, profiler=None):
+    """
+    Adds the wall and CPU time of the block to the metrics of the given stage, even if it
+    raises. The CPU time is the whole process's, as stages run one after the other.
+
+    Parameters:
+        stage (str) - Name of the stage, e.g. "fetch_products_data".
+        profiler (SamplingProfiler) - Profiler to tag samples with the stage and report its times to (optional).
+
+    Example use:
+        with stage_timer("clean_bom"):
+            clean_bom(data)
+    """
+    if profiler:
+        profiler.set_stage(stage)
+    start = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu
+        STAGE_SECONDS.inc(elapsed, stage=stage)
+        STAGE_CPU_SECONDS.inc(cpu, stage=stage)
+        STAGE_LAST_SECONDS.set(elapsed, stage=stage)
+        if profiler:
+            profiler.record_stage(stage, elapsed, cpu)
+            profiler.set_stage(None)
@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+PROFILE_ENABLED = os.getenv("COLLECT_PROFILE", "").lower() in ("1", "true", "yes")
+PROFILE_INTERVAL = float(os.getenv("COLLECT_PROFILE_INTERVAL", "0.01"))
+
+# Name prefixes of the worker threads of a collection run (scraper and downloader pools).
+PROFILE_THREADS = ("crawl", "download")
+
+##########################################################################################################
+# Class to sample the stacks of a collection run #########################################################
+##########################################################################################################
+
+class SamplingProfiler:
+    """
+    Low-overhead sampling profiler for one collection run.
+
+    A background thread reads the Python stack of the run every `interval` seconds: the
+    thread that started the profiler and the workers of the scraper and downloader pools,
+    recognised by their name prefix. Every other thread (the API server, its AnyIO worker
+    threads, the other jobs) is left out, even when started during the run. Pool workers waiting for
+    work are skipped; threads waiting on the network or the rate limiter are kept, which is
+    what tells network time apart from parsing, encoding or serialization. Samples are
+    tagged with the current stage, and the wall and CPU time of each stage are recorded.
+
+    Parameters:
+        interval (float) - Sampling interval, in seconds.
+        threads (tuple) - Name prefixes of the worker threads sampled with the owner thread.
+
+    Example use:
+        profiler = SamplingProfiler()
+        profiler.start()
+        ...
+        profiler.stop()
+        paths = profiler.write(generation.profile_dir, job.id)
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL, threads=PROFILE_THREADS):
+        self.interval = interval
+        self.threads = tuple(threads)
+        self.stages = []
+        self._stage = None
+        self._samples = {}
+        self._frames = []
+        self._frame_index = {}
+        self._sample_count = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._owner = threading.get_ident()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._wall = time.perf_counter() - self._wall
+        self._cpu = time.process_time() - self._cpu
+
+    def set_stage(self, stage):
+        self._stage = stage
+
+    def record_stage(self, stage, wall, cpu):
+        self.stages.append({"stage": stage, "wall_s": round(wall, 3), "cpu_s": round(cpu, 3)})
+
+    def _run(self):
+        deadline = time.perf_counter()
+        while True:
+            deadline += self.interval
+            if self._stop.wait(max(0.0, deadline - time.perf_counter())):
+                return
+
+            stage = self._stage or "other"
+            sampled = self._sampled()
+            for ident, frame in sys._current_frames().items():
+                if ident not in sampled:
+                    continue
+                stack = self._stack(frame)
+                if stack:
+                    key = (stage, stack)
+                    self._samples[key] = self._samples.get(key, 0) + 1
+            self._sample_count += 1
+
+    def _sampled(self):
+        """
+        Idents of the threads of the run: the owner thread and the pool workers.
+        """
+        sampled = {self._owner}
+        for thread in threading.enumerate():
+            if thread.name.startswith(self.threads):
+                sampled.add(thread.ident)
+        return sampled
+
+    def _stack(self, frame):
+        """
+        Frame indexes of a thread stack from root to leaf, or None for an idle pool worker.
+        """
+        code = frame.f_code
+        if code.co_name == "_worker" and code.co_filename.endswith(os.path.join("concurrent", "futures", "thread.py")):
+            return None
+
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            index = self._frame_index.get(code)
+            if index is None:
+                index = self._frame_index[code] = len(self._frames)
+                self._frames.append((code.co_name, code.co_filename, code.co_firstlineno))
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def _label(self, index):
+        name, filename, line = self._frames[index]
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    def summary(self, top=10):
+        """
+        Wall/CPU breakdown per stage, with the functions the samples of each stage ended in.
+        """
+        per_stage = {}
+        for (stage, stack), count in self._samples.items():
+            entry = per_stage.setdefault(stage, {"samples": 0, "leaves": {}})
+            entry["samples"] += count
+            leaf = self._label(stack[-1])
+            entry["leaves"][leaf] = entry["leaves"].get(leaf, 0) + count
+
+        stages = []
+        for record in self.stages:
+            stages.append(dict(record, cpu_share=round(record["cpu_s"] / record["wall_s"], 2) if record["wall_s"] else 0.0))
+
+        hotspots = {}
+        for stage, entry in per_stage.items():
+            leaves = sorted(entry["leaves"].items(), key=lambda item: item[1], reverse=True)[:top]
+            hotspots[stage] = {
+                "samples": entry["samples"],
+                "top_functions": [
+                    {"function": leaf, "share": round(count / entry["samples"], 3)} for leaf, count in leaves
+                ],
+            }
+
+        return {
+            "interval_s": self.interval,
+            "ticks": self._sample_count,
+            "wall_s": round(self._wall, 3),
+            "cpu_s": round(self._cpu, 3),
+            "stages": stages,
+            "hotspots": hotspots,
+        }
+
+    def write(self, directory, name="profile"):
+        """
+        Writes the profile as a speedscope file (one profile per stage), as collapsed stacks
+        for flamegraph.pl and as a JSON wall/CPU breakdown per stage.
+
+        Parameters:
+            directory (str) - Folder of the profile files, e.g. the profile folder of the
+                generation of the run.
+            name (str) - Base name of the files, e.g. the job id.
+
+        Returns:
+            dict with the paths of the "speedscope", "collapsed" and "stages" files.
+        """
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        paths = {
+            "speedscope": os.path.join(directory, f"{name}.speedscope.json"),
+            "collapsed": os.path.join(directory, f"{name}.collapsed.txt"),
+            "stages": os.path.join(directory, f"{name}.stages.json"),
+        }
+
+        profiles = {}
+        for (stage, stack), count in self._samples.items():
+            profile = profiles.setdefault(stage, {"samples": [], "weights": []})
+            profile["samples"].append(list(stack))
+            profile["weights"].append(round(count * self.interval, 6))
+
+        speedscope = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "api_machine_data_extraction",
+            "shared": {
+                "frames": [{"name": n, "file": f, "line": line} for n, f, line in self._frames],
+            },
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": stage,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": round(sum(profile["weights"]), 6),
+                    "samples": profile["samples"],
+                    "weights": profile["weights"],
+                }
+                for stage, profile in profiles.items()
+            ],
+        }
+        with open(paths["speedscope"], "w", encoding="utf-8") as f:
+            json.dump(speedscope, f)
+
+        with open(paths["collapsed"], "w", encoding="utf-8") as f:
+            for (stage, stack), count in sorted(self._samples.items()):
+                f.write(";".join([stage] + [self._label(i) for i in stack]) + f" {count}\n")
+
+        with open(paths["stages"], "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+
+        logging.info(f"  |_ Profile written to {paths['speedscope']}")
+        return paths
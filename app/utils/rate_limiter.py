@@ -0,0 +1,251 @@
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+from utils.metrics import HTTP_REQUESTS, HTTP_LATENCY, HTTP_RETRIES, BACKOFF_SECONDS
+from utils.http_transport import timeout_for
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+RATE_INITIAL = float(os.getenv("RATE_LIMIT_INITIAL", "10"))
+RATE_MIN = float(os.getenv("RATE_LIMIT_MIN", "0.5"))
+RATE_MAX = float(os.getenv("RATE_LIMIT_MAX", "50"))
+RATE_STEP = float(os.getenv("RATE_LIMIT_STEP", "0.2"))
+BACKOFF_BASE = float(os.getenv("RATE_LIMIT_BACKOFF_BASE", "1"))
+BACKOFF_CAP = float(os.getenv("RATE_LIMIT_BACKOFF_CAP", "300"))
+
+##########################################################################################################
+# Function to compute an exponential backoff with jitter #################################################
+##########################################################################################################
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """
+    Exponential backoff with full jitter: a random delay between 0 and base * 2^attempt,
+    capped.
+
+    Parameters:
+        attempt (int) - Number of consecutive failures, starting at 1.
+        base (float) - Delay of the first attempt, in seconds.
+        cap (float) - Maximum delay, in seconds.
+
+    Returns:
+        float - Delay in seconds.
+
+    Example use:
+        time.sleep(backoff_delay(3))
+    """
+    return random.uniform(0, min(cap, base * 2 ** max(0, attempt - 1)))
+
+##########################################################################################################
+# Function to read a Retry-After header ##################################################################
+##########################################################################################################
+
+def parse_retry_after(value):
+    """
+    Reads a Retry-After header given either in seconds or as an HTTP date.
+
+    Parameters:
+        value (str) - Header value, or None.
+
+    Returns:
+        float seconds to wait, or None if the header is missing or invalid.
+
+    Example use:
+        delay = parse_retry_after(response.headers.get("Retry-After"))
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+##########################################################################################################
+# Class to hold the rate state of one host ###############################################################
+##########################################################################################################
+
+class _HostBucket:
+    """
+    Token bucket of one host, with the pause imposed by its last failures.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        capacity = max(1.0, self.rate)
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+##########################################################################################################
+# Class to adapt the request rate of each host ###########################################################
+##########################################################################################################
+
+class RateController:
+    """
+    Shared per-host rate controller: a token bucket per host whose rate is halved and paused
+    (honouring Retry-After, or an exponential backoff with jitter) on 429/5xx answers and
+    errors, and raised step by step while responses are healthy.
+
+    Parameters:
+        initial (float) - Starting rate of each host, in requests per second.
+        minimum (float) - Lowest rate a host can be slowed down to.
+        maximum (float) - Highest rate a host can be ramped up to.
+        step (float) - Rate increase after each healthy response.
+
+    Example use:
+        rate = RateController()
+        response = rate.request(session, url, timeout=30)
+    """
+
+    def __init__(self, initial=RATE_INITIAL, minimum=RATE_MIN, maximum=RATE_MAX, step=RATE_STEP):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.step = step
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = _HostBucket(self.initial)
+            return bucket
+
+    def acquire(self, url):
+        """
+        Blocks until the host of url may receive another request.
+        """
+        bucket = self._bucket(url)
+        while True:
+            with bucket.lock:
+                now = time.monotonic()
+                if now < bucket.blocked_until:
+                    wait = bucket.blocked_until - now
+                else:
+                    bucket.refill(now)
+                    if bucket.tokens >= 1:
+                        bucket.tokens -= 1
+                        return
+                    wait = (1 - bucket.tokens) / bucket.rate
+            time.sleep(wait)
+
+    def feedback(self, url, status=None, retry_after=None):
+        """
+        Adapts the rate of the host of url to the outcome of a request.
+
+        Parameters:
+            url (str) - Requested URL.
+            status (int) - HTTP status, or None if the request raised an error.
+            retry_after (str) - Retry-After header of the response (optional).
+
+        Returns:
+            float - Pause imposed on the host, in seconds (0 for a healthy response).
+        """
+        bucket = self._bucket(url)
+        with bucket.lock:
+            if status is not None and status not in RETRY_STATUS:
+                bucket.failures = 0
+                bucket.rate = min(self.maximum, bucket.rate + self.step)
+                return 0.0
+
+            bucket.failures += 1
+            bucket.rate = max(self.minimum, bucket.rate / 2)
+            delay = parse_retry_after(retry_after)
+            if delay is None:
+                delay = backoff_delay(bucket.failures)
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + delay)
+
+        BACKOFF_SECONDS.inc(delay, host=urlsplit(url).netloc)
+
+        logging.info(
+            f"  |  |_ {urlsplit(url).netloc}: status {status}, pausing {delay:.1f}s, "
+            f"rate {bucket.rate:.2f} req/s"
+        )
+        return delay
+
+    def request(self, session, url, retries=3, endpoint="other", **kwargs):
+        """
+        Performs a GET paced by the controller, retrying 429/5xx answers and connection
+        errors after the pause they impose.
+
+        Parameters:
+            session (requests.Session) - Session used for the request.
+            url (str) - URL to request.
+            retries (int) - Number of retries after the first attempt.
+            endpoint (str) - Endpoint class the request is counted under in the metrics,
+                and whose timeout is used unless one is given (see timeout_for).
+            **kwargs - Additional arguments for session.get().
+
+        Returns:
+            requests.Response - The last response, even if its status is still retryable.
+            Raises the last requests.RequestException if every attempt failed with an error.
+
+        Example use:
+            response = rate.request(session, url, timeout=30)
+        """
+        kwargs.setdefault("timeout", timeout_for(endpoint))
+
+        for attempt in range(retries + 1):
+            if attempt:
+                HTTP_RETRIES.inc(endpoint=endpoint)
+            self.acquire(url)
+            start = time.perf_counter()
+            try:
+                response = session.get(url, **kwargs)
+            except requests.RequestException:
+                HTTP_REQUESTS.inc(endpoint=endpoint, status="error")
+                self.feedback(url)
+                if attempt == retries:
+                    raise
+                continue
+
+            HTTP_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint)
+            HTTP_REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+            self.feedback(url, response.status_code, response.headers.get("Retry-After"))
+            if response.status_code not in RETRY_STATUS or attempt == retries:
+                return response
+            response.close()
+
+##########################################################################################################
+# Function to access the shared rate controller ##########################################################
+##########################################################################################################
+
+_controller = None
+_controller_lock = threading.Lock()
+
+def get_rate_controller():
+    """
+    Returns the process-wide rate controller shared by the scraper and the downloader.
+
+    Example use:
+        response = get_rate_controller().request(session, url, timeout=30)
+    """
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = RateController()
+        return _controller
@@ -0,0 +1,209 @@
+import logging
+import time
+
+##########################################################################################################
+# Class to describe the slice of the catalog a run collects ##############################################
+##########################################################################################################
+
+class CrawlScope:
+    """
+    Slice of the catalog collected by a run and the limits it runs under. An empty scope
+    collects the whole catalog.
+
+    Parameters:
+        categories (list) - Category, subcategory or sub-subcategory ids; only these
+            branches are crawled (optional).
+        products (list) - Product codes; only these products are collected (optional).
+        max_products (int) - Maximum number of products collected, in catalog order (optional).
+        time_budget (float) - Wall-clock budget of the run in seconds, counted from the
+            creation of the scope (optional). Once it runs out no new work is started and
+            the run finishes with the products completed so far.
+
+    Example use:
+        scope = CrawlScope(categories=["4"], max_products=50, time_budget=600)
+        data = scope.select_categories(fetch_category_tree(scope=scope))
+    """
+
+    def __init__(self, categories=None, products=None, max_products=None, time_budget=None):
+        self.categories = {str(c) for c in categories or []}
+        self.products = set(products or [])
+        self.max_products = max_products
+        self.time_budget = time_budget
+        self.deadline = time.monotonic() + time_budget if time_budget else None
+        self.truncated = None
+
+    @property
+    def expired(self):
+        """
+        True once the time budget has run out (and records it as the truncation reason).
+        """
+        if self.deadline is None or time.monotonic() < self.deadline:
+            return False
+        if self.truncated is None:
+            self.truncated = "time_budget"
+            logging.info(f"  |_ Time budget of {self.time_budget}s reached, finishing with the work done so far.")
+        return True
+
+    @property
+    def remaining(self):
+        """
+        Seconds left in the time budget (0 once it has run out), or None without a budget;
+        the timeout of the blocking waits of the run.
+        """
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def partial(self):
+        """
+        True when the run does not cover the whole catalog: a category or product filter, or
+        a limit or time budget that cut it short.
+        """
+        return bool(self.categories or self.products) or self.truncated is not None
+
+    def to_dict(self):
+        return {
+            "categories": sorted(self.categories) or None,
+            "products": sorted(self.products) or None,
+            "max_products": self.max_products,
+            "time_budget": self.time_budget,
+        }
+
+    ######################################################################################################
+
+    def expands(self, inside, found):
+        """
+        Whether the discovery still has to expand a node: always without a category filter,
+        inside a selected branch, or while some requested ids have not been found yet.
+
+        Parameters:
+            inside (bool) - The node or one of its ancestors is a requested id.
+            found (set) - Requested ids found so far.
+        """
+        return not self.categories or inside or not self.categories <= found
+
+    def select_categories(self, data):
+        """
+        Keeps the requested branches of the category tree and their ancestors.
+
+        Parameters:
+            data (list) - Category tree from fetch_category_tree.
+
+        Returns:
+            The pruned tree (the tree itself when there is no category filter).
+        """
+        if not self.categories:
+            return data
+
+        def wanted(node):
+            return str(node.get("id")) in self.categories
+
+        selected = []
+        for category in data:
+            if wanted(category):
+                selected.append(category)
+                continue
+
+            subcategories = []
+            for subcat in category.get("subcategories", []):
+                if wanted(subcat):
+                    subcategories.append(subcat)
+                    continue
+
+                subsubs = [subsub for subsub in subcat.get("sub_subcategory", []) if wanted(subsub)]
+                if subsubs:
+                    subcategories.append(dict(subcat, sub_subcategory=subsubs))
+
+            if subcategories:
+                selected.append(dict(category, subcategories=subcategories))
+
+        if not selected:
+            logging.warning(f"  |_ None of the requested categories were found: {sorted(self.categories)}")
+
+        return selected
+
+    def select_products(self, matches, collected):
+        """
+        Filters the listing entries of a sub-subcategory by product code and by the
+        remaining product allowance.
+
+        Parameters:
+            matches (list) - Raw listing entries, in catalog order.
+            collected (int) - Products already selected by the run.
+
+        Returns:
+            The selected entries.
+        """
+        if self.products:
+            matches = [prod for prod in matches if prod.get("code") in self.products]
+
+        if self.max_products is not None and collected + len(matches) > self.max_products:
+            matches = matches[:max(0, self.max_products - collected)]
+            self._limit_reached()
+
+        return matches
+
+    def done(self, collected, found_codes, more=True):
+        """
+        True when no further listing needs to be read: the product limit is reached, every
+        requested product code has been found, or the time budget ran out.
+
+        Parameters:
+            collected (int) - Products already selected by the run.
+            found_codes (set) - Requested product codes found so far.
+            more (bool) - The listings not read yet may hold products; reaching the limit
+                only truncates the run when they do.
+        """
+        if self.products and self.products <= found_codes:
+            return True
+        if self.max_products is not None and collected >= self.max_products:
+            if more:
+                self._limit_reached()
+            return True
+        return self.expired
+
+    def _limit_reached(self):
+        if self.truncated is None:
+            self.truncated = "max_products"
+            logging.info(f"  |_ Limit of {self.max_products} products reached. Stopping collection.")
+
+##########################################################################################################
+# Function to drop the parts of the tree a truncated run never reached ###################################
+##########################################################################################################
+
+def prune_unvisited(data):
+    """
+    Removes the sub-subcategories whose products were never collected (no "product" key),
+    and the subcategories and categories left empty by that removal, so a partial run
+    only describes the part of the catalog it actually read.
+
+    Parameters:
+        data (list) - Category tree after fetch_products_data.
+
+    Returns:
+        The pruned tree.
+
+    Example use:
+        data = prune_unvisited(data)
+    """
+    categories = []
+    for category in data:
+        subcategories = []
+        pruned = False
+        for subcat in category.get("subcategories", []):
+            subsubs = subcat.get("sub_subcategory", [])
+            visited = [subsub for subsub in subsubs if "product" in subsub]
+            if len(visited) == len(subsubs):
+                subcategories.append(subcat)
+            else:
+                pruned = True
+                if visited:
+                    subcategories.append(dict(subcat, sub_subcategory=visited))
+
+        if not pruned:
+            categories.append(category)
+        elif subcategories:
+            categories.append(dict(category, subcategories=subcategories))
+
+    return categories
@@ -0,0 +1,129 @@
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_SERIALIZER = os.getenv("JSON_SERIALIZER", "auto")
+OUTPUT_PRETTY = os.getenv("OUTPUT_PRETTY", "").lower() in ("1", "true", "yes")
+
+SERIALIZERS = ("auto", "orjson", "json")
+
+##########################################################################################################
+# Functions to serialize JSON with the configured backend ################################################
+##########################################################################################################
+
+def _json_dumps(value, pretty=False):
+    if pretty:
+        return json.dumps(value, ensure_ascii=False, indent=2)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+def _orjson_dumps(value, pretty=False):
+    return orjson.dumps(value, option=orjson.OPT_INDENT_2 if pretty else 0).decode("utf-8")
+
+def get_dumps(name=JSON_SERIALIZER):
+    """
+    Returns the dumps(value, pretty=False) function of a serializer backend: orjson, the
+    standard json module, or "auto" for orjson when it is installed. Both produce the same
+    text for the data of this project: UTF-8 without escaping, compact separators, or a
+    2-space indent when pretty.
+
+    Parameters:
+        name (str) - One of SERIALIZERS.
+
+    Returns:
+        callable
+
+    Example use:
+        dumps = get_dumps("json")
+        dumps({"a": 1})  # '{"a":1}'
+    """
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unsupported JSON serializer: {name}")
+    if name == "orjson" and orjson is None:
+        raise RuntimeError("JSON_SERIALIZER=orjson requires orjson (pip install orjson).")
+
+    if name != "json" and orjson is not None:
+        return _orjson_dumps
+    return _json_dumps
+
+dumps = get_dumps()
+
+##########################################################################################################
+# Classes and function to stream JSON with lazy parts ####################################################
+##########################################################################################################
+
+class LazyList:
+    """
+    JSON array whose items are produced by an iterable while the output is written, so they
+    never need to be in memory all at once.
+    """
+    __slots__ = ("items",)
+
+    def __init__(self, items):
+        self.items = items
+
+class RawString:
+    """
+    JSON string whose content is produced in chunks (e.g. base64), already JSON-safe.
+    """
+    __slots__ = ("chunks",)
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+def _is_lazy(value):
+    if isinstance(value, (LazyList, RawString)):
+        return True
+    if isinstance(value, dict):
+        return any(_is_lazy(item) for item in value.values())
+    if isinstance(value, list):
+        return any(_is_lazy(item) for item in value)
+    return False
+
+def iter_json(value, pretty=OUTPUT_PRETTY, level=0):
+    """
+    Serializes a value to JSON chunk by chunk. Plain parts are handed to the serializer in
+    one call; only LazyList and RawString parts, and the containers holding them, are
+    walked here. The text is the same as dumps(value, pretty) of the materialized value.
+
+    Parameters:
+        value - Value to serialize; may contain LazyList and RawString parts.
+        pretty (bool) - Indent with 2 spaces instead of the compact form.
+        level (int) - Nesting depth of the value, for the indentation.
+
+    Returns:
+        Iterator of str chunks.
+
+    Example use:
+        for chunk in iter_json({"items": LazyList(load(code) for code in codes)}):
+            f.write(chunk)
+    """
+    newline = "\n" + "  " * (level + 1) if pretty else ""
+    closing = "\n" + "  " * level if pretty else ""
+
+    if isinstance(value, RawString):
+        yield '"'
+        yield from value.chunks
+        yield '"'
+
+    elif isinstance(value, dict) and _is_lazy(value):
+        separator = ": " if pretty else ":"
+        for i, (key, item) in enumerate(value.items()):
+            yield ("," if i else "{") + newline + dumps(key) + separator
+            yield from iter_json(item, pretty, level + 1)
+        yield closing + "}"
+
+    elif isinstance(value, LazyList) or (isinstance(value, list) and _is_lazy(value)):
+        empty = True
+        for item in (value.items if isinstance(value, LazyList) else value):
+            yield ("[" if empty else ",") + newline
+            yield from iter_json(item, pretty, level + 1)
+            empty = False
+        yield "[]" if empty else closing + "]"
+
+    else:
+        text = dumps(value, pretty)
+        yield text.replace("\n", "\n" + "  " * level) if pretty and level else text
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+SNAPSHOT = "data/crawl_snapshot.json"
+CHANGES_DIR = "data/changes"
+
+##########################################################################################################
+# Function to fingerprint a listing entry ################################################################
+##########################################################################################################
+
+def listing_fields(prod):
+    """
+    Listing-level fields of a product that are compared between runs: description, UPC,
+    list price, image id and attributes (name -> values).
+
+    Parameters:
+        prod (dict) - Raw product entry from the listing API.
+
+    Returns:
+        dict of the compared fields.
+    """
+    return {
+        "description": prod.get("description"),
+        "upc": prod.get("upc"),
+        "listPrice": prod.get("listPrice"),
+        "imageId": prod.get("imageId"),
+        "attributes": {
+            (attr.get("name") or "").lower(): [value.get("value") for value in attr.get("values") or []]
+            for attr in prod.get("attributes", [])
+        },
+    }
+
+def fingerprint(fields):
+    """
+    Stable hash of the listing fields of a product.
+    """
+    canonical = json.dumps(fields, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+def _changed_fields(old, new):
+    """
+    Fields that differ between two listing_fields dicts, attributes compared one by one,
+    as {field: {"old": ..., "new": ...}}.
+    """
+    old_attrs = old.get("attributes", {})
+    new_attrs = new.get("attributes", {})
+    changes = {
+        name: {"old": old.get(name), "new": new.get(name)}
+        for name in ("description", "upc", "listPrice", "imageId")
+        if old.get(name) != new.get(name)
+    }
+    for name in sorted(set(old_attrs) | set(new_attrs)):
+        if old_attrs.get(name) != new_attrs.get(name):
+            changes[name] = {"old": old_attrs.get(name), "new": new_attrs.get(name)}
+    return changes
+
+##########################################################################################################
+# Class to compare a crawl with the previous one #########################################################
+##########################################################################################################
+
+class CrawlSnapshot:
+    """
+    Listing fingerprints, drawing URL and BOM of every product collected by the last
+    successful run, used to tell new, changed and removed products apart.
+
+    In incremental mode, products whose listing fields did not change since the snapshot
+    keep the drawing URL and BOM recorded there instead of requesting them again, and
+    their files are not downloaded again (see unchanged). A run without incremental mode
+    still compares against the snapshot, so both produce the change feed.
+
+    Parameters:
+        path (str) - Path of the snapshot file.
+        incremental (bool) - Reuse the details of unchanged products.
+
+    Example use:
+        snapshot = CrawlSnapshot(incremental=True)
+        data = fetch_products_data(data, snapshot=snapshot)
+        feed = snapshot.changes(data)
+        snapshot.save()
+    """
+
+    def __init__(self, path=SNAPSHOT, incremental=False):
+        self.path = path
+        self.incremental = incremental
+        self.previous = self._load()
+        self.current = {}
+        self.unchanged = set()
+        self.removed = []
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.warning(f"  |_ Ignoring unreadable crawl snapshot {self.path}: {e}")
+            return {}
+
+    def lookup(self, prod):
+        """
+        Fingerprints a listing entry and returns the details recorded for it by the last run
+        when they can be reused: incremental mode and the same listing fields.
+
+        Parameters:
+            prod (dict) - Raw product entry from the listing API.
+
+        Returns:
+            (fields, details) - details is {"dwg", "bom"} or None.
+        """
+        fields = listing_fields(prod)
+        previous = self.previous.get(prod.get("code"))
+        if (
+            self.incremental
+            and previous
+            and previous.get("fingerprint") == fingerprint(fields)
+            and "bom" in previous
+        ):
+            return fields, {"dwg": previous.get("dwg"), "bom": previous["bom"]}
+        return fields, None
+
+    def record(self, code, fields, sub_subcategory, dwg, bom, reused=False):
+        """
+        Records a collected product.
+
+        Parameters:
+            code (str) - Product code.
+            fields (dict) - Its listing fields, from lookup.
+            sub_subcategory (str) - Id of the sub-subcategory it was listed in.
+            dwg (str) - Drawing URL.
+            bom (list) - BOM items.
+            reused (bool) - The details were taken from the snapshot.
+        """
+        self.current[code] = {
+            "fingerprint": fingerprint(fields),
+            "fields": fields,
+            "sub_subcategory": sub_subcategory,
+            "dwg": dwg,
+            "bom": bom,
+        }
+        if reused:
+            self.unchanged.add(code)
+
+    ######################################################################################################
+
+    def changes(self, data, complete=True):
+        """
+        Change feed of the run against the snapshot: products added, modified (with the
+        fields that changed) and removed.
+
+        A product is only reported as removed when the listing of its sub-subcategory was
+        read in full by this run (complete=True and the sub-subcategory is in data), so a
+        scoped or truncated run does not report the products it did not look at.
+
+        Parameters:
+            data (list) - Category tree of the run.
+            complete (bool) - The listings in data were read in full (no product filter,
+                limit or time budget cut them short).
+
+        Returns:
+            dict with the "added", "modified" and "removed" products and the "counts" of
+            each kind (unchanged products included).
+        """
+        added, modified, unchanged = [], [], 0
+        for code, entry in self.current.items():
+            previous = self.previous.get(code)
+            if previous is None:
+                added.append(code)
+            elif previous.get("fingerprint") != entry["fingerprint"]:
+                modified.append({"code": code, "fields": _changed_fields(previous.get("fields", {}), entry["fields"])})
+            else:
+                unchanged += 1
+
+        removed = []
+        if complete:
+            listed = {
+                str(subsub.get("id"))
+                for category in data
+                for subcat in category.get("subcategories", [])
+                for subsub in subcat.get("sub_subcategory", [])
+            }
+            removed = [
+                code for code, previous in self.previous.items()
+                if code not in self.current and str(previous.get("sub_subcategory")) in listed
+            ]
+        self.removed = removed
+
+        return {
+            "first_run": not self.previous,
+            "counts": {
+                "added": len(added),
+                "modified": len(modified),
+                "removed": len(removed),
+                "unchanged": unchanged,
+            },
+            "added": added,
+            "modified": modified,
+            "removed": removed,
+        }
+
+    def save(self):
+        """
+        Atomically writes the snapshot for the next run: the previous entries, updated with
+        the products collected by this run and without the ones found removed by changes().
+        """
+        snapshot = dict(self.previous)
+        for code in self.removed:
+            snapshot.pop(code, None)
+        snapshot.update(self.current)
+
+        path = Path(self.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=path.parent, prefix=f".{path.name}.", suffix=".part", delete=False
+        ) as tmp:
+            json.dump(snapshot, tmp, ensure_ascii=False)
+        os.replace(tmp.name, path)
+
+##########################################################################################################
+# Function to write the change feed of a run #############################################################
+##########################################################################################################
+
+def write_changes(feed, name, directory=CHANGES_DIR):
+    """
+    Writes the change feed of a run as <directory>/<name>.json.
+
+    Parameters:
+        feed (dict) - Result of CrawlSnapshot.changes.
+        name (str) - Base name of the file, e.g. the job id.
+        directory (str) - Folder of the change feeds.
+
+    Returns:
+        str - Path of the written file.
+
+    Example use:
+        path = write_changes(snapshot.changes(data), job.id)
+    """
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    path = os.path.join(directory, f"{name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(feed, f, ensure_ascii=False, indent=2)
+
+    counts = feed["counts"]
+    logging.info(
+        f"  |_ Changes: {counts['added']} added, {counts['modified']} modified, "
+        f"{counts['removed']} removed, {counts['unchanged']} unchanged ({path})"
+    )
+    return path